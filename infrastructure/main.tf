@@ -93,6 +93,63 @@ resource "google_bigquery_table" "generated_content_table" {
   depends_on = [google_bigquery_dataset.ai_dataset]
 }
 
+# BigQuery Table for storing forecasts
+resource "google_bigquery_table" "forecasts_table" {
+  dataset_id = google_bigquery_dataset.ai_dataset.dataset_id
+  table_id   = "forecasts"
+  project    = var.project_id
+
+  schema = file("${path.module}/schemas/forecasts_schema.json")
+
+  labels = {
+    environment = var.environment
+    table_type  = "forecasts"
+  }
+
+  depends_on = [google_bigquery_dataset.ai_dataset]
+}
+
+# BigQuery Table for storing Gemini generations
+resource "google_bigquery_table" "gemini_generations_table" {
+  dataset_id = google_bigquery_dataset.ai_dataset.dataset_id
+  table_id   = "gemini_generations"
+  project    = var.project_id
+
+  schema = file("${path.module}/schemas/gemini_generations_schema.json")
+
+  time_partitioning {
+    type  = "DAY"
+    field = "timestamp"
+  }
+
+  clustering = ["generation_type", "model_name"]
+
+  labels = {
+    environment = var.environment
+    table_type  = "gemini_generations"
+  }
+
+  depends_on = [google_bigquery_dataset.ai_dataset]
+}
+
+# BigQuery Table caching Gemini embeddings by model and text hash
+resource "google_bigquery_table" "gemini_embedding_cache_table" {
+  dataset_id = google_bigquery_dataset.ai_dataset.dataset_id
+  table_id   = "gemini_embedding_cache"
+  project    = var.project_id
+
+  schema = file("${path.module}/schemas/gemini_embedding_cache_schema.json")
+
+  clustering = ["hash"]
+
+  labels = {
+    environment = var.environment
+    table_type  = "embedding_cache"
+  }
+
+  depends_on = [google_bigquery_dataset.ai_dataset]
+}
+
 # Cloud Storage bucket for multimodal data
 resource "google_storage_bucket" "multimodal_bucket" {
   name          = "${var.project_id}-multimodal-data-${var.environment}"
@@ -13,23 +13,27 @@ __version__ = "1.0.0"
 __author__ = "BigQuery AI Hackathon Team"
 __description__ = "BigQuery AI - Building the Future of Data"
 
-# Core modules
-from . import config
-from . import models
-from . import exceptions
-from . import utils
-
-# AI approach modules
-from . import generative_ai
-from . import vector_search
-from . import multimodal
+import importlib
 
 __all__ = [
     "config",
-    "models", 
+    "models",
     "exceptions",
     "utils",
     "generative_ai",
     "vector_search",
     "multimodal"
 ]
+
+
+def __getattr__(name):
+    """Lazily import submodules on first attribute access (PEP 562)."""
+    if name in __all__:
+        module = importlib.import_module(f".{name}", __name__)
+        globals()[name] = module
+        return module
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(__all__)
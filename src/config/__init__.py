@@ -5,13 +5,36 @@ This module handles environment-based configuration, BigQuery connections,
 API keys, and logging configuration.
 """
 
-from .config import Config, get_config
-from .bigquery_config import BigQueryConfig
-from .logging_config import LoggingConfig
+import importlib
+
+# Public name -> submodule that defines it, resolved on first access so that
+# importing the package does not load pydantic or the Google Cloud SDK
+_LAZY_IMPORTS = {
+    "Config": "config",
+    "get_config": "config",
+    "validate_config": "config",
+    "ValidationResult": "config",
+    "BigQueryConfig": "bigquery_config",
+    "LoggingConfig": "logging_config",
+}
 
 __all__ = [
     "Config",
-    "get_config", 
+    "get_config",
     "BigQueryConfig",
     "LoggingConfig"
 ]
+
+
+def __getattr__(name):
+    """Lazily import configuration objects on first attribute access (PEP 562)."""
+    if name in _LAZY_IMPORTS:
+        module = importlib.import_module(f".{_LAZY_IMPORTS[name]}", __name__)
+        value = getattr(module, name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(__all__)
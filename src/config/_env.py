@@ -0,0 +1,39 @@
+"""
+Process environment snapshot.
+
+Environment variables used by the configuration modules are read once into
+an immutable snapshot so every consumer shares a single source of truth.
+Tests that change the environment should call ``env_snapshot.cache_clear()``.
+"""
+
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional
+
+
+@dataclass(frozen=True)
+class EnvSnapshot:
+    """Typed, read-only view of the configuration environment variables."""
+    
+    environment: str
+    debug: bool
+    project_id: Optional[str]
+    region: str
+    dataset_id: str
+    location: str
+    bucket_name: Optional[str]
+
+
+@lru_cache(maxsize=1)
+def env_snapshot() -> EnvSnapshot:
+    """Read configuration environment variables once and cache the result."""
+    return EnvSnapshot(
+        environment=os.getenv("ENVIRONMENT", "dev"),
+        debug=os.getenv("DEBUG", "false").lower() == "true",
+        project_id=os.getenv("GOOGLE_CLOUD_PROJECT"),
+        region=os.getenv("GOOGLE_CLOUD_REGION", "us-central1"),
+        dataset_id=os.getenv("BIGQUERY_DATASET_ID", "bigquery_ai_hackathon"),
+        location=os.getenv("BIGQUERY_LOCATION", "US"),
+        bucket_name=os.getenv("CLOUD_STORAGE_BUCKET"),
+    )
@@ -5,15 +5,70 @@ This module handles BigQuery client configuration, connection pooling,
 and environment-specific BigQuery settings.
 """
 
+from __future__ import annotations
+
+import atexit
 import os
-from typing import Optional, Dict, Any
-from google.cloud import bigquery
-from google.cloud.bigquery import Client
-from google.auth import default
-from google.auth.exceptions import DefaultCredentialsError
-import structlog
+import threading
+import time
+import weakref
+from functools import lru_cache
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Optional, Dict, Any, Mapping, Tuple
+
+from ._env import env_snapshot
+
+# The Google Cloud SDK is imported inside the functions that need it so that
+# importing the configuration package does not load it
+if TYPE_CHECKING:
+    from google.cloud.bigquery import Client
+
+
+@lru_cache(maxsize=None)
+def _get_logger():
+    """Import structlog and build the module logger on first use."""
+    import structlog
+    return structlog.get_logger(__name__)
+
+
+class _LazyLogger:
+    """Module logger stand-in that defers importing structlog until a log call."""
+    
+    def __getattr__(self, name):
+        return getattr(_get_logger(), name)
+
+
+logger = _LazyLogger()
+
+# Credentials are resolved once per process and shared by every
+# BigQueryConfig; they are re-resolved once the refresh window lapses.
+CREDENTIALS_REFRESH_SECONDS = 25 * 60
+
+_credentials_lock = threading.Lock()
+_cached_credentials = None
+_credentials_refresh_deadline = 0.0
 
-logger = structlog.get_logger(__name__)
+
+def _get_default_credentials():
+    """Return cached default credentials, resolving them when stale."""
+    global _cached_credentials, _credentials_refresh_deadline
+    
+    with _credentials_lock:
+        if (_cached_credentials is not None
+                and _cached_credentials.valid
+                and time.monotonic() < _credentials_refresh_deadline):
+            return _cached_credentials
+        
+        from google.auth import default
+        from google.auth.transport.requests import Request
+        
+        credentials, project = default()
+        credentials.refresh(Request())
+        
+        _cached_credentials = credentials
+        _credentials_refresh_deadline = time.monotonic() + CREDENTIALS_REFRESH_SECONDS
+        logger.debug("Default credentials resolved")
+        return credentials
 
 
 class BigQueryConfig:
@@ -21,60 +76,192 @@ class BigQueryConfig:
     
     def __init__(self, project_id: Optional[str] = None, location: Optional[str] = None):
         """Initialize BigQuery configuration."""
-        self.project_id = project_id or os.getenv("GOOGLE_CLOUD_PROJECT")
-        self.location = location or os.getenv("BIGQUERY_LOCATION", "US")
-        self.dataset_id = os.getenv("BIGQUERY_DATASET_ID", "bigquery_ai_hackathon")
+        env = env_snapshot()
+        self.project_id = project_id or env.project_id
+        self.location = location or env.location
+        self.dataset_id = env.dataset_id
         
         if not self.project_id:
             raise ValueError("GOOGLE_CLOUD_PROJECT environment variable is required")
         
         self._client: Optional[Client] = None
+        self._client_finalizer: Optional[weakref.finalize] = None
         self._credentials = None
+        self._client_lock = threading.Lock()
+        self._bqstorage_client = None
+        self._bqstorage_unavailable = False
+        self._bqstorage_lock = threading.Lock()
+        self._bqwrite_client = None
+        self._bqwrite_unavailable = False
+        self._bqwrite_lock = threading.Lock()
+        
+        # Memoized table identifiers and references
+        self._full_table_ids: Dict[str, str] = {}
+        self._dataset_ref = None
+        self._table_refs: Dict[str, Any] = {}
+        
+        # Cached result of the last connection probe
+        self._last_validated_at: Optional[float] = None
+        self._last_validation_result = False
+        self._validation_cache_hits = 0
         
     def get_credentials(self):
-        """Get Google Cloud credentials."""
+        """Get Google Cloud credentials from the process-wide cache."""
+        from google.auth.exceptions import DefaultCredentialsError
+        
         try:
-            credentials, project = default()
+            credentials = _get_default_credentials()
             self._credentials = credentials
             return credentials
         except DefaultCredentialsError as e:
             logger.error("Failed to get default credentials", error=str(e))
             raise
     
+    def _create_http_session(self, credentials):
+        """
+        Create the authorized HTTP session used by a BigQuery client.
+        
+        The connection pool is sized well above the environment's query
+        concurrency (each in-flight query also polls and fetches results), so
+        concurrent requests reuse kept-alive TLS connections instead of
+        overflowing the default ten-connection pool and reconnecting.
+        """
+        from google.auth.transport.requests import AuthorizedSession
+        from requests.adapters import HTTPAdapter
+        
+        pool_size = get_bigquery_settings()["http_pool_maxsize"]
+        session = AuthorizedSession(credentials)
+        session.mount("https://", HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size))
+        return session
+    
+    def _create_client(self) -> Client:
+        """Create a new BigQuery client using the cached credentials."""
+        from google.cloud import bigquery
+        
+        try:
+            credentials = self.get_credentials()
+            client = bigquery.Client(
+                project=self.project_id,
+                credentials=credentials,
+                location=self.location,
+                _http=self._create_http_session(credentials)
+            )
+            logger.info("BigQuery client created successfully", 
+                       project_id=self.project_id, 
+                       location=self.location)
+            return client
+        except Exception as e:
+            logger.error("Failed to create BigQuery client", error=str(e))
+            raise
+    
     def get_client(self) -> Client:
         """Get or create BigQuery client."""
         if self._client is None:
-            try:
-                credentials = self.get_credentials()
-                self._client = bigquery.Client(
-                    project=self.project_id,
-                    credentials=credentials,
-                    location=self.location
-                )
-                logger.info("BigQuery client created successfully", 
-                           project_id=self.project_id, 
-                           location=self.location)
-            except Exception as e:
-                logger.error("Failed to create BigQuery client", error=str(e))
-                raise
+            with self._client_lock:
+                if self._client is None:
+                    self._client = self._create_client()
+                    # Close the client even if close_connection is never called
+                    self._client_finalizer = weakref.finalize(self, self._client.close)
         
         return self._client
     
+    def get_bqstorage_client(self):
+        """
+        Get or create the BigQuery Storage Read API client.
+        
+        Returns None when the Storage API is disabled for the environment or
+        google-cloud-bigquery-storage is not installed, in which case results
+        are fetched through the REST client.
+        """
+        if not get_bigquery_settings()["use_storage_api"] or self._bqstorage_unavailable:
+            return None
+        
+        if self._bqstorage_client is None:
+            with self._bqstorage_lock:
+                if self._bqstorage_client is None and not self._bqstorage_unavailable:
+                    try:
+                        from google.cloud import bigquery_storage_v1
+                    except ImportError:
+                        self._bqstorage_unavailable = True
+                        logger.warning("google-cloud-bigquery-storage is not installed, "
+                                       "falling back to REST result fetching")
+                        return None
+                    
+                    self._bqstorage_client = bigquery_storage_v1.BigQueryReadClient(
+                        credentials=self.get_credentials()
+                    )
+                    logger.info("BigQuery Storage read client created successfully",
+                               project_id=self.project_id)
+        
+        return self._bqstorage_client
+    
+    def get_bqstorage_write_client(self):
+        """
+        Get or create the BigQuery Storage Write API client.
+        
+        Returns None when google-cloud-bigquery-storage is not installed, in
+        which case rows are written through ``insert_rows_json``.
+        """
+        if self._bqwrite_unavailable:
+            return None
+        
+        if self._bqwrite_client is None:
+            with self._bqwrite_lock:
+                if self._bqwrite_client is None and not self._bqwrite_unavailable:
+                    try:
+                        from google.cloud import bigquery_storage_v1
+                    except ImportError:
+                        self._bqwrite_unavailable = True
+                        logger.warning("google-cloud-bigquery-storage is not installed, "
+                                       "falling back to streaming inserts")
+                        return None
+                    
+                    self._bqwrite_client = bigquery_storage_v1.BigQueryWriteClient(
+                        credentials=self.get_credentials()
+                    )
+                    logger.info("BigQuery Storage write client created successfully",
+                               project_id=self.project_id)
+        
+        return self._bqwrite_client
+    
+    def should_use_storage_api(self, row_count: int) -> bool:
+        """Check whether a result of ``row_count`` rows should use the Storage API."""
+        threshold = get_bigquery_settings()["storage_api_row_threshold"]
+        return row_count >= threshold and self.get_bqstorage_client() is not None
+    
+    def get_dbapi_connection(self):
+        """Get a DB-API connection that prefers the Storage API for result fetching."""
+        from google.cloud.bigquery import dbapi
+        
+        bqstorage_client = self.get_bqstorage_client()
+        return dbapi.Connection(
+            client=self.get_client(),
+            bqstorage_client=bqstorage_client,
+            prefer_bqstorage_client=bqstorage_client is not None
+        )
+    
     def get_dataset_ref(self):
         """Get BigQuery dataset reference."""
-        client = self.get_client()
-        dataset_ref = client.dataset(self.dataset_id)
-        return dataset_ref
+        if self._dataset_ref is None:
+            client = self.get_client()
+            self._dataset_ref = client.dataset(self.dataset_id)
+        return self._dataset_ref
     
     def get_table_ref(self, table_id: str):
         """Get BigQuery table reference."""
-        dataset_ref = self.get_dataset_ref()
-        table_ref = dataset_ref.table(table_id)
+        table_ref = self._table_refs.get(table_id)
+        if table_ref is None:
+            table_ref = self.get_dataset_ref().table(table_id)
+            self._table_refs[table_id] = table_ref
         return table_ref
     
     def get_full_table_id(self, table_id: str) -> str:
         """Get full table ID including project and dataset."""
-        return f"{self.project_id}.{self.dataset_id}.{table_id}"
+        full_table_id = self._full_table_ids.get(table_id)
+        if full_table_id is None:
+            full_table_id = f"{self.project_id}.{self.dataset_id}.{table_id}"
+            self._full_table_ids[table_id] = full_table_id
+        return full_table_id
     
     def get_connection_config(self) -> Dict[str, Any]:
         """Get connection configuration for BigQuery."""
@@ -85,36 +272,95 @@ class BigQueryConfig:
             "credentials": self._credentials is not None
         }
     
-    def validate_connection(self) -> bool:
-        """Validate BigQuery connection."""
+    def validate_connection(self, force: bool = False) -> bool:
+        """
+        Validate BigQuery connection.
+        
+        The probe result is reused for ``validation_ttl_seconds`` from the
+        environment settings so health-check storms issue a single RPC.
+        
+        Args:
+            force: Bypass the cached result and always probe BigQuery
+        """
+        ttl = get_bigquery_settings()["validation_ttl_seconds"]
+        if (not force
+                and self._last_validated_at is not None
+                and time.monotonic() - self._last_validated_at < ttl):
+            self._validation_cache_hits += 1
+            logger.debug("BigQuery connection validation served from cache",
+                        cache_hits=self._validation_cache_hits,
+                        result=self._last_validation_result)
+            return self._last_validation_result
+        
         try:
             client = self.get_client()
-            # Try to list datasets to validate connection
-            datasets = list(client.list_datasets(max_results=1))
+            # Lightweight probe: a single short RPC that needs no dataset permissions
+            client.get_service_account_email()
             logger.info("BigQuery connection validated successfully")
-            return True
+            result = True
         except Exception as e:
             logger.error("BigQuery connection validation failed", error=str(e))
-            return False
+            result = False
+        
+        self._last_validation_result = result
+        self._last_validated_at = time.monotonic()
+        return result
     
     def close_connection(self):
         """Close BigQuery client connection."""
         if self._client:
+            self._client_finalizer.detach()
             self._client.close()
             self._client = None
             logger.info("BigQuery client connection closed")
+        if self._bqstorage_client is not None:
+            self._bqstorage_client.transport.close()
+            self._bqstorage_client = None
+            logger.info("BigQuery Storage read client closed")
+        if self._bqwrite_client is not None:
+            self._bqwrite_client.transport.close()
+            self._bqwrite_client = None
+            logger.info("BigQuery Storage write client closed")
+        self._dataset_ref = None
+        self._table_refs.clear()
+
+
+# Shared BigQuery configuration instances keyed by (project_id, location)
+_bigquery_configs: Dict[Tuple[Optional[str], Optional[str]], BigQueryConfig] = {}
+_bigquery_config_lock = threading.Lock()
+
+
+def get_bigquery_config(
+    project_id: Optional[str] = None,
+    location: Optional[str] = None
+) -> BigQueryConfig:
+    """Get shared BigQuery configuration instance for a project/location."""
+    key = (project_id, location)
+    config = _bigquery_configs.get(key)
+    if config is None:
+        with _bigquery_config_lock:
+            config = _bigquery_configs.get(key)
+            if config is None:
+                config = BigQueryConfig(project_id=project_id, location=location)
+                _bigquery_configs[key] = config
+                atexit.register(config.close_connection)
+    return config
 
 
-# Global BigQuery configuration instance
-_bigquery_config: Optional[BigQueryConfig] = None
+def _reset_after_fork() -> None:
+    """Drop clients and credentials inherited from the parent so each worker creates its own."""
+    global _bigquery_config_lock, _credentials_lock, _cached_credentials, _credentials_refresh_deadline
+    for config in _bigquery_configs.values():
+        atexit.unregister(config.close_connection)
+    _bigquery_configs.clear()
+    _bigquery_config_lock = threading.Lock()
+    _credentials_lock = threading.Lock()
+    _cached_credentials = None
+    _credentials_refresh_deadline = 0.0
 
 
-def get_bigquery_config() -> BigQueryConfig:
-    """Get global BigQuery configuration instance."""
-    global _bigquery_config
-    if _bigquery_config is None:
-        _bigquery_config = BigQueryConfig()
-    return _bigquery_config
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
 
 
 def get_bigquery_client() -> Client:
@@ -133,32 +379,47 @@ def validate_bigquery_setup() -> bool:
         return False
 
 
-# Environment-specific BigQuery settings
-BIGQUERY_SETTINGS = {
-    "dev": {
+# Environment-specific BigQuery settings, read-only after import
+BIGQUERY_SETTINGS: Mapping[str, Mapping[str, Any]] = MappingProxyType({
+    "dev": MappingProxyType({
         "max_retries": 3,
         "timeout": 30,
         "use_query_cache": False,
-        "dry_run": False
-    },
-    "staging": {
+        "dry_run": False,
+        "validation_ttl_seconds": 30,
+        "use_storage_api": False,
+        "storage_api_row_threshold": 10_000,
+        "max_in_flight_queries": 8,
+        "http_pool_maxsize": 32
+    }),
+    "staging": MappingProxyType({
         "max_retries": 5,
         "timeout": 60,
         "use_query_cache": True,
-        "dry_run": False
-    },
-    "prod": {
+        "dry_run": False,
+        "validation_ttl_seconds": 60,
+        "use_storage_api": True,
+        "storage_api_row_threshold": 10_000,
+        "max_in_flight_queries": 16,
+        "http_pool_maxsize": 64
+    }),
+    "prod": MappingProxyType({
         "max_retries": 10,
         "timeout": 300,
         "use_query_cache": True,
-        "dry_run": False
-    }
-}
+        "dry_run": False,
+        "validation_ttl_seconds": 300,
+        "use_storage_api": True,
+        "storage_api_row_threshold": 10_000,
+        "max_in_flight_queries": 32,
+        "http_pool_maxsize": 128
+    })
+})
 
 
-def get_bigquery_settings(environment: str = None) -> Dict[str, Any]:
-    """Get environment-specific BigQuery settings."""
+def get_bigquery_settings(environment: Optional[str] = None) -> Mapping[str, Any]:
+    """Get environment-specific BigQuery settings (read-only)."""
     if environment is None:
-        environment = os.getenv("ENVIRONMENT", "dev")
+        environment = env_snapshot().environment
     
     return BIGQUERY_SETTINGS.get(environment, BIGQUERY_SETTINGS["dev"])
@@ -5,91 +5,145 @@ Handles environment-based configuration, environment variables,
 and provides a centralized configuration interface.
 """
 
-import os
-from typing import Optional, Dict, Any
-from pydantic import BaseSettings, Field, validator
+from dataclasses import dataclass
 from functools import lru_cache
+from types import MappingProxyType
+from typing import Optional, Dict, Any, Mapping, Tuple
 
+from ._env import env_snapshot
 
-class Config(BaseSettings):
-    """Main application configuration."""
-    
-    # Environment
-    environment: str = Field(default="dev", env="ENVIRONMENT")
-    debug: bool = Field(default=False, env="DEBUG")
-    
-    # Google Cloud
-    project_id: str = Field(..., env="GOOGLE_CLOUD_PROJECT")
-    region: str = Field(default="us-central1", env="GOOGLE_CLOUD_REGION")
-    
-    # BigQuery
-    dataset_id: str = Field(default="bigquery_ai_hackathon", env="BIGQUERY_DATASET_ID")
-    location: str = Field(default="US", env="BIGQUERY_LOCATION")
-    
-    # Cloud Storage
-    bucket_name: str = Field(..., env="CLOUD_STORAGE_BUCKET")
-    
-    # API Configuration
-    api_host: str = Field(default="0.0.0.0", env="API_HOST")
-    api_port: int = Field(default=8080, env="API_PORT")
-    api_workers: int = Field(default=1, env="API_WORKERS")
-    
-    # Security
-    secret_key: str = Field(..., env="SECRET_KEY")
-    algorithm: str = Field(default="HS256", env="ALGORITHM")
-    access_token_expire_minutes: int = Field(default=30, env="ACCESS_TOKEN_EXPIRE_MINUTES")
-    
-    # Rate Limiting
-    rate_limit_requests: int = Field(default=100, env="RATE_LIMIT_REQUESTS")
-    rate_limit_window: int = Field(default=3600, env="RATE_LIMIT_WINDOW")
-    
-    # Logging
-    log_level: str = Field(default="INFO", env="LOG_LEVEL")
-    log_format: str = Field(default="json", env="LOG_FORMAT")
-    
-    # Monitoring
-    enable_metrics: bool = Field(default=True, env="ENABLE_METRICS")
-    metrics_port: int = Field(default=9090, env="METRICS_PORT")
-    
-    # BigQuery AI Models
-    default_text_model: str = Field(default="gemini-pro", env="DEFAULT_TEXT_MODEL")
-    default_embedding_model: str = Field(default="text-embedding-001", env="DEFAULT_EMBEDDING_MODEL")
-    default_forecast_model: str = Field(default="auto-arima", env="DEFAULT_FORECAST_MODEL")
-    
-    # Performance
-    max_concurrent_requests: int = Field(default=100, env="MAX_CONCURRENT_REQUESTS")
-    request_timeout: int = Field(default=300, env="REQUEST_TIMEOUT")
-    
-    @validator('environment')
-    def validate_environment(cls, v):
-        """Validate environment value."""
-        allowed = ['dev', 'staging', 'prod']
-        if v not in allowed:
-            raise ValueError(f'Environment must be one of: {allowed}')
-        return v
-    
-    @validator('log_level')
-    def validate_log_level(cls, v):
-        """Validate log level."""
-        allowed = ['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL']
-        if v.upper() not in allowed:
-            raise ValueError(f'Log level must be one of: {allowed}')
-        return v.upper()
-    
-    class Config:
-        env_file = ".env"
-        env_file_encoding = "utf-8"
-        case_sensitive = False
+# Allowed values for validated settings
+_ALLOWED_ENVIRONMENTS = frozenset({"dev", "staging", "prod"})
+_ALLOWED_LOG_LEVELS = frozenset({"DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"})
+
+# Settings that must be non-empty for the application to start
+_REQUIRED_FIELDS = ("project_id", "bucket_name", "secret_key")
+
+
+@lru_cache(maxsize=None)
+def _config_class():
+    """
+    Build the settings class on first use.
+    
+    pydantic and pydantic-settings are imported here rather than at module
+    level so callers that only need the environment constants below do not
+    pay for loading them.
+    """
+    from pydantic import Field, field_validator
+    from pydantic_settings import BaseSettings, SettingsConfigDict
+    
+    class Config(BaseSettings):
+        """Main application configuration."""
+        
+        model_config = SettingsConfigDict(
+            env_file=".env",
+            env_file_encoding="utf-8",
+            case_sensitive=False,
+            populate_by_name=True,
+            extra="ignore"
+        )
+        
+        # Environment
+        environment: str = Field(default="dev", validation_alias="ENVIRONMENT")
+        debug: bool = Field(default=False, validation_alias="DEBUG")
+        
+        # Google Cloud
+        project_id: str = Field(..., validation_alias="GOOGLE_CLOUD_PROJECT")
+        region: str = Field(default="us-central1", validation_alias="GOOGLE_CLOUD_REGION")
+        
+        # BigQuery
+        dataset_id: str = Field(default="bigquery_ai_hackathon", validation_alias="BIGQUERY_DATASET_ID")
+        location: str = Field(default="US", validation_alias="BIGQUERY_LOCATION")
+        
+        # Cloud Storage
+        bucket_name: str = Field(..., validation_alias="CLOUD_STORAGE_BUCKET")
+        
+        # API Configuration
+        api_host: str = Field(default="0.0.0.0", validation_alias="API_HOST")
+        api_port: int = Field(default=8080, validation_alias="API_PORT")
+        api_workers: int = Field(default=1, validation_alias="API_WORKERS")
+        
+        # Security
+        secret_key: str = Field(..., validation_alias="SECRET_KEY")
+        algorithm: str = Field(default="HS256", validation_alias="ALGORITHM")
+        access_token_expire_minutes: int = Field(default=30, validation_alias="ACCESS_TOKEN_EXPIRE_MINUTES")
+        
+        # Rate Limiting
+        rate_limit_requests: int = Field(default=100, validation_alias="RATE_LIMIT_REQUESTS")
+        rate_limit_window: int = Field(default=3600, validation_alias="RATE_LIMIT_WINDOW")
+        
+        # Logging
+        log_level: str = Field(default="INFO", validation_alias="LOG_LEVEL")
+        log_format: str = Field(default="json", validation_alias="LOG_FORMAT")
+        
+        # Monitoring
+        enable_metrics: bool = Field(default=True, validation_alias="ENABLE_METRICS")
+        metrics_port: int = Field(default=9090, validation_alias="METRICS_PORT")
+        
+        # BigQuery AI Models
+        default_text_model: str = Field(default="gemini-pro", validation_alias="DEFAULT_TEXT_MODEL")
+        default_embedding_model: str = Field(default="text-embedding-001", validation_alias="DEFAULT_EMBEDDING_MODEL")
+        default_forecast_model: str = Field(default="auto-arima", validation_alias="DEFAULT_FORECAST_MODEL")
+        
+        # Performance
+        max_concurrent_requests: int = Field(default=100, validation_alias="MAX_CONCURRENT_REQUESTS")
+        request_timeout: int = Field(default=300, validation_alias="REQUEST_TIMEOUT")
+        
+        # Response caching; a Redis URL adds a cache tier shared across workers
+        redis_url: Optional[str] = Field(default=None, validation_alias="REDIS_URL")
+        
+        @field_validator('environment')
+        @classmethod
+        def validate_environment(cls, v):
+            """Validate environment value."""
+            if v not in _ALLOWED_ENVIRONMENTS:
+                raise ValueError(f'Environment must be one of: {sorted(_ALLOWED_ENVIRONMENTS)}')
+            return v
+        
+        @field_validator('log_level')
+        @classmethod
+        def validate_log_level(cls, v):
+            """Validate log level."""
+            if v.upper() not in _ALLOWED_LOG_LEVELS:
+                raise ValueError(f'Log level must be one of: {sorted(_ALLOWED_LOG_LEVELS)}')
+            return v.upper()
+    
+    return Config
+
+
+def __getattr__(name):
+    """Resolve the ``Config`` class lazily on first attribute access."""
+    if name == "Config":
+        return _config_class()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 @lru_cache()
-def get_config() -> Config:
+def get_config() -> "Config":
     """Get cached configuration instance."""
-    return Config()
+    return _config_class()()
+
 
+# Environment-specific overrides applied on top of the base configuration
+_ENV_OVERRIDES: Mapping[str, Mapping[str, Any]] = MappingProxyType({
+    "dev": MappingProxyType({
+        "debug": True,
+        "log_level": "DEBUG",
+        "max_concurrent_requests": 10,
+    }),
+    "staging": MappingProxyType({}),
+    "prod": MappingProxyType({
+        "debug": False,
+        "log_level": "WARNING",
+        "max_concurrent_requests": 1000,
+        "enable_metrics": True,
+    }),
+})
 
-def get_environment_config() -> Dict[str, Any]:
-    """Get environment-specific configuration."""
+
+@lru_cache(maxsize=None)
+def get_environment_config() -> Mapping[str, Any]:
+    """Get environment-specific configuration (read-only, built once)."""
     config = get_config()
     
     base_config = {
@@ -101,48 +155,56 @@ def get_environment_config() -> Dict[str, Any]:
         "location": config.location,
         "bucket_name": config.bucket_name,
     }
+    base_config.update(_ENV_OVERRIDES.get(config.environment, {}))
+    
+    return MappingProxyType(base_config)
+
+
+@dataclass(frozen=True)
+class ValidationResult:
+    """Outcome of ``validate_config``; truthy when validation passed."""
     
-    # Environment-specific overrides
-    if config.environment == "dev":
-        base_config.update({
-            "debug": True,
-            "log_level": "DEBUG",
-            "max_concurrent_requests": 10,
-        })
-    elif config.environment == "prod":
-        base_config.update({
-            "debug": False,
-            "log_level": "WARNING",
-            "max_concurrent_requests": 1000,
-            "enable_metrics": True,
-        })
+    ok: bool
+    missing: Tuple[str, ...] = ()
+    error: Optional[str] = None
     
-    return base_config
+    def __bool__(self) -> bool:
+        return self.ok
 
 
-def validate_config() -> bool:
-    """Validate that all required configuration is present."""
+def validate_config(verbose: bool = False) -> ValidationResult:
+    """
+    Validate that all required configuration is present.
+    
+    Args:
+        verbose: Print a human-readable summary (for CLI use)
+        
+    Returns:
+        ValidationResult listing any missing required fields
+    """
     try:
         config = get_config()
-        required_fields = ['project_id', 'bucket_name', 'secret_key']
-        
-        for field in required_fields:
-            if not getattr(config, field):
-                print(f"ERROR: Missing required configuration: {field}")
-                return False
-        
-        print("✅ Configuration validation passed")
-        return True
-        
+        missing = tuple(field for field in _REQUIRED_FIELDS if not getattr(config, field))
+        result = ValidationResult(ok=not missing, missing=missing)
     except Exception as e:
-        print(f"ERROR: Configuration validation failed: {e}")
-        return False
+        result = ValidationResult(ok=False, error=str(e))
+    
+    if verbose:
+        if result.error:
+            print(f"ERROR: Configuration validation failed: {result.error}")
+        for field in result.missing:
+            print(f"ERROR: Missing required configuration: {field}")
+        if result.ok:
+            print("✅ Configuration validation passed")
+    
+    return result
 
 
 # Environment variables for easy access
-ENVIRONMENT = os.getenv("ENVIRONMENT", "dev")
-DEBUG = os.getenv("DEBUG", "false").lower() == "true"
-PROJECT_ID = os.getenv("GOOGLE_CLOUD_PROJECT")
-REGION = os.getenv("GOOGLE_CLOUD_REGION", "us-central1")
-DATASET_ID = os.getenv("BIGQUERY_DATASET_ID", "bigquery_ai_hackathon")
-BUCKET_NAME = os.getenv("CLOUD_STORAGE_BUCKET")
+_env = env_snapshot()
+ENVIRONMENT = _env.environment
+DEBUG = _env.debug
+PROJECT_ID = _env.project_id
+REGION = _env.region
+DATASET_ID = _env.dataset_id
+BUCKET_NAME = _env.bucket_name
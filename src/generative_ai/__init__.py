@@ -11,14 +11,33 @@ These functions enable building intelligent business applications and workflows
 directly within BigQuery.
 """
 
-from .text_generator import TextGenerator
-from .content_generator import ContentGenerator
-from .forecaster import Forecaster
-from .gemini_integration import GeminiIntegration
+import importlib
+
+# Public name -> submodule that defines it, resolved on first access
+_LAZY_IMPORTS = {
+    "TextGenerator": "text_generator",
+    "ContentGenerator": "content_generator",
+    "Forecaster": "forecaster",
+    "GeminiIntegration": "gemini_integration",
+}
 
 __all__ = [
     "TextGenerator",
-    "ContentGenerator", 
+    "ContentGenerator",
     "Forecaster",
     "GeminiIntegration"
 ]
+
+
+def __getattr__(name):
+    """Lazily import generator classes on first attribute access (PEP 562)."""
+    if name in _LAZY_IMPORTS:
+        module = importlib.import_module(f".{_LAZY_IMPORTS[name]}", __name__)
+        value = getattr(module, name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(__all__)
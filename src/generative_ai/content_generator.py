@@ -5,24 +5,292 @@ This module provides a Python interface to BigQuery's AI.GENERATE function,
 enabling free-form text generation and structured data generation based on schemas.
 """
 
+import asyncio
+import numbers
+import random
+import threading
+import time
 import uuid
-from typing import List, Dict, Any, Optional, Union
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Callable, List, Dict, Any, Iterator, Optional, Tuple, Union, Set, Coroutine
+import fastjsonschema
+import orjson
 from google.cloud import bigquery
 from google.cloud.bigquery import Client
+from google.api_core import exceptions as api_exceptions
 import structlog
-from ..config.bigquery_config import get_bigquery_client, get_bigquery_config
+from ..config.bigquery_config import BigQueryConfig, get_bigquery_client, get_bigquery_config, get_bigquery_settings
+from ..utils import ResponseCache, SemanticResponseCache, TemplateCache, WriteQueue, make_cache_key
 
 logger = structlog.get_logger(__name__)
 
+# Columns of the generated_content table written by ContentGenerator, in
+# Storage Write API field order
+_GENERATED_CONTENT_COLUMNS = (
+    'id',
+    'content_type',
+    'input_data',
+    'generated_content',
+    'model_name',
+    'model_parameters',
+    'status',
+    'created_at',
+    'updated_at'
+)
+
+# TIMESTAMP columns, written as microseconds since the epoch
+_GENERATED_CONTENT_TIMESTAMPS = frozenset({'created_at', 'updated_at'})
+
+
+def _truncate(text: str, limit: int = 100) -> str:
+    """Shorten ``text`` to ``limit`` characters for log output."""
+    return text if len(text) <= limit else text[:limit] + "..."
+
+
+def _to_json(value: Any) -> str:
+    """Serialize ``value`` to JSON text for STRING columns and query parameters."""
+    return orjson.dumps(
+        value,
+        default=str,
+        option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+    ).decode()
+
+
+@lru_cache(maxsize=1)
+def _generated_content_row_type():
+    """Build the proto2 descriptor and message class for generated_content rows."""
+    from google.protobuf import descriptor_pb2, descriptor_pool, message_factory
+    
+    field_type = descriptor_pb2.FieldDescriptorProto
+    descriptor_proto = descriptor_pb2.DescriptorProto(name="GeneratedContentRow")
+    for number, column in enumerate(_GENERATED_CONTENT_COLUMNS, start=1):
+        descriptor_proto.field.add(
+            name=column,
+            number=number,
+            # JSON columns are written as their text
+            type=(field_type.TYPE_INT64 if column in _GENERATED_CONTENT_TIMESTAMPS
+                  else field_type.TYPE_STRING),
+            label=field_type.LABEL_OPTIONAL
+        )
+    
+    pool = descriptor_pool.DescriptorPool()
+    pool.Add(descriptor_pb2.FileDescriptorProto(
+        name="generated_content_row.proto",
+        message_type=[descriptor_proto]
+    ))
+    message_class = message_factory.GetMessageClass(
+        pool.FindMessageTypeByName("GeneratedContentRow")
+    )
+    return descriptor_proto, message_class
+
+
+class _GeneratedContentWriter:
+    """
+    Writes generation rows to the generated_content table.
+    
+    Holds the Storage Write API stream on behalf of a ContentGenerator so
+    that its write queue, and the finalizer closing it, do not keep the
+    generator alive.
+    """
+    
+    def __init__(self, client: Client, config: BigQueryConfig, table_ref: bigquery.TableReference):
+        """Initialize the writer for ``table_ref``; the stream opens on first append."""
+        self.client = client
+        self.config = config
+        self._table_ref = table_ref
+        self._append_stream = None
+        self._log = logger.bind(component="ContentGenerator")
+    
+    def append_rows(self, rows: List[Dict[str, Any]]) -> None:
+        """
+        Write a batch of generation rows to the generated_content table.
+        
+        Rows go through the Storage Write API default stream, which commits
+        appends immediately; without google-cloud-bigquery-storage they fall
+        back to a single ``insert_rows_json`` call.
+        """
+        write_client = self.config.get_bqstorage_write_client()
+        if write_client is None:
+            errors = self.client.insert_rows_json(self._table_ref, rows)
+            if errors:
+                self._log.warning("Failed to store generations in BigQuery",
+                                 num_rows=len(rows),
+                                 errors=errors)
+                return
+        else:
+            from google.cloud.bigquery_storage_v1 import types, writer
+            
+            descriptor_proto, message_class = _generated_content_row_type()
+            if self._append_stream is None:
+                table_path = write_client.table_path(
+                    self._table_ref.project, self._table_ref.dataset_id, self._table_ref.table_id
+                )
+                template = types.AppendRowsRequest(
+                    write_stream=f"{table_path}/streams/_default",
+                    proto_rows=types.AppendRowsRequest.ProtoData(
+                        writer_schema=types.ProtoSchema(proto_descriptor=descriptor_proto)
+                    )
+                )
+                self._append_stream = writer.AppendRowsStream(write_client, template)
+            
+            request = types.AppendRowsRequest(
+                proto_rows=types.AppendRowsRequest.ProtoData(
+                    rows=types.ProtoRows(serialized_rows=[
+                        message_class(**self._encode_proto_row(row)).SerializeToString()
+                        for row in rows
+                    ])
+                )
+            )
+            try:
+                self._append_stream.send(request).result()
+            except Exception:
+                # Reopen the stream on the next flush
+                self._append_stream.close()
+                self._append_stream = None
+                raise
+        
+        self._log.info("Generations stored in BigQuery successfully",
+                      num_rows=len(rows))
+    
+    @staticmethod
+    def _encode_proto_row(row: Dict[str, Any]) -> Dict[str, Any]:
+        """Convert a generation row to GeneratedContentRow field values."""
+        fields = {column: value for column, value in row.items() if value is not None}
+        for column in _GENERATED_CONTENT_TIMESTAMPS:
+            timestamp = datetime.fromisoformat(fields[column])
+            fields[column] = int(timestamp.timestamp() * 1_000_000)
+        return fields
+    
+    def close(self) -> None:
+        """Close the Storage Write stream, if open."""
+        if self._append_stream is not None:
+            self._append_stream.close()
+            self._append_stream = None
+
 
 class ContentGenerator:
     """BigQuery AI.GENERATE implementation for content generation."""
     
-    def __init__(self, client: Optional[Client] = None):
-        """Initialize ContentGenerator with BigQuery client."""
+    # Concurrent generate_content_many calls arriving within this window
+    # are merged into a single batch query
+    COALESCE_WINDOW_SECONDS = 0.05
+    
+    # Page size for streamed batch results
+    RESULT_PAGE_SIZE = 1000
+    
+    # Generation records are written in the background in batches of up to
+    # STORE_BATCH_SIZE rows, or whatever arrived within STORE_FLUSH_SECONDS
+    STORE_BATCH_SIZE = 500
+    STORE_FLUSH_SECONDS = 0.1
+    
+    # Throttling errors (HTTP 429/503) retried with exponential backoff
+    RETRYABLE_ERRORS = (api_exceptions.TooManyRequests, api_exceptions.ServiceUnavailable)
+    RETRY_BASE_DELAY_SECONDS = 1.0
+    RETRY_MAX_DELAY_SECONDS = 32.0
+    
+    # Registered system prompts kept per generator (least recently used evicted)
+    SYSTEM_PROMPT_CACHE_SIZE = 128
+    
+    # Compiled fastjsonschema validators keyed by schema hash; None marks a
+    # schema fastjsonschema cannot compile
+    _compiled_validators: Dict[str, Optional[Callable[[Any], Any]]] = {}
+    
+    # Python types accepted for each JSON schema type; numbers.Integral and
+    # numbers.Real also cover numpy scalars
+    _JSON_TYPES: Dict[str, Tuple[type, ...]] = {
+        'string': (str,),
+        'integer': (numbers.Integral,),
+        'number': (numbers.Real,),
+        'boolean': (bool,),
+        'array': (list, tuple),
+        'object': (dict,)
+    }
+    
+    def __init__(
+        self,
+        client: Optional[Client] = None,
+        cache: Optional[ResponseCache] = None,
+        semantic_cache: Optional[SemanticResponseCache] = None,
+        template_cache: Optional[TemplateCache] = None
+    ):
+        """
+        Initialize ContentGenerator with BigQuery client.
+        
+        Args:
+            client: BigQuery client; defaults to the shared client
+            cache: Exact-match response cache for deterministic generations
+            semantic_cache: Optional near-match cache consulted on exact misses
+            template_cache: Optional slot-substitution cache for structured
+                generations whose prompts differ only in a few words
+        """
         self.client = client or get_bigquery_client()
         self.config = get_bigquery_config()
+        self._log = logger.bind(component="ContentGenerator")
+        self._generated_content_table = self.config.get_full_table_id('generated_content')
+        self._table_ref = bigquery.TableReference.from_string(self._generated_content_table)
+        self._cache = cache if cache is not None else ResponseCache()
+        self._semantic_cache = semantic_cache
+        self._template_cache = template_cache
+        self._system_prompts = ResponseCache(
+            max_size=self.SYSTEM_PROMPT_CACHE_SIZE,
+            ttl_seconds=float('inf')
+        )
+        self._pending_batches: Dict[str, Tuple[List[str], "asyncio.Future"]] = {}
+        # Running batch tasks, referenced until done so they are not garbage collected
+        self._batch_tasks: Set["asyncio.Task"] = set()
+        # Caps in-flight queries across all concurrent callers of this generator
+        self._max_in_flight = get_bigquery_settings()["max_in_flight_queries"]
+        self._query_slots = threading.BoundedSemaphore(self._max_in_flight)
+        self._writer = _GeneratedContentWriter(self.client, self.config, self._table_ref)
+        self._write_queue = WriteQueue(
+            self._writer.append_rows,
+            max_batch=self.STORE_BATCH_SIZE,
+            max_wait_seconds=self.STORE_FLUSH_SECONDS,
+            name="generated-content-writer"
+        )
+        # Closes the queue and stream when the generator is garbage collected
+        # or at exit; it holds the queue and writer, not the generator
+        self._finalizer = weakref.finalize(self, self._close_writer, self._write_queue, self._writer)
+    
+    def flush(self) -> None:
+        """Wait for queued generation records to be written."""
+        self._write_queue.flush()
+    
+    def close(self) -> None:
+        """Flush queued generation records and close the Storage Write stream."""
+        self._finalizer()
+    
+    @staticmethod
+    def _close_writer(write_queue: WriteQueue, writer: _GeneratedContentWriter) -> None:
+        """Flush and stop ``write_queue``, then close ``writer``'s stream."""
+        write_queue.close()
+        writer.close()
         
+    def register_system_prompt(self, text: str) -> str:
+        """
+        Register a shared system prompt and return its ID.
+        
+        Generations referencing the ID send the system prompt as a separate
+        query parameter placed byte-identically ahead of the prompt, so the
+        model's implicit prefix cache can reuse it across calls.
+        
+        Args:
+            text: System prompt text shared by many generations
+            
+        Returns:
+            ID to pass as ``system_prompt_id`` to ``generate_content``
+        """
+        prefix_id = make_cache_key(system_prompt=text)
+        if self._system_prompts.get(prefix_id) is None:
+            self._system_prompts.set(prefix_id, text)
+            self._log.info("System prompt registered",
+                          system_prompt_id=prefix_id,
+                          system_prompt_length=len(text))
+        return prefix_id
+    
     def generate_content(
         self,
         prompt: str,
@@ -31,6 +299,7 @@ class ContentGenerator:
         max_tokens: int = 1024,
         top_p: float = 0.9,
         top_k: int = 40,
+        system_prompt_id: Optional[str] = None,
         **kwargs
     ) -> Dict[str, Any]:
         """
@@ -43,18 +312,48 @@ class ContentGenerator:
             max_tokens: Maximum number of tokens to generate
             top_p: Nucleus sampling parameter
             top_k: Top-k sampling parameter
+            system_prompt_id: ID from ``register_system_prompt`` to prefix the prompt with
             **kwargs: Additional model-specific parameters
             
         Returns:
             Dictionary containing generated content and metadata
         """
         try:
+            system_prompt = None
+            if system_prompt_id is not None:
+                system_prompt = self._system_prompts.get(system_prompt_id)
+                if system_prompt is None:
+                    raise ValueError(f"Unknown system prompt ID: {system_prompt_id}")
+            
+            # Only deterministic generations are safe to serve from cache
+            cache_key = None
+            if temperature == 0.0:
+                signature = make_cache_key(
+                    system_prompt_id=system_prompt_id,
+                    model=model_name,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    top_p=top_p,
+                    top_k=top_k,
+                    **kwargs
+                )
+                cache_key = make_cache_key(signature=signature, prompt=prompt)
+                cached = self._cache.get(cache_key)
+                if cached is None and self._semantic_cache is not None:
+                    cached = self._semantic_cache.get(signature, prompt)
+                if cached is not None:
+                    self._log.info("Serving AI.GENERATE result from cache",
+                                  generation_id=cached['id'],
+                                  model=model_name)
+                    return {**cached, 'metadata': {**cached['metadata'], 'cache_hit': True}}
+            
             # Create unique ID for this generation
-            generation_id = str(uuid.uuid4())
+            generation_id = uuid.uuid4().hex
             
             # Build the AI.GENERATE query
-            query = self._build_ai_generate_query(
+            query, job_config = self._build_ai_generate_query(
                 prompt=prompt,
+                system_prompt=system_prompt,
                 model_name=model_name,
                 temperature=temperature,
                 max_tokens=max_tokens,
@@ -63,27 +362,28 @@ class ContentGenerator:
                 **kwargs
             )
             
-            logger.info("Executing AI.GENERATE query", 
-                       generation_id=generation_id,
-                       model=model_name,
-                       prompt_length=len(prompt))
+            self._log.info("Executing AI.GENERATE query", 
+                          generation_id=generation_id,
+                          model=model_name,
+                          prompt_length=len(prompt))
             
             # Execute the query
-            query_job = self.client.query(query)
-            results = list(query_job.result())
+            query_job = self.client.query(query, job_config=job_config)
+            first_row = next(iter(query_job.result()), None)
             
-            if not results:
+            if first_row is None:
                 raise ValueError("No results returned from AI.GENERATE")
             
             # Extract the generated content
-            generated_content = results[0].get('ai_generate_result', '')
+            generated_content = first_row.get('ai_generate_result', '')
             
             # Store the generation in BigQuery
-            self._store_generation(
+            self._store(
                 generation_id=generation_id,
                 prompt=prompt,
-                generated_content=generated_content,
+                content=generated_content,
                 model_name=model_name,
+                generation_type='ai_generate',
                 parameters={
                     'temperature': temperature,
                     'max_tokens': max_tokens,
@@ -93,11 +393,11 @@ class ContentGenerator:
                 }
             )
             
-            logger.info("Content generation completed successfully",
-                       generation_id=generation_id,
-                       output_length=len(generated_content))
+            self._log.info("Content generation completed successfully",
+                          generation_id=generation_id,
+                          output_length=len(generated_content))
             
-            return {
+            result = {
                 'id': generation_id,
                 'generated_content': generated_content,
                 'model_name': model_name,
@@ -111,18 +411,300 @@ class ContentGenerator:
                 'metadata': {
                     'prompt_length': len(prompt),
                     'output_length': len(generated_content),
-                    'timestamp': results[0].get('timestamp', ''),
-                    'model_metadata': results[0].get('ai_generate_metadata', {})
+                    'timestamp': self._job_timestamp(query_job),
+                    'model_metadata': first_row.get('ai_generate_metadata', {})
                 }
             }
             
+            if cache_key is not None:
+                self._cache.set(cache_key, result)
+                if self._semantic_cache is not None:
+                    self._semantic_cache.set(signature, prompt, result)
+            
+            return result
+            
         except Exception as e:
-            logger.error("Content generation failed",
-                        generation_id=generation_id if 'generation_id' in locals() else None,
-                        error=str(e),
-                        prompt=prompt[:100] + "..." if len(prompt) > 100 else prompt)
+            self._log.error("Content generation failed",
+                           generation_id=generation_id if 'generation_id' in locals() else None,
+                           error=str(e),
+                           prompt=_truncate(prompt))
             raise
     
+    def generate_content_batch(
+        self,
+        prompts: List[str],
+        model_name: str = "gemini-pro",
+        temperature: float = 0.7,
+        max_tokens: int = 1024,
+        top_p: float = 0.9,
+        top_k: int = 40,
+        **kwargs
+    ) -> List[Dict[str, Any]]:
+        """
+        Generate content for multiple prompts with a single AI.GENERATE query.
+        
+        Args:
+            prompts: List of input prompts
+            model_name: The model to use for generation
+            temperature: Controls randomness (0.0 = deterministic, 1.0 = random)
+            max_tokens: Maximum number of tokens to generate
+            top_p: Nucleus sampling parameter
+            top_k: Top-k sampling parameter
+            **kwargs: Additional model-specific parameters
+            
+        Returns:
+            List of generation results in the same order as ``prompts``
+        """
+        return list(self.iter_content_batch(
+            prompts,
+            model_name=model_name,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            top_p=top_p,
+            top_k=top_k,
+            **kwargs
+        ))
+    
+    def iter_content_batch(
+        self,
+        prompts: List[str],
+        model_name: str = "gemini-pro",
+        temperature: float = 0.7,
+        max_tokens: int = 1024,
+        top_p: float = 0.9,
+        top_k: int = 40,
+        **kwargs
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Stream batch generation results as BigQuery returns them.
+        
+        Rows are read page by page instead of being materialized, and the
+        generation records are handed to the background write queue.
+        
+        Yields:
+            Generation results in the same order as ``prompts``
+        """
+        if not prompts:
+            return
+        
+        parameters = {
+            'temperature': temperature,
+            'max_tokens': max_tokens,
+            'top_p': top_p,
+            'top_k': top_k,
+            **kwargs
+        }
+        
+        try:
+            query, job_config = self._build_batch_ai_generate_query(
+                prompts=prompts,
+                model_name=model_name,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                top_p=top_p,
+                top_k=top_k
+            )
+            
+            self._log.info("Executing batch AI.GENERATE query",
+                          model=model_name,
+                          num_prompts=len(prompts))
+            
+            query_job = self.client.query(query, job_config=job_config)
+            rows = query_job.result(page_size=self.RESULT_PAGE_SIZE)
+            
+        except Exception as e:
+            self._log.error("Batch content generation failed",
+                           error=str(e),
+                           num_prompts=len(prompts))
+            raise
+        
+        timestamp = self._job_timestamp(query_job)
+        successful = 0
+        next_offset = 0
+        
+        def failed(offset: int) -> Dict[str, Any]:
+            return {
+                'error': "No result returned from AI.GENERATE",
+                'prompt': prompts[offset],
+                'status': 'failed'
+            }
+        
+        # Rows arrive ordered by offset; prompts without a row are reported as failed
+        for row in rows:
+            offset = row['prompt_offset']
+            while next_offset < offset:
+                yield failed(next_offset)
+                next_offset += 1
+            
+            prompt = prompts[offset]
+            generation_id = uuid.uuid4().hex
+            generated_content = row.get('ai_generate_result', '')
+            
+            self._store(
+                generation_id=generation_id,
+                prompt=prompt,
+                content=generated_content,
+                model_name=model_name,
+                parameters=parameters,
+                generation_type='ai_generate'
+            )
+            
+            successful += 1
+            next_offset = offset + 1
+            yield {
+                'id': generation_id,
+                'generated_content': generated_content,
+                'model_name': model_name,
+                'parameters': parameters,
+                'metadata': {
+                    'prompt_length': len(prompt),
+                    'output_length': len(generated_content),
+                    'timestamp': timestamp,
+                    'model_metadata': row.get('ai_generate_metadata', {})
+                }
+            }
+        
+        while next_offset < len(prompts):
+            yield failed(next_offset)
+            next_offset += 1
+        
+        self._log.info("Batch content generation completed",
+                      num_prompts=len(prompts),
+                      successful=successful)
+    
+    async def generate_content_many(
+        self,
+        prompts: List[str],
+        model_name: str = "gemini-pro",
+        temperature: float = 0.7,
+        max_tokens: int = 1024,
+        top_p: float = 0.9,
+        top_k: int = 40,
+        **kwargs
+    ) -> List[Dict[str, Any]]:
+        """
+        Generate content for prompts, coalescing concurrent callers.
+        
+        Calls with identical generation parameters that arrive within
+        ``COALESCE_WINDOW_SECONDS`` of each other are merged into a single
+        ``generate_content_batch`` query.
+        
+        Returns:
+            List of generation results in the same order as ``prompts``
+        """
+        params = {
+            'model_name': model_name,
+            'temperature': temperature,
+            'max_tokens': max_tokens,
+            'top_p': top_p,
+            'top_k': top_k,
+            **kwargs
+        }
+        key = make_cache_key(**params)
+        loop = asyncio.get_running_loop()
+        
+        pending = self._pending_batches.get(key)
+        if pending is None:
+            pending = ([], loop.create_future())
+            self._pending_batches[key] = pending
+            loop.call_later(
+                self.COALESCE_WINDOW_SECONDS,
+                lambda: self._start_batch_task(self._flush_pending_batch(key, params))
+            )
+        
+        batch_prompts, future = pending
+        start = len(batch_prompts)
+        batch_prompts.extend(prompts)
+        
+        results = await future
+        return results[start:start + len(prompts)]
+    
+    def _start_batch_task(self, coro: Coroutine[Any, Any, None]) -> None:
+        """Run ``coro`` as a task, keeping a reference until it finishes."""
+        task = asyncio.get_running_loop().create_task(coro)
+        self._batch_tasks.add(task)
+        task.add_done_callback(self._batch_tasks.discard)
+    
+    async def _flush_pending_batch(self, key: str, params: Dict[str, Any]) -> None:
+        """Run a coalesced batch and hand the results to every waiting caller."""
+        prompts, future = self._pending_batches.pop(key)
+        try:
+            results = await asyncio.to_thread(self.generate_content_batch, prompts, **params)
+        except Exception as e:
+            future.set_exception(e)
+        else:
+            future.set_result(results)
+    
+    def generate_content_concurrent(
+        self,
+        prompts: List[str],
+        max_in_flight: Optional[int] = None,
+        **kwargs
+    ) -> List[Dict[str, Any]]:
+        """
+        Generate content for multiple prompts with concurrent AI.GENERATE queries.
+        
+        Each prompt runs as its own ``generate_content`` call. At most
+        ``max_in_flight`` queries from this call, and at most the
+        environment's ``max_in_flight_queries`` across the generator, run at
+        once; throttled queries are retried with exponential backoff.
+        
+        Args:
+            prompts: List of input prompts
+            max_in_flight: Worker threads for this call; defaults to the
+                environment's ``max_in_flight_queries`` setting
+            **kwargs: Generation parameters passed to ``generate_content``
+            
+        Returns:
+            List of generation results in the same order as ``prompts``
+        """
+        if not prompts:
+            return []
+        
+        workers = min(max_in_flight or self._max_in_flight, len(prompts))
+        self._log.info("Executing concurrent AI.GENERATE queries",
+                      num_prompts=len(prompts),
+                      max_in_flight=workers)
+        
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(
+                lambda prompt: self._generate_with_backoff(prompt, **kwargs),
+                prompts
+            ))
+        
+        self._log.info("Concurrent content generation completed",
+                      num_prompts=len(prompts),
+                      successful=sum(1 for result in results if result.get('status') != 'failed'))
+        return results
+    
+    def _generate_with_backoff(self, prompt: str, **kwargs) -> Dict[str, Any]:
+        """Run ``generate_content`` under the query semaphore, retrying throttling errors."""
+        max_retries = get_bigquery_settings()["max_retries"]
+        for attempt in range(max_retries + 1):
+            try:
+                with self._query_slots:
+                    return self.generate_content(prompt, **kwargs)
+            except self.RETRYABLE_ERRORS as e:
+                if attempt == max_retries:
+                    error = e
+                    break
+                delay = min(self.RETRY_BASE_DELAY_SECONDS * 2 ** attempt, self.RETRY_MAX_DELAY_SECONDS)
+                delay *= random.uniform(0.5, 1.0)
+                self._log.warning("AI.GENERATE query throttled, backing off",
+                                 attempt=attempt + 1,
+                                 delay_seconds=round(delay, 2),
+                                 error=str(e))
+                time.sleep(delay)
+            except Exception as e:
+                error = e
+                break
+        
+        return {
+            'error': str(error),
+            'prompt': prompt,
+            'status': 'failed'
+        }
+    
     def generate_structured_content(
         self,
         prompt: str,
@@ -145,46 +727,85 @@ class ContentGenerator:
             Dictionary containing structured content and metadata
         """
         try:
+            # Structurally identical prompts for the same schema can be served
+            # by substituting the differing words into a cached response
+            template_key = None
+            if self._template_cache is not None:
+                template_key = make_cache_key(
+                    schema=schema,
+                    model=model_name,
+                    temperature=temperature,
+                    **kwargs
+                )
+                structured_content = self._template_cache.get(template_key, prompt)
+                if structured_content is not None:
+                    generation_id = uuid.uuid4().hex
+                    schema_compliance = self._validate_schema_compliance(structured_content, schema)
+                    self._log.info("Serving structured AI.GENERATE result from template cache",
+                                  generation_id=generation_id,
+                                  model=model_name)
+                    return {
+                        'id': generation_id,
+                        'structured_content': structured_content,
+                        'schema': schema,
+                        'model_name': model_name,
+                        'parameters': {'temperature': temperature, **kwargs},
+                        'metadata': {
+                            'prompt_length': len(prompt),
+                            'schema_compliance': schema_compliance,
+                            'timestamp': '',
+                            'model_metadata': {},
+                            'cache_hit': True
+                        }
+                    }
+            
             # Create unique ID for this generation
-            generation_id = str(uuid.uuid4())
+            generation_id = uuid.uuid4().hex
             
             # Build the AI.GENERATE query with schema
-            query = self._build_structured_ai_generate_query(
+            # Serialized once for both the query parameter and the stored row
+            schema_json = _to_json(schema)
+            query, job_config = self._build_structured_ai_generate_query(
                 prompt=prompt,
-                schema=schema,
+                schema_json=schema_json,
                 model_name=model_name,
                 temperature=temperature,
                 **kwargs
             )
             
-            logger.info("Executing structured AI.GENERATE query", 
-                       generation_id=generation_id,
-                       model=model_name,
-                       schema_keys=list(schema.keys()))
+            self._log.info("Executing structured AI.GENERATE query", 
+                          generation_id=generation_id,
+                          model=model_name,
+                          schema_keys=list(schema.keys()))
             
             # Execute the query
-            query_job = self.client.query(query)
-            results = list(query_job.result())
+            query_job = self.client.query(query, job_config=job_config)
+            first_row = next(iter(query_job.result()), None)
             
-            if not results:
+            if first_row is None:
                 raise ValueError("No results returned from structured AI.GENERATE")
             
             # Extract the structured content
-            structured_content = results[0].get('ai_generate_result', {})
+            structured_content = first_row.get('ai_generate_result', {})
+            
+            if template_key is not None:
+                self._template_cache.set(template_key, prompt, structured_content)
             
             # Store the generation in BigQuery
-            self._store_structured_generation(
+            self._store(
                 generation_id=generation_id,
                 prompt=prompt,
-                structured_content=structured_content,
-                schema=schema,
+                content=structured_content,
                 model_name=model_name,
-                parameters={'temperature': temperature, **kwargs}
+                parameters={'temperature': temperature, **kwargs},
+                generation_type='ai_generate_structured',
+                schema=schema
             )
             
-            logger.info("Structured content generation completed successfully",
-                       generation_id=generation_id,
-                       schema_compliance=self._validate_schema_compliance(structured_content, schema))
+            schema_compliance = self._validate_schema_compliance(structured_content, schema)
+            self._log.info("Structured content generation completed successfully",
+                          generation_id=generation_id,
+                          schema_compliance=schema_compliance)
             
             return {
                 'id': generation_id,
@@ -194,17 +815,17 @@ class ContentGenerator:
                 'parameters': {'temperature': temperature, **kwargs},
                 'metadata': {
                     'prompt_length': len(prompt),
-                    'schema_compliance': self._validate_schema_compliance(structured_content, schema),
-                    'timestamp': results[0].get('timestamp', ''),
-                    'model_metadata': results[0].get('ai_generate_metadata', {})
+                    'schema_compliance': schema_compliance,
+                    'timestamp': self._job_timestamp(query_job),
+                    'model_metadata': first_row.get('ai_generate_metadata', {})
                 }
             }
             
         except Exception as e:
-            logger.error("Structured content generation failed",
-                        generation_id=generation_id if 'generation_id' in locals() else None,
-                        error=str(e),
-                        prompt=prompt[:100] + "..." if len(prompt) > 100 else prompt)
+            self._log.error("Structured content generation failed",
+                           generation_id=generation_id if 'generation_id' in locals() else None,
+                           error=str(e),
+                           prompt=_truncate(prompt))
             raise
     
     def _build_ai_generate_query(
@@ -215,173 +836,234 @@ class ContentGenerator:
         max_tokens: int,
         top_p: float,
         top_k: int,
+        system_prompt: Optional[str] = None,
         **kwargs
-    ) -> str:
-        """Build the AI.GENERATE SQL query."""
-        query = f"""
+    ) -> Tuple[str, bigquery.QueryJobConfig]:
+        """
+        Build the AI.GENERATE SQL query.
+        
+        The SQL text is constant and all inputs are bound as query
+        parameters, so prompts cannot break out of the query and identical
+        requests can be served from the BigQuery results cache. A system
+        prompt is bound separately and concatenated ahead of the prompt.
+        """
+        query = """
         SELECT 
             AI.GENERATE(
-                '{prompt}',
-                '{model_name}',
+                CONCAT(@system_prompt, @prompt),
+                @model_name,
                 STRUCT(
-                    {temperature} as temperature,
-                    {max_tokens} as max_tokens,
-                    {top_p} as top_p,
-                    {top_k} as top_k
+                    @temperature as temperature,
+                    @max_tokens as max_tokens,
+                    @top_p as top_p,
+                    @top_k as top_k
                 )
             ) as ai_generate_result,
-            CURRENT_TIMESTAMP() as timestamp,
             AI.GENERATE_METADATA() as ai_generate_metadata
         """
-        return query
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[
+                bigquery.ScalarQueryParameter('prompt', 'STRING', prompt),
+                bigquery.ScalarQueryParameter(
+                    'system_prompt', 'STRING', f"{system_prompt}\n\n" if system_prompt else ""
+                ),
+                bigquery.ScalarQueryParameter('model_name', 'STRING', model_name),
+                bigquery.ScalarQueryParameter('temperature', 'FLOAT64', temperature),
+                bigquery.ScalarQueryParameter('max_tokens', 'INT64', max_tokens),
+                bigquery.ScalarQueryParameter('top_p', 'FLOAT64', top_p),
+                bigquery.ScalarQueryParameter('top_k', 'INT64', top_k)
+            ],
+            use_query_cache=True
+        )
+        return query, job_config
     
-    def _build_structured_ai_generate_query(
+    def _build_batch_ai_generate_query(
         self,
-        prompt: str,
-        schema: Dict[str, Any],
+        prompts: List[str],
         model_name: str,
         temperature: float,
-        **kwargs
-    ) -> str:
-        """Build the AI.GENERATE SQL query with schema."""
-        # Convert schema to JSON string for the query
-        import json
-        schema_json = json.dumps(schema)
+        max_tokens: int,
+        top_p: float,
+        top_k: int
+    ) -> Tuple[str, bigquery.QueryJobConfig]:
+        """
+        Build a single AI.GENERATE query over an array of prompts.
         
-        query = f"""
+        Like the single-prompt query it avoids CURRENT_TIMESTAMP(), so a
+        repeated batch can be served from the BigQuery results cache.
+        """
+        query = """
         SELECT 
+            prompt_offset,
             AI.GENERATE(
-                '{prompt}',
-                '{model_name}',
+                prompt,
+                @model_name,
                 STRUCT(
-                    {temperature} as temperature
-                ),
-                '{schema_json}' as schema
+                    @temperature as temperature,
+                    @max_tokens as max_tokens,
+                    @top_p as top_p,
+                    @top_k as top_k
+                )
             ) as ai_generate_result,
-            CURRENT_TIMESTAMP() as timestamp,
             AI.GENERATE_METADATA() as ai_generate_metadata
+        FROM UNNEST(@prompts) AS prompt WITH OFFSET AS prompt_offset
+        ORDER BY prompt_offset
         """
-        return query
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[
+                bigquery.ArrayQueryParameter('prompts', 'STRING', prompts),
+                bigquery.ScalarQueryParameter('model_name', 'STRING', model_name),
+                bigquery.ScalarQueryParameter('temperature', 'FLOAT64', temperature),
+                bigquery.ScalarQueryParameter('max_tokens', 'INT64', max_tokens),
+                bigquery.ScalarQueryParameter('top_p', 'FLOAT64', top_p),
+                bigquery.ScalarQueryParameter('top_k', 'INT64', top_k)
+            ],
+            use_query_cache=True
+        )
+        return query, job_config
     
-    def _store_generation(
+    def _build_structured_ai_generate_query(
         self,
-        generation_id: str,
         prompt: str,
-        generated_content: str,
+        schema_json: str,
         model_name: str,
-        parameters: Dict[str, Any]
-    ) -> None:
-        """Store the generation result in BigQuery."""
-        try:
-            table_id = f"{self.config['project_id']}.{self.config['dataset_id']}.generated_content"
-            
-            # Prepare the row data
-            row = {
-                'generation_id': generation_id,
-                'prompt': prompt,
-                'generated_content': generated_content,
-                'model_name': model_name,
-                'parameters': str(parameters),
-                'generation_type': 'ai_generate',
-                'timestamp': bigquery.ScalarQueryParameter('timestamp', 'TIMESTAMP', None)
-            }
-            
-            # Insert the row
-            errors = self.client.insert_rows_json(table_id, [row])
-            if errors:
-                logger.warning("Failed to store generation in BigQuery",
-                              generation_id=generation_id,
-                              errors=errors)
-            else:
-                logger.info("Generation stored in BigQuery successfully",
-                           generation_id=generation_id)
-                
-        except Exception as e:
-            logger.warning("Failed to store generation in BigQuery",
-                          generation_id=generation_id,
-                          error=str(e))
+        temperature: float,
+        **kwargs
+    ) -> Tuple[str, bigquery.QueryJobConfig]:
+        """Build the parameterized AI.GENERATE SQL query with a JSON schema."""
+        query = """
+        SELECT 
+            AI.GENERATE(
+                @prompt,
+                @model_name,
+                STRUCT(
+                    @temperature as temperature
+                ),
+                @schema as schema
+            ) as ai_generate_result,
+            AI.GENERATE_METADATA() as ai_generate_metadata
+        """
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[
+                bigquery.ScalarQueryParameter('prompt', 'STRING', prompt),
+                bigquery.ScalarQueryParameter('model_name', 'STRING', model_name),
+                bigquery.ScalarQueryParameter('temperature', 'FLOAT64', temperature),
+                bigquery.ScalarQueryParameter('schema', 'STRING', schema_json)
+            ],
+            use_query_cache=True
+        )
+        return query, job_config
+    
+    @staticmethod
+    def _job_timestamp(query_job: bigquery.QueryJob) -> str:
+        """
+        Get the completion time of a query job as an ISO string.
+        
+        The AI.GENERATE queries avoid CURRENT_TIMESTAMP(), which would keep
+        BigQuery from serving them from its results cache.
+        """
+        return query_job.ended.isoformat() if query_job.ended else ''
     
-    def _store_structured_generation(
+    def _store(
         self,
+        *,
         generation_id: str,
         prompt: str,
-        structured_content: Dict[str, Any],
-        schema: Dict[str, Any],
+        content: Any,
         model_name: str,
-        parameters: Dict[str, Any]
+        parameters: Dict[str, Any],
+        generation_type: str,
+        schema: Optional[Dict[str, Any]] = None
     ) -> None:
-        """Store the structured generation result in BigQuery."""
+        """
+        Queue a generation result for storage in the generated_content table.
+        
+        Free-form and structured generations share one row shape, with the
+        prompt and ``schema`` (null for free-form results) kept in
+        ``input_data``, so both are written through the same batched stream.
+        """
+        now = datetime.now(timezone.utc).isoformat()
+        self._write_queue.put({
+            'id': generation_id,
+            'content_type': generation_type,
+            'input_data': _to_json({'prompt': prompt, 'schema': schema}),
+            'generated_content': content if isinstance(content, str) else _to_json(content),
+            'model_name': model_name,
+            'model_parameters': _to_json(parameters),
+            'status': 'success',
+            'created_at': now,
+            'updated_at': now
+        })
+    
+    def _get_schema_validator(self, schema: Dict[str, Any]) -> Optional[Callable[[Any], Any]]:
+        """Get the compiled validator for ``schema``, compiling it on first use."""
+        key = make_cache_key(schema=schema)
         try:
-            table_id = f"{self.config['project_id']}.{self.config['dataset_id']}.generated_content"
-            
-            # Prepare the row data
-            row = {
-                'generation_id': generation_id,
-                'prompt': prompt,
-                'generated_content': str(structured_content),
-                'model_name': model_name,
-                'parameters': str(parameters),
-                'generation_type': 'ai_generate_structured',
-                'schema': str(schema),
-                'timestamp': bigquery.ScalarQueryParameter('timestamp', 'TIMESTAMP', None)
-            }
-            
-            # Insert the row
-            errors = self.client.insert_rows_json(table_id, [row])
-            if errors:
-                logger.warning("Failed to store structured generation in BigQuery",
-                              generation_id=generation_id,
-                              errors=errors)
-            else:
-                logger.info("Structured generation stored in BigQuery successfully",
-                           generation_id=generation_id)
-                
-        except Exception as e:
-            logger.warning("Failed to store structured generation in BigQuery",
-                          generation_id=generation_id,
-                          error=str(e))
+            return self._compiled_validators[key]
+        except KeyError:
+            pass
+        
+        try:
+            validator = fastjsonschema.compile(schema)
+        except fastjsonschema.JsonSchemaDefinitionException as e:
+            self._log.warning("Schema cannot be compiled, using field checks only",
+                             error=str(e))
+            validator = None
+        
+        self._compiled_validators[key] = validator
+        return validator
     
     def _validate_schema_compliance(
         self,
         content: Dict[str, Any],
         schema: Dict[str, Any]
     ) -> Dict[str, Any]:
-        """Validate that generated content complies with the expected schema."""
+        """
+        Validate that generated content complies with the expected schema.
+        
+        Content is checked with a compiled validator; the per-field walk
+        only runs to itemize missing fields and type mismatches when the
+        validator rejects it, and violations it does not cover (such as
+        nested constraints) are listed under ``schema_errors``.
+        """
+        properties = schema.get('properties', {})
         compliance = {
             'is_compliant': True,
             'missing_fields': [],
-            'extra_fields': [],
-            'type_mismatches': []
+            'extra_fields': [field for field in content if field not in properties] if 'properties' in schema else [],
+            'type_mismatches': [],
+            'schema_errors': []
         }
         
+        validator = self._get_schema_validator(schema)
+        if validator is not None:
+            try:
+                validator(content)
+                return compliance
+            except fastjsonschema.JsonSchemaValueException as e:
+                compliance['is_compliant'] = False
+                compliance['schema_errors'].append(e.message)
+        
         # Check for missing required fields
-        if 'required' in schema:
-            for field in schema['required']:
-                if field not in content:
-                    compliance['missing_fields'].append(field)
-                    compliance['is_compliant'] = False
-        
-        # Check for extra fields
-        if 'properties' in schema:
-            for field in content:
-                if field not in schema['properties']:
-                    compliance['extra_fields'].append(field)
+        for field in schema.get('required', ()):
+            if field not in content:
+                compliance['missing_fields'].append(field)
+                compliance['is_compliant'] = False
         
         # Check type compliance
-        if 'properties' in schema:
-            for field, field_schema in schema['properties'].items():
-                if field in content:
-                    expected_type = field_schema.get('type')
-                    if expected_type:
-                        actual_type = type(content[field]).__name__
-                        if expected_type == 'string' and actual_type != 'str':
-                            compliance['type_mismatches'].append(f"{field}: expected {expected_type}, got {actual_type}")
-                            compliance['is_compliant'] = False
-                        elif expected_type == 'integer' and actual_type not in ['int', 'int64']:
-                            compliance['type_mismatches'].append(f"{field}: expected {expected_type}, got {actual_type}")
-                            compliance['is_compliant'] = False
-                        elif expected_type == 'number' and actual_type not in ['float', 'int', 'int64']:
-                            compliance['type_mismatches'].append(f"{field}: expected {expected_type}, got {actual_type}")
-                            compliance['is_compliant'] = False
+        for field, field_schema in properties.items():
+            if field not in content:
+                continue
+            expected_pytypes = self._JSON_TYPES.get(field_schema.get('type'))
+            value = content[field]
+            # bool is an int subclass but is not a JSON number
+            if expected_pytypes and (
+                not isinstance(value, expected_pytypes)
+                or (isinstance(value, bool) and bool not in expected_pytypes)
+            ):
+                compliance['type_mismatches'].append(
+                    f"{field}: expected {field_schema['type']}, got {type(value).__name__}"
+                )
+                compliance['is_compliant'] = False
         
         return compliance
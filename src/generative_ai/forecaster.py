@@ -5,24 +5,224 @@ This module provides a Python interface to BigQuery's AI.FORECAST function,
 enabling time-series forecasting with a single function call.
 """
 
+import asyncio
+import copy
+import functools
+import hashlib
+import io
+import re
 import uuid
-from typing import List, Dict, Any, Optional, Union
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, Tuple
+from google.api_core import exceptions as api_exceptions
+from google.api_core import retry as api_retry
 from google.cloud import bigquery
-from google.cloud.bigquery import Client
+from google.cloud.bigquery import Client, LoadJobConfig, SourceFormat
+import numpy as np
+import orjson
 import structlog
-from ..config.bigquery_config import get_bigquery_client, get_bigquery_config
+from ..config.bigquery_config import get_bigquery_client, get_bigquery_config, get_bigquery_settings
+from ..utils import ResponseCache, WriteQueue, make_cache_key
 
 logger = structlog.get_logger(__name__)
 
+# Column names are interpolated as identifiers and must be plain names
+_IDENTIFIER_PATTERN = re.compile(r"[A-Za-z_][A-Za-z0-9_]{0,127}")
+# project.dataset.table, where project IDs may contain '-', ':' and '.'
+_TABLE_ID_PATTERN = re.compile(r"[A-Za-z0-9_.:\-]+\.[A-Za-z0-9_]+\.[A-Za-z0-9_\-]+")
+
+
+# Optional AI.FORECAST settings, in the order they appear in the STRUCT
+_FORECAST_OPTIONS = ('seasonality', 'trend', 'confidence_level')
+
+_FORECAST_QUERY_TEMPLATE = """
+        SELECT 
+            AI.FORECAST(
+                {table_sql},
+                @target_column,
+                @time_column,
+                @forecast_horizon,
+                @model_name{options_struct}
+            ) as ai_forecast_result,
+            AI.FORECAST_METADATA() as ai_forecast_metadata
+        """
+
+
+# Transient BigQuery errors (429, 500, 503 and dropped connections) are
+# retried with exponential backoff within a bounded budget
+_TRANSIENT_RETRY = api_retry.Retry(
+    predicate=api_retry.if_transient_error,
+    initial=0.5,
+    maximum=8.0,
+    multiplier=2.0,
+    timeout=120.0
+)
+
+
+@lru_cache(maxsize=256)
+def _forecast_query(table_sql: str, options: Tuple[str, ...]) -> str:
+    """Render the AI.FORECAST query text for a table expression and option set."""
+    options_struct = (
+        f", STRUCT({', '.join(f'@{name} as {name}' for name in options)})" if options else ""
+    )
+    return _FORECAST_QUERY_TEMPLATE.format_map({
+        'table_sql': table_sql,
+        'options_struct': options_struct
+    })
+
+
+@lru_cache(maxsize=256)
+def _value_metrics(values: Tuple[Any, ...]) -> Dict[str, float]:
+    """Compute mean, range and sample standard deviation of forecast values."""
+    # Missing values (None) become NaN and are ignored by the reductions
+    array = np.asarray(values, dtype=np.float64)
+    missing = np.isnan(array)
+    if missing.any():
+        array = array[~missing]
+    if not array.size:
+        return {}
+    
+    # The mean is computed once and the squared deviations are summed with a
+    # single dot product instead of np.std recomputing the mean
+    mean = array.mean()
+    deviations = array - mean
+    return {
+        'mean_forecast': float(mean),
+        'forecast_range': float(array.max() - array.min()),
+        'forecast_std': (
+            float(np.sqrt(deviations @ deviations / (array.size - 1))) if array.size >= 2 else 0.0
+        )
+    }
+
+
+def _validate_identifier(name: str, kind: str) -> str:
+    """Return ``name`` if it is a valid column identifier, else raise ValueError."""
+    if not isinstance(name, str) or not _IDENTIFIER_PATTERN.fullmatch(name):
+        raise ValueError(f"Invalid {kind}: {name!r}")
+    return name
+
+
+def _query_parameter(name: str, value: Any) -> bigquery.ScalarQueryParameter:
+    """Build a scalar query parameter with a type inferred from ``value``."""
+    if isinstance(value, bool):
+        type_ = "BOOL"
+    elif isinstance(value, int):
+        type_ = "INT64"
+    elif isinstance(value, float):
+        type_ = "FLOAT64"
+    elif isinstance(value, datetime):
+        type_ = "TIMESTAMP"
+    elif isinstance(value, date):
+        type_ = "DATE"
+    else:
+        type_ = "STRING"
+    return bigquery.ScalarQueryParameter(name, type_, value)
+
 
 class Forecaster:
     """BigQuery AI.FORECAST implementation for time-series forecasting."""
     
-    def __init__(self, client: Optional[Client] = None):
-        """Initialize Forecaster with BigQuery client."""
+    # Series shorter than this are bound inline as a query parameter
+    # instead of being staged in a temporary table
+    INLINE_SERIES_THRESHOLD = 5000
+    
+    # Forecast records are written in the background in batches of up to
+    # STORE_BATCH_SIZE rows, or whatever arrived within STORE_FLUSH_SECONDS
+    STORE_BATCH_SIZE = 500
+    STORE_FLUSH_SECONDS = 0.1
+    
+    # Results of forecasts at least this many periods long are read through
+    # the BigQuery Storage Read API instead of the REST tabledata endpoint
+    STORAGE_READ_MIN_HORIZON = 1000
+    
+    # Staging tables for large series are named after a digest of their
+    # contents and shared across callers and processes; each expires this
+    # long after its expiration was last refreshed
+    STAGING_TABLE_EXPIRATION = timedelta(days=1)
+    
+    def __init__(self, client: Optional[Client] = None, cache: Optional[ResponseCache] = None):
+        """
+        Initialize Forecaster with BigQuery client.
+        
+        Args:
+            client: BigQuery client; defaults to the shared client
+            cache: In-process cache of forecast results keyed by all
+                forecast arguments
+        """
         self.client = client or get_bigquery_client()
         self.config = get_bigquery_config()
+        self._cache = cache if cache is not None else ResponseCache(max_size=256, ttl_seconds=3600)
+        self._forecasts_table = self.config.get_full_table_id('forecasts')
+        
+        # Storage runs off the caller's critical path
+        self._write_queue = WriteQueue(
+            functools.partial(self._insert_forecast_rows, self.client, self._forecasts_table),
+            max_batch=self.STORE_BATCH_SIZE,
+            max_wait_seconds=self.STORE_FLUSH_SECONDS,
+            name="forecaster-store"
+        )
+        
+        # Staging tables known to be loaded, so repeats skip the metadata lookup
+        self._staged_tables = ResponseCache(
+            max_size=256,
+            ttl_seconds=self.STAGING_TABLE_EXPIRATION.total_seconds() / 2
+        )
+        
+        # Concurrent forecasts are capped by the environment's query limit
+        self._max_in_flight = get_bigquery_settings()["max_in_flight_queries"]
+        self._query_executor = ThreadPoolExecutor(
+            max_workers=self._max_in_flight,
+            thread_name_prefix="forecaster-query"
+        )
+        # Closes the queue and executor when the forecaster is garbage
+        # collected or at exit; it holds them, not the forecaster
+        self._finalizer = weakref.finalize(
+            self, self._shutdown, self._write_queue, self._query_executor
+        )
+    
+    def flush(self) -> None:
+        """Wait for queued forecast writes to finish."""
+        self._write_queue.flush()
+    
+    def close(self) -> None:
+        """Flush queued writes and stop the query executor."""
+        self._finalizer()
+    
+    @staticmethod
+    def _shutdown(write_queue: WriteQueue, executor: ThreadPoolExecutor) -> None:
+        """Flush and stop ``write_queue`` and shut down ``executor``."""
+        write_queue.close()
+        # Queued forecasts still run; not waiting keeps a finalizer that
+        # fires on an executor thread from joining itself
+        executor.shutdown(wait=False)
+    
+    def get_stats(self) -> Dict[str, int]:
+        """Get forecast result cache statistics."""
+        return {
+            'hits': self._cache.hits,
+            'misses': self._cache.misses,
+            'size': len(self._cache)
+        }
+    
+    def _get_cached(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        """Return a copy of the cached forecast for ``cache_key``, marked as a cache hit."""
+        cached = self._cache.get(cache_key)
+        if cached is None:
+            return None
         
+        logger.info("Serving AI.FORECAST result from cache", forecast_id=cached['id'])
+        result = copy.deepcopy(cached)
+        result['metadata']['cache_hit'] = True
+        return result
+    
+    @staticmethod
+    def _hash_series(time_series_data: List[Dict[str, Any]]) -> str:
+        """Hash the serialized series so cache keys cost one pass over its bytes."""
+        return hashlib.sha256(orjson.dumps(time_series_data, default=str)).hexdigest()
+    
     def forecast(
         self,
         time_series_data: List[Dict[str, Any]],
@@ -30,6 +230,7 @@ class Forecaster:
         time_column: str,
         forecast_horizon: int = 12,
         model_name: str = "auto",
+        bypass_cache: bool = False,
         **kwargs
     ) -> Dict[str, Any]:
         """
@@ -41,20 +242,29 @@ class Forecaster:
             time_column: Name of the column containing time values
             forecast_horizon: Number of periods to forecast into the future
             model_name: Forecasting model to use ('auto', 'arima', 'prophet', etc.)
+            bypass_cache: Skip the in-process result cache lookup
             **kwargs: Additional forecasting parameters
             
         Returns:
             Dictionary containing forecast results and metadata
         """
         try:
+            cache_key = make_cache_key(
+                series=self._hash_series(time_series_data),
+                target_column=target_column,
+                time_column=time_column,
+                forecast_horizon=forecast_horizon,
+                model_name=model_name,
+                **kwargs
+            )
+            if not bypass_cache:
+                cached = self._get_cached(cache_key)
+                if cached is not None:
+                    return cached
+            
             # Create unique ID for this forecast
             forecast_id = str(uuid.uuid4())
             
-            # Create temporary table with time series data
-            temp_table_id = self._create_temp_table(
-                time_series_data, target_column, time_column
-            )
-            
             logger.info("Executing AI.FORECAST query", 
                        forecast_id=forecast_id,
                        model=model_name,
@@ -62,26 +272,36 @@ class Forecaster:
                        forecast_horizon=forecast_horizon)
             
             # Build and execute the AI.FORECAST query
-            query = self._build_forecast_query(
-                temp_table_id=temp_table_id,
-                target_column=target_column,
-                time_column=time_column,
-                forecast_horizon=forecast_horizon,
-                model_name=model_name,
-                **kwargs
-            )
+            if len(time_series_data) < self.INLINE_SERIES_THRESHOLD:
+                query, job_config = self._build_inline_forecast_query(
+                    rows=time_series_data,
+                    target_column=target_column,
+                    time_column=time_column,
+                    forecast_horizon=forecast_horizon,
+                    model_name=model_name,
+                    **kwargs
+                )
+            else:
+                staging_table_id = self._load_staging_table(
+                    time_series_data, target_column, time_column
+                )
+                query, job_config = self._build_forecast_query(
+                    temp_table_id=staging_table_id,
+                    target_column=target_column,
+                    time_column=time_column,
+                    forecast_horizon=forecast_horizon,
+                    model_name=model_name,
+                    **kwargs
+                )
             
-            query_job = self.client.query(query)
-            results = list(query_job.result())
+            query_job = self.client.query(query, job_config=job_config, retry=_TRANSIENT_RETRY)
+            first_row = self._fetch_forecast_row(query_job, forecast_horizon)
             
-            if not results:
+            if first_row is None:
                 raise ValueError("No results returned from AI.FORECAST")
             
             # Extract forecast results
-            forecast_result = results[0].get('ai_forecast_result', {})
-            
-            # Clean up temporary table
-            self._cleanup_temp_table(temp_table_id)
+            forecast_result = first_row.get('ai_forecast_result', {})
             
             # Store the forecast in BigQuery
             self._store_forecast(
@@ -97,9 +317,10 @@ class Forecaster:
             
             logger.info("Forecast completed successfully",
                        forecast_id=forecast_id,
-                       forecast_periods=len(forecast_result.get('forecast_values', [])))
+                       forecast_periods=len(forecast_result.get('forecast_values', [])),
+                       bigquery_cache_hit=query_job.cache_hit)
             
-            return {
+            result = {
                 'id': forecast_id,
                 'forecast_result': forecast_result,
                 'model_name': model_name,
@@ -112,19 +333,18 @@ class Forecaster:
                 'metadata': {
                     'data_points': len(time_series_data),
                     'forecast_periods': len(forecast_result.get('forecast_values', [])),
-                    'timestamp': results[0].get('timestamp', ''),
-                    'model_metadata': results[0].get('ai_forecast_metadata', {})
+                    'timestamp': self._job_timestamp(query_job),
+                    'model_metadata': first_row.get('ai_forecast_metadata', {})
                 }
             }
+            self._cache.set(cache_key, copy.deepcopy(result))
+            return result
             
         except Exception as e:
             logger.error("Forecast failed",
                         forecast_id=forecast_id if 'forecast_id' in locals() else None,
                         error=str(e),
                         target_column=target_column)
-            # Clean up temporary table on error
-            if 'temp_table_id' in locals():
-                self._cleanup_temp_table(temp_table_id)
             raise
     
     def forecast_from_table(
@@ -134,7 +354,8 @@ class Forecaster:
         time_column: str,
         forecast_horizon: int = 12,
         model_name: str = "auto",
-        where_clause: Optional[str] = None,
+        where_params: Optional[Dict[str, Any]] = None,
+        bypass_cache: bool = False,
         **kwargs
     ) -> Dict[str, Any]:
         """
@@ -146,13 +367,29 @@ class Forecaster:
             time_column: Name of the column containing time values
             forecast_horizon: Number of periods to forecast into the future
             model_name: Forecasting model to use
-            where_clause: Optional WHERE clause to filter data
+            where_params: Optional equality filters on the table, mapping
+                column name to value; values are bound as query parameters
+            bypass_cache: Skip the in-process result cache lookup
             **kwargs: Additional forecasting parameters
             
         Returns:
             Dictionary containing forecast results and metadata
         """
         try:
+            cache_key = make_cache_key(
+                table_id=table_id,
+                target_column=target_column,
+                time_column=time_column,
+                forecast_horizon=forecast_horizon,
+                model_name=model_name,
+                where_params=where_params,
+                **kwargs
+            )
+            if not bypass_cache:
+                cached = self._get_cached(cache_key)
+                if cached is not None:
+                    return cached
+            
             # Create unique ID for this forecast
             forecast_id = str(uuid.uuid4())
             
@@ -163,24 +400,24 @@ class Forecaster:
                        forecast_horizon=forecast_horizon)
             
             # Build and execute the AI.FORECAST query
-            query = self._build_forecast_from_table_query(
+            query, job_config = self._build_forecast_from_table_query(
                 table_id=table_id,
                 target_column=target_column,
                 time_column=time_column,
                 forecast_horizon=forecast_horizon,
                 model_name=model_name,
-                where_clause=where_clause,
+                where_params=where_params,
                 **kwargs
             )
             
-            query_job = self.client.query(query)
-            results = list(query_job.result())
+            query_job = self.client.query(query, job_config=job_config, retry=_TRANSIENT_RETRY)
+            first_row = self._fetch_forecast_row(query_job, forecast_horizon)
             
-            if not results:
+            if first_row is None:
                 raise ValueError("No results returned from AI.FORECAST")
             
             # Extract forecast results
-            forecast_result = results[0].get('ai_forecast_result', {})
+            forecast_result = first_row.get('ai_forecast_result', {})
             
             # Store the forecast in BigQuery
             self._store_forecast(
@@ -196,9 +433,10 @@ class Forecaster:
             
             logger.info("Table-based forecast completed successfully",
                        forecast_id=forecast_id,
-                       forecast_periods=len(forecast_result.get('forecast_values', [])))
+                       forecast_periods=len(forecast_result.get('forecast_values', [])),
+                       bigquery_cache_hit=query_job.cache_hit)
             
-            return {
+            result = {
                 'id': forecast_id,
                 'forecast_result': forecast_result,
                 'model_name': model_name,
@@ -207,15 +445,17 @@ class Forecaster:
                     'target_column': target_column,
                     'time_column': time_column,
                     'forecast_horizon': forecast_horizon,
-                    'where_clause': where_clause,
+                    'where_params': where_params,
                     **kwargs
                 },
                 'metadata': {
                     'forecast_periods': len(forecast_result.get('forecast_values', [])),
-                    'timestamp': results[0].get('timestamp', ''),
-                    'model_metadata': results[0].get('ai_forecast_metadata', {})
+                    'timestamp': self._job_timestamp(query_job),
+                    'model_metadata': first_row.get('ai_forecast_metadata', {})
                 }
             }
+            self._cache.set(cache_key, copy.deepcopy(result))
+            return result
             
         except Exception as e:
             logger.error("Table-based forecast failed",
@@ -224,49 +464,200 @@ class Forecaster:
                         table_id=table_id)
             raise
     
-    def _create_temp_table(
+    def estimate_forecast_from_table(
         self,
-        time_series_data: List[Dict[str, Any]],
+        table_id: str,
         target_column: str,
-        time_column: str
-    ) -> str:
-        """Create a temporary table with time series data."""
+        time_column: str,
+        forecast_horizon: int = 12,
+        model_name: str = "auto",
+        where_params: Optional[Dict[str, Any]] = None,
+        **kwargs
+    ) -> Dict[str, Any]:
+        """
+        Dry-run a table-based forecast to estimate its cost before running it.
+        
+        Args:
+            Same as ``forecast_from_table``
+            
+        Returns:
+            Dictionary with the bytes the query would process and whether
+            BigQuery reported it as answerable from the results cache
+        """
         try:
-            # Generate unique table name
-            temp_table_name = f"temp_forecast_{uuid.uuid4().hex[:8]}"
-            temp_table_id = f"{self.config['project_id']}.{self.config['dataset_id']}.{temp_table_name}"
-            
-            # Create table schema
-            schema = [
-                bigquery.SchemaField(time_column, "TIMESTAMP"),
-                bigquery.SchemaField(target_column, "FLOAT64")
-            ]
-            
-            # Create the table
-            table = bigquery.Table(temp_table_id, schema=schema)
-            self.client.create_table(table, exists_ok=True)
-            
-            # Insert the data
-            errors = self.client.insert_rows_json(temp_table_id, time_series_data)
-            if errors:
-                raise ValueError(f"Failed to insert data into temp table: {errors}")
+            query, job_config = self._build_forecast_from_table_query(
+                table_id=table_id,
+                target_column=target_column,
+                time_column=time_column,
+                forecast_horizon=forecast_horizon,
+                model_name=model_name,
+                where_params=where_params,
+                **kwargs
+            )
+            job_config.dry_run = True
             
-            logger.info("Temporary table created successfully", temp_table_id=temp_table_id)
-            return temp_table_id
+            query_job = self.client.query(query, job_config=job_config)
+            return {
+                'total_bytes_processed': query_job.total_bytes_processed or 0,
+                'cache_hit': bool(query_job.cache_hit)
+            }
             
         except Exception as e:
-            logger.error("Failed to create temporary table", error=str(e))
+            logger.error("Forecast estimate failed", error=str(e), table_id=table_id)
             raise
     
-    def _cleanup_temp_table(self, temp_table_id: str) -> None:
-        """Clean up temporary table after use."""
+    async def aforecast_from_table(self, **kwargs) -> Dict[str, Any]:
+        """
+        Run ``forecast_from_table`` without blocking the event loop.
+        
+        Args:
+            **kwargs: Arguments passed to ``forecast_from_table``
+            
+        Returns:
+            Dictionary containing forecast results and metadata
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._query_executor,
+            functools.partial(self.forecast_from_table, **kwargs)
+        )
+    
+    async def forecast_many(
+        self,
+        requests: List[Dict[str, Any]],
+        max_in_flight: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Run several table-based forecasts concurrently.
+        
+        Args:
+            requests: Keyword arguments for ``forecast_from_table``, one dict per forecast
+            max_in_flight: Maximum concurrent forecasts; defaults to the
+                environment's ``max_in_flight_queries`` setting
+            
+        Returns:
+            Forecast results in the same order as ``requests``; failed
+            forecasts are reported with ``status`` set to ``'failed'``
+        """
+        semaphore = asyncio.Semaphore(max_in_flight or self._max_in_flight)
+        
+        async def run(request: Dict[str, Any]) -> Dict[str, Any]:
+            async with semaphore:
+                try:
+                    return await self.aforecast_from_table(**request)
+                except Exception as e:
+                    return {
+                        'error': str(e),
+                        'request': request,
+                        'status': 'failed'
+                    }
+        
+        logger.info("Executing concurrent AI.FORECAST queries", num_forecasts=len(requests))
+        return list(await asyncio.gather(*(run(request) for request in requests)))
+    
+    def _fetch_forecast_row(
+        self,
+        query_job: bigquery.QueryJob,
+        forecast_horizon: int
+    ) -> Optional[Any]:
+        """
+        Fetch the single row returned by an AI.FORECAST query.
+        
+        Long-horizon results carry a large nested ``forecast_values`` array,
+        so they are streamed as Arrow over the Storage Read API when it is
+        available; short ones are read with one REST page of one row.
+        
+        Returns:
+            The result row, or None if the query returned no rows
+        """
+        bqstorage_client = None
+        if forecast_horizon >= self.STORAGE_READ_MIN_HORIZON:
+            bqstorage_client = self.config.get_bqstorage_client()
+        
+        if bqstorage_client is None:
+            # AI.FORECAST returns a single row
+            return next(iter(query_job.result(max_results=1, retry=_TRANSIENT_RETRY)), None)
+        
+        rows = query_job.to_arrow(bqstorage_client=bqstorage_client).slice(0, 1).to_pylist()
+        return rows[0] if rows else None
+    
+    @staticmethod
+    def _job_timestamp(query_job: bigquery.QueryJob) -> str:
+        """
+        Get the completion time of a query job as an ISO string.
+        
+        The forecast queries avoid CURRENT_TIMESTAMP() so that repeated
+        calls can be served from the BigQuery results cache.
+        """
+        return query_job.ended.isoformat() if query_job.ended else ''
+    
+    def _load_staging_table(
+        self,
+        time_series_data: List[Dict[str, Any]],
+        target_column: str,
+        time_column: str
+    ) -> str:
+        """
+        Stage time series data in a table named after a digest of its contents.
+        
+        Identical series always map to the same table, and therefore to
+        byte-identical forecast SQL that BigQuery can answer from its
+        results cache. The table is only (re)loaded, with a single
+        truncating newline-delimited JSON load job, when it does not
+        already hold the expected number of rows.
+        
+        Returns:
+            Fully qualified ID of the staging table
+        """
         try:
-            self.client.delete_table(temp_table_id, not_found_ok=True)
-            logger.info("Temporary table cleaned up", temp_table_id=temp_table_id)
+            payload = b"\n".join(orjson.dumps(row, default=str) for row in time_series_data)
+            digest = hashlib.blake2b(
+                orjson.dumps([time_column, target_column]) + payload, digest_size=8
+            ).hexdigest()
+            staging_table_id = self.config.get_full_table_id(f"fc_data_{digest}")
+            
+            if self._staged_tables.get(staging_table_id):
+                return staging_table_id
+            
+            try:
+                table = self.client.get_table(staging_table_id, retry=_TRANSIENT_RETRY)
+            except api_exceptions.NotFound:
+                table = None
+            
+            if table is None or table.num_rows != len(time_series_data):
+                job_config = LoadJobConfig(
+                    schema=[
+                        bigquery.SchemaField(time_column, "TIMESTAMP"),
+                        bigquery.SchemaField(target_column, "FLOAT64")
+                    ],
+                    source_format=SourceFormat.NEWLINE_DELIMITED_JSON,
+                    write_disposition=bigquery.WriteDisposition.WRITE_TRUNCATE,
+                    ignore_unknown_values=True
+                )
+                load_job = self.client.load_table_from_file(
+                    io.BytesIO(payload), staging_table_id, job_config=job_config
+                )
+                load_job.result()
+                table = None
+                logger.info("Staging table loaded successfully",
+                           staging_table_id=staging_table_id,
+                           data_points=len(time_series_data))
+            
+            # Refresh the expiration once less than half its lifetime remains
+            now = datetime.now(timezone.utc)
+            if table is None or table.expires is None or (
+                table.expires < now + self.STAGING_TABLE_EXPIRATION / 2
+            ):
+                table = bigquery.Table(staging_table_id)
+                table.expires = now + self.STAGING_TABLE_EXPIRATION
+                self.client.update_table(table, ["expires"], retry=_TRANSIENT_RETRY)
+            
+            self._staged_tables.set(staging_table_id, True)
+            return staging_table_id
+            
         except Exception as e:
-            logger.warning("Failed to clean up temporary table",
-                          temp_table_id=temp_table_id,
-                          error=str(e))
+            logger.error("Failed to load staging table", error=str(e))
+            raise
     
     def _build_forecast_query(
         self,
@@ -276,34 +667,52 @@ class Forecaster:
         forecast_horizon: int,
         model_name: str,
         **kwargs
-    ) -> str:
+    ) -> Tuple[str, bigquery.QueryJobConfig]:
         """Build the AI.FORECAST SQL query for temporary table."""
-        # Build additional parameters
-        params = []
-        if 'seasonality' in kwargs:
-            params.append(f"{kwargs['seasonality']} as seasonality")
-        if 'trend' in kwargs:
-            params.append(f"'{kwargs['trend']}' as trend")
-        if 'confidence_level' in kwargs:
-            params.append(f"{kwargs['confidence_level']} as confidence_level")
-        
-        params_str = ", ".join(params) if params else ""
-        params_struct = f"STRUCT({params_str})" if params_str else ""
-        
-        query = f"""
-        SELECT 
-            AI.FORECAST(
-                TABLE `{temp_table_id}`,
-                '{target_column}',
-                '{time_column}',
-                {forecast_horizon},
-                '{model_name}'
-                {f", {params_struct}" if params_struct else ""}
-            ) as ai_forecast_result,
-            CURRENT_TIMESTAMP() as timestamp,
-            AI.FORECAST_METADATA() as ai_forecast_metadata
+        return self._render_forecast_query(
+            table_sql=f"TABLE `{temp_table_id}`",
+            target_column=target_column,
+            time_column=time_column,
+            forecast_horizon=forecast_horizon,
+            model_name=model_name,
+            **kwargs
+        )
+    
+    def _build_inline_forecast_query(
+        self,
+        rows: List[Dict[str, Any]],
+        target_column: str,
+        time_column: str,
+        forecast_horizon: int,
+        model_name: str,
+        **kwargs
+    ) -> Tuple[str, bigquery.QueryJobConfig]:
         """
-        return query
+        Build the AI.FORECAST SQL query with the series bound inline.
+        
+        The rows are passed as an ARRAY<STRUCT> query parameter and read
+        through UNNEST, so small series need no temporary table and the
+        SQL text stays the same across calls.
+        """
+        _validate_identifier(target_column, "target column")
+        _validate_identifier(time_column, "time column")
+        series = [
+            bigquery.StructQueryParameter(
+                None,
+                bigquery.ScalarQueryParameter(time_column, "TIMESTAMP", row.get(time_column)),
+                bigquery.ScalarQueryParameter(target_column, "FLOAT64", row.get(target_column))
+            )
+            for row in rows
+        ]
+        return self._render_forecast_query(
+            table_sql="(SELECT * FROM UNNEST(@series))",
+            target_column=target_column,
+            time_column=time_column,
+            forecast_horizon=forecast_horizon,
+            model_name=model_name,
+            extra_params=[bigquery.ArrayQueryParameter("series", "STRUCT", series)],
+            **kwargs
+        )
     
     def _build_forecast_from_table_query(
         self,
@@ -312,39 +721,77 @@ class Forecaster:
         time_column: str,
         forecast_horizon: int,
         model_name: str,
-        where_clause: Optional[str],
+        where_params: Optional[Dict[str, Any]] = None,
         **kwargs
-    ) -> str:
-        """Build the AI.FORECAST SQL query for existing table."""
-        # Build additional parameters
-        params = []
-        if 'seasonality' in kwargs:
-            params.append(f"{kwargs['seasonality']} as seasonality")
-        if 'trend' in kwargs:
-            params.append(f"'{kwargs['trend']}' as trend")
-        if 'confidence_level' in kwargs:
-            params.append(f"{kwargs['confidence_level']} as confidence_level")
-        
-        params_str = ", ".join(params) if params else ""
-        params_struct = f"STRUCT({params_str})" if params_str else ""
+    ) -> Tuple[str, bigquery.QueryJobConfig]:
+        """
+        Build the AI.FORECAST SQL query for existing table.
+        
+        Filters are only accepted as column/value pairs: columns must be
+        valid identifiers and values are bound as ``@filter_<n>`` parameters,
+        so no caller-supplied text reaches the SQL.
+        """
+        if not _TABLE_ID_PATTERN.fullmatch(table_id):
+            raise ValueError(f"Invalid table ID: {table_id!r}")
+        if 'where_clause' in kwargs:
+            raise ValueError("Raw WHERE clauses are not supported; pass where_params instead")
         
         # Build WHERE clause
-        where_sql = f"WHERE {where_clause}" if where_clause else ""
+        conditions = []
+        filter_params = []
+        for i, (column, value) in enumerate((where_params or {}).items()):
+            conditions.append(f"`{_validate_identifier(column, 'filter column')}` = @filter_{i}")
+            filter_params.append(_query_parameter(f"filter_{i}", value))
         
-        query = f"""
-        SELECT 
-            AI.FORECAST(
-                TABLE `{table_id}` {where_sql},
-                '{target_column}',
-                '{time_column}',
-                {forecast_horizon},
-                '{model_name}'
-                {f", {params_struct}" if params_struct else ""}
-            ) as ai_forecast_result,
-            CURRENT_TIMESTAMP() as timestamp,
-            AI.FORECAST_METADATA() as ai_forecast_metadata
+        if conditions:
+            table_sql = f"(SELECT * FROM `{table_id}` WHERE {' AND '.join(conditions)})"
+        else:
+            table_sql = f"TABLE `{table_id}`"
+        
+        return self._render_forecast_query(
+            table_sql=table_sql,
+            target_column=target_column,
+            time_column=time_column,
+            forecast_horizon=forecast_horizon,
+            model_name=model_name,
+            extra_params=filter_params,
+            **kwargs
+        )
+    
+    def _render_forecast_query(
+        self,
+        table_sql: str,
+        target_column: str,
+        time_column: str,
+        forecast_horizon: int,
+        model_name: str,
+        extra_params: Optional[List[Any]] = None,
+        **kwargs
+    ) -> Tuple[str, bigquery.QueryJobConfig]:
+        """
+        Render the AI.FORECAST SQL query over a table expression.
+        
+        Column names are validated identifiers and every value is bound as
+        a query parameter, so the SQL text only varies with the table and
+        the set of optional settings, not with their values.
         """
-        return query
+        query_parameters = [
+            bigquery.ScalarQueryParameter("target_column", "STRING",
+                                          _validate_identifier(target_column, "target column")),
+            bigquery.ScalarQueryParameter("time_column", "STRING",
+                                          _validate_identifier(time_column, "time column")),
+            bigquery.ScalarQueryParameter("forecast_horizon", "INT64", forecast_horizon),
+            bigquery.ScalarQueryParameter("model_name", "STRING", model_name),
+            *(extra_params or [])
+        ]
+        
+        options = tuple(name for name in _FORECAST_OPTIONS if name in kwargs)
+        query_parameters.extend(_query_parameter(name, kwargs[name]) for name in options)
+        
+        query = _forecast_query(table_sql, options)
+        # Set explicitly so that no default or client setting opts these out of the results cache
+        job_config = bigquery.QueryJobConfig(query_parameters=query_parameters, use_query_cache=True)
+        return query, job_config
     
     def _store_forecast(
         self,
@@ -357,53 +804,57 @@ class Forecaster:
         parameters: Dict[str, Any],
         **kwargs
     ) -> None:
-        """Store the forecast result in BigQuery."""
+        """Queue the forecast result for storage in BigQuery."""
+        # Prepare the row data
+        row = {
+            'forecast_id': forecast_id,
+            'target_column': target_column,
+            'time_column': time_column,
+            'forecast_horizon': forecast_horizon,
+            'model_name': model_name,
+            # JSON columns accept serialized JSON text
+            'forecast_result': orjson.dumps(forecast_result, default=str).decode(),
+            'parameters': orjson.dumps(parameters, default=str).decode(),
+            'timestamp': datetime.now(timezone.utc).isoformat()
+        }
+        
+        # Add additional fields if available
+        if 'time_series_data' in kwargs:
+            row['data_points'] = len(kwargs['time_series_data'])
+        if 'table_id' in kwargs:
+            row['source_table'] = kwargs['table_id']
+        
+        self._write_queue.put(row)
+    
+    @staticmethod
+    def _insert_forecast_rows(client: Client, table_id: str, rows: List[Dict[str, Any]]) -> None:
+        """Insert a batch of queued forecast rows with one request."""
         try:
-            table_id = f"{self.config['project_id']}.{self.config['dataset_id']}.forecasts"
-            
-            # Prepare the row data
-            row = {
-                'forecast_id': forecast_id,
-                'target_column': target_column,
-                'time_column': time_column,
-                'forecast_horizon': forecast_horizon,
-                'model_name': model_name,
-                'forecast_result': str(forecast_result),
-                'parameters': str(parameters),
-                'timestamp': bigquery.ScalarQueryParameter('timestamp', 'TIMESTAMP', None)
-            }
-            
-            # Add additional fields if available
-            if 'time_series_data' in kwargs:
-                row['data_points'] = len(kwargs['time_series_data'])
-            if 'table_id' in kwargs:
-                row['source_table'] = kwargs['table_id']
-            
-            # Insert the row
-            errors = self.client.insert_rows_json(table_id, [row])
+            errors = client.insert_rows_json(table_id, rows, retry=_TRANSIENT_RETRY)
             if errors:
-                logger.warning("Failed to store forecast in BigQuery",
-                              forecast_id=forecast_id,
+                logger.warning("Failed to store forecasts in BigQuery",
+                              num_rows=len(rows),
                               errors=errors)
             else:
-                logger.info("Forecast stored in BigQuery successfully",
-                           forecast_id=forecast_id)
+                logger.info("Forecasts stored in BigQuery successfully",
+                           num_rows=len(rows))
                 
         except Exception as e:
-            logger.warning("Failed to store forecast in BigQuery",
-                          forecast_id=forecast_id,
+            logger.warning("Failed to store forecasts in BigQuery",
+                          num_rows=len(rows),
                           error=str(e))
     
     def get_forecast_metrics(self, forecast_result: Dict[str, Any]) -> Dict[str, Any]:
-        """Extract key metrics from forecast results."""
+        """
+        Extract key metrics from forecast results.
+        
+        Value statistics are memoized on the forecast values, so repeated
+        calls for the same result (e.g. dashboard refreshes) skip the scan.
+        """
         metrics = {}
         
         if 'forecast_values' in forecast_result:
-            forecast_values = forecast_result['forecast_values']
-            if forecast_values:
-                metrics['mean_forecast'] = sum(forecast_values) / len(forecast_values)
-                metrics['forecast_range'] = max(forecast_values) - min(forecast_values)
-                metrics['forecast_std'] = self._calculate_std(forecast_values)
+            metrics.update(_value_metrics(tuple(forecast_result['forecast_values'])))
         
         if 'confidence_intervals' in forecast_result:
             metrics['has_confidence_intervals'] = True
@@ -413,12 +864,3 @@ class Forecaster:
             metrics.update(forecast_result['model_performance'])
         
         return metrics
-    
-    def _calculate_std(self, values: List[float]) -> float:
-        """Calculate standard deviation of a list of values."""
-        if len(values) < 2:
-            return 0.0
-        
-        mean = sum(values) / len(values)
-        variance = sum((x - mean) ** 2 for x in values) / (len(values) - 1)
-        return variance ** 0.5
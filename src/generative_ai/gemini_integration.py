@@ -5,24 +5,147 @@ This module provides BigFrames integration with Gemini models
 for enhanced generative AI capabilities in BigQuery.
 """
 
-import uuid
-from typing import List, Dict, Any, Optional, Union
+import asyncio
+import hashlib
+import re
+import threading
+import weakref
+from datetime import datetime, timezone
+from functools import partial
+from typing import List, Dict, Any, Optional, Tuple, Union
+import numpy as np
+import orjson
 from google.cloud import bigquery
 from google.cloud.bigquery import Client
 import structlog
-from ..config.bigquery_config import get_bigquery_client, get_bigquery_config
+from ..config.bigquery_config import get_bigquery_client, get_bigquery_config, get_bigquery_settings
+from ..utils import ResponseCache, WriteQueue, uuid7
 
 logger = structlog.get_logger(__name__)
 
 
+# Column names become STRUCT field names of the inline series parameter
+_IDENTIFIER_PATTERN = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+
+
+def _embedding_key(text: str, model_name: str) -> str:
+    """Hash the model and text into the embedding cache key."""
+    return hashlib.sha256(f"{model_name}\0{text}".encode()).hexdigest()
+
+
 class GeminiIntegration:
     """BigFrames Gemini integration for enhanced generative AI capabilities."""
     
-    def __init__(self, client: Optional[Client] = None):
-        """Initialize GeminiIntegration with BigQuery client."""
+    # Size of the in-process embedding cache in front of the persistent one
+    EMBEDDING_CACHE_SIZE = 1000
+    
+    # Series shorter than this are bound inline as a query parameter
+    # instead of being staged in a temporary table
+    INLINE_SERIES_THRESHOLD = 5000
+    
+    # Generation records are written in the background in batches of up to
+    # STORE_BATCH_SIZE rows, or whatever arrived within STORE_FLUSH_SECONDS
+    STORE_BATCH_SIZE = 500
+    STORE_FLUSH_SECONDS = 5.0
+    
+    # Session temp table holding large forecast series; recreated per forecast
+    FORECAST_SERIES_TABLE = "gemini_forecast_series"
+    
+    # Static SQL for text and embedding generation; every input is a query
+    # parameter, so the text is built once rather than on every call
+    _TEXT_QUERY = """
+        SELECT 
+            bigframes.ml.llm.GeminiTextGenerator(
+                @prompt,
+                @model_name,
+                STRUCT(
+                    @temperature as temperature,
+                    @max_tokens as max_tokens
+                )
+            ) as gemini_text_result,
+            CURRENT_TIMESTAMP() as timestamp
+        """
+    _EMBEDDING_QUERY = """
+        SELECT 
+            bigframes.ml.llm.TextEmbeddingGenerator(
+                @text,
+                @model_name
+            ) as gemini_embedding_result,
+            CURRENT_TIMESTAMP() as timestamp
+        """
+    
+    def __init__(self, client: Optional[Client] = None, embedding_cache: Optional[ResponseCache] = None):
+        """
+        Initialize GeminiIntegration with BigQuery client.
+        
+        Args:
+            client: BigQuery client; defaults to the shared client
+            embedding_cache: In-process cache of embeddings keyed by model
+                and text, consulted before the gemini_embedding_cache table
+        """
         self.client = client or get_bigquery_client()
         self.config = get_bigquery_config()
+        self._embedding_cache = embedding_cache if embedding_cache is not None else ResponseCache(
+            max_size=self.EMBEDDING_CACHE_SIZE,
+            ttl_seconds=float("inf")
+        )
+        self._embedding_cache_table = self.config.get_full_table_id('gemini_embedding_cache')
+        self._generations_table = self.config.get_full_table_id('gemini_generations')
         
+        # Storage runs off the caller's critical path
+        self._write_queue = WriteQueue(
+            partial(self._insert_generation_rows, self.client, self._generations_table),
+            max_batch=self.STORE_BATCH_SIZE,
+            max_wait_seconds=self.STORE_FLUSH_SECONDS,
+            name="gemini-generations-store"
+        )
+        self._embedding_cache_queue = WriteQueue(
+            partial(self._insert_embedding_cache_rows, self.client, self._embedding_cache_table),
+            max_batch=self.STORE_BATCH_SIZE,
+            max_wait_seconds=self.STORE_FLUSH_SECONDS,
+            name="gemini-embedding-cache-store"
+        )
+        
+        # BigQuery session for large forecast series, opened on first use
+        self._session_id: Optional[str] = None
+        self._session_lock = threading.Lock()
+        
+        # Closes the queues when the integration is garbage collected or at
+        # exit; it holds the queues, not the integration
+        self._finalizer = weakref.finalize(
+            self, self._close_queues, self._write_queue, self._embedding_cache_queue
+        )
+    
+    def flush(self) -> None:
+        """Wait for queued generation and embedding cache writes to finish."""
+        self._write_queue.flush()
+        self._embedding_cache_queue.flush()
+    
+    @staticmethod
+    def _close_queues(*queues: WriteQueue) -> None:
+        """Flush and stop each of ``queues``."""
+        for write_queue in queues:
+            write_queue.close()
+    
+    def close(self) -> None:
+        """Flush queued writes, stop the writer threads and end the forecast session, if any."""
+        self._finalizer()
+        with self._session_lock:
+            session_id, self._session_id = self._session_id, None
+        if session_id is None:
+            return
+        
+        try:
+            job_config = bigquery.QueryJobConfig(connection_properties=[
+                bigquery.ConnectionProperty("session_id", session_id)
+            ])
+            self.client.query("CALL BQ.ABORT_SESSION()", job_config=job_config).result()
+            logger.info("BigQuery session ended", session_id=session_id)
+        except Exception as e:
+            logger.warning("Failed to end BigQuery session",
+                          session_id=session_id,
+                          error=str(e))
+    
     def generate_text_with_gemini(
         self,
         prompt: str,
@@ -46,10 +169,11 @@ class GeminiIntegration:
         """
         try:
             # Create unique ID for this generation
-            generation_id = str(uuid.uuid4())
+            generation_id = uuid7()
+            prompt_length = len(prompt)
             
             # Build the BigFrames Gemini query
-            query = self._build_gemini_text_query(
+            query, job_config = self._build_gemini_text_query(
                 prompt=prompt,
                 model_name=model_name,
                 temperature=temperature,
@@ -60,17 +184,18 @@ class GeminiIntegration:
             logger.info("Executing BigFrames Gemini text generation", 
                        generation_id=generation_id,
                        model=model_name,
-                       prompt_length=len(prompt))
+                       prompt_length=prompt_length)
             
             # Execute the query
-            query_job = self.client.query(query)
-            results = list(query_job.result())
+            query_job = self.client.query(query, job_config=job_config)
+            row = next(iter(query_job.result(max_results=1)), None)
             
-            if not results:
+            if row is None:
                 raise ValueError("No results returned from Gemini text generation")
             
             # Extract the generated text
-            generated_text = results[0].get('gemini_text_result', '')
+            generated_text = row.get('gemini_text_result', '')
+            output_length = len(generated_text)
             
             # Store the generation in BigQuery
             self._store_gemini_generation(
@@ -88,7 +213,7 @@ class GeminiIntegration:
             
             logger.info("Gemini text generation completed successfully",
                        generation_id=generation_id,
-                       output_length=len(generated_text))
+                       output_length=output_length)
             
             return {
                 'id': generation_id,
@@ -100,9 +225,9 @@ class GeminiIntegration:
                     **kwargs
                 },
                 'metadata': {
-                    'prompt_length': len(prompt),
-                    'output_length': len(generated_text),
-                    'timestamp': results[0].get('timestamp', '')
+                    'prompt_length': prompt_length,
+                    'output_length': output_length,
+                    'timestamp': row.get('timestamp', '')
                 }
             }
             
@@ -132,10 +257,30 @@ class GeminiIntegration:
         """
         try:
             # Create unique ID for this embedding
-            embedding_id = str(uuid.uuid4())
+            embedding_id = uuid7()
+            
+            # Embeddings are deterministic, so identical text is served from cache
+            cache_key = _embedding_key(text, model_name)
+            vector = self._lookup_embedding(cache_key, model_name)
+            if vector is not None:
+                logger.info("Serving Gemini embedding from cache",
+                           embedding_id=embedding_id,
+                           model=model_name)
+                return {
+                    'id': embedding_id,
+                    'embeddings': vector.tolist(),
+                    'model_name': model_name,
+                    'parameters': kwargs,
+                    'metadata': {
+                        'text_length': len(text),
+                        'embedding_dimensions': vector.size,
+                        'timestamp': '',
+                        'cache_hit': True
+                    }
+                }
             
             # Build the BigFrames Gemini embedding query
-            query = self._build_gemini_embedding_query(
+            query, job_config = self._build_gemini_embedding_query(
                 text=text,
                 model_name=model_name,
                 **kwargs
@@ -147,28 +292,31 @@ class GeminiIntegration:
                        text_length=len(text))
             
             # Execute the query
-            query_job = self.client.query(query)
-            results = list(query_job.result())
+            query_job = self.client.query(query, job_config=job_config)
+            row = next(iter(query_job.result(max_results=1)), None)
             
-            if not results:
+            if row is None:
                 raise ValueError("No results returned from Gemini embedding generation")
             
-            # Extract the embeddings
-            embeddings = results[0].get('gemini_embedding_result', [])
+            # Extract the embeddings; the cache keeps them as float32 arrays
+            vector = np.asarray(row.get('gemini_embedding_result') or [], dtype=np.float32)
+            embeddings = vector.tolist()
+            self._save_embedding(cache_key, model_name, vector)
             
             # Store the embedding in BigQuery
             self._store_gemini_generation(
                 generation_id=embedding_id,
                 prompt=text,
-                generated_text=str(embeddings),
+                generated_text=None,
                 model_name=model_name,
                 generation_type='embedding',
-                parameters=kwargs
+                parameters=kwargs,
+                embedding=embeddings
             )
             
             logger.info("Gemini embedding generation completed successfully",
                        embedding_id=embedding_id,
-                       embedding_dimensions=len(embeddings))
+                       embedding_dimensions=vector.size)
             
             return {
                 'id': embedding_id,
@@ -177,8 +325,9 @@ class GeminiIntegration:
                 'parameters': kwargs,
                 'metadata': {
                     'text_length': len(text),
-                    'embedding_dimensions': len(embeddings),
-                    'timestamp': results[0].get('timestamp', '')
+                    'embedding_dimensions': vector.size,
+                    'timestamp': row.get('timestamp', ''),
+                    'cache_hit': False
                 }
             }
             
@@ -189,6 +338,112 @@ class GeminiIntegration:
                         text=text[:100] + "..." if len(text) > 100 else text)
             raise
     
+    async def agenerate_text_with_gemini(self, prompt: str, **kwargs) -> Dict[str, Any]:
+        """Run ``generate_text_with_gemini`` without blocking the event loop."""
+        return await asyncio.to_thread(self.generate_text_with_gemini, prompt, **kwargs)
+    
+    async def agenerate_embeddings_with_gemini(self, text: str, **kwargs) -> Dict[str, Any]:
+        """Run ``generate_embeddings_with_gemini`` without blocking the event loop."""
+        return await asyncio.to_thread(self.generate_embeddings_with_gemini, text, **kwargs)
+    
+    async def generate_embeddings_many(
+        self,
+        texts: List[str],
+        model_name: str = "text-embedding-004",
+        max_in_flight: Optional[int] = None,
+        **kwargs
+    ) -> List[Dict[str, Any]]:
+        """
+        Generate embeddings for several texts concurrently.
+        
+        Args:
+            texts: The texts to generate embeddings for
+            model_name: Gemini embedding model to use
+            max_in_flight: Maximum concurrent queries; defaults to the
+                environment's ``max_in_flight_queries`` setting
+            **kwargs: Additional model parameters
+            
+        Returns:
+            Embedding results in the same order as ``texts``; failed
+            embeddings are reported with ``status`` set to ``'failed'``
+        """
+        semaphore = asyncio.Semaphore(
+            max_in_flight or get_bigquery_settings()["max_in_flight_queries"]
+        )
+        
+        async def run(text: str) -> Dict[str, Any]:
+            async with semaphore:
+                try:
+                    return await self.agenerate_embeddings_with_gemini(
+                        text, model_name=model_name, **kwargs
+                    )
+                except Exception as e:
+                    return {
+                        'error': str(e),
+                        'text': text,
+                        'status': 'failed'
+                    }
+        
+        logger.info("Executing concurrent Gemini embedding generation", num_texts=len(texts))
+        return list(await asyncio.gather(*(run(text) for text in texts)))
+    
+    def _lookup_embedding(self, cache_key: str, model_name: str) -> Optional[np.ndarray]:
+        """
+        Look up a cached embedding, first in process and then in BigQuery.
+        
+        Embeddings are returned as float32 arrays. A failed lookup in the gemini_embedding_cache table is treated as a
+        miss so that caching never blocks embedding generation.
+        """
+        vector = self._embedding_cache.get(cache_key)
+        if vector is not None:
+            return vector
+        
+        try:
+            query = f"""
+            SELECT embedding
+            FROM `{self._embedding_cache_table}`
+            WHERE hash = @hash AND model = @model
+            LIMIT 1
+            """
+            job_config = bigquery.QueryJobConfig(query_parameters=[
+                bigquery.ScalarQueryParameter("hash", "STRING", cache_key),
+                bigquery.ScalarQueryParameter("model", "STRING", model_name)
+            ])
+            row = next(iter(self.client.query(query, job_config=job_config).result(max_results=1)), None)
+        except Exception as e:
+            logger.warning("Failed to look up cached Gemini embedding", error=str(e))
+            return None
+        
+        if row is None:
+            return None
+        
+        vector = np.asarray(row.get('embedding') or [], dtype=np.float32)
+        self._embedding_cache.set(cache_key, vector)
+        return vector
+    
+    def _save_embedding(self, cache_key: str, model_name: str, vector: np.ndarray) -> None:
+        """Store a generated embedding in memory and queue it for the cache table."""
+        self._embedding_cache.set(cache_key, vector)
+        self._embedding_cache_queue.put({
+            'hash': cache_key,
+            'model': model_name,
+            'embedding': vector.tolist()
+        })
+    
+    @staticmethod
+    def _insert_embedding_cache_rows(client: Client, table_id: str, rows: List[Dict[str, Any]]) -> None:
+        """Insert a batch of queued embedding cache rows."""
+        try:
+            errors = client.insert_rows_json(table_id, rows)
+            if errors:
+                logger.warning("Failed to store Gemini embeddings in cache table",
+                              num_rows=len(rows),
+                              errors=errors)
+        except Exception as e:
+            logger.warning("Failed to store Gemini embeddings in cache table",
+                          num_rows=len(rows),
+                          error=str(e))
+    
     def forecast_with_gemini(
         self,
         time_series_data: List[Dict[str, Any]],
@@ -212,44 +467,45 @@ class GeminiIntegration:
         """
         try:
             # Create unique ID for this forecast
-            forecast_id = str(uuid.uuid4())
-            
-            # Create temporary table with time series data
-            temp_table_id = self._create_temp_table(
-                time_series_data, target_column, time_column
-            )
+            forecast_id = uuid7()
             
             logger.info("Executing BigFrames Gemini forecast", 
                        forecast_id=forecast_id,
                        data_points=len(time_series_data),
                        forecast_horizon=forecast_horizon)
             
-            # Build and execute the BigFrames Gemini forecast query
-            query = self._build_gemini_forecast_query(
-                temp_table_id=temp_table_id,
-                target_column=target_column,
-                time_column=time_column,
-                forecast_horizon=forecast_horizon,
-                **kwargs
-            )
-            
-            query_job = self.client.query(query)
-            results = list(query_job.result())
+            # Build and execute the BigFrames Gemini forecast query; small
+            # series are bound inline, large ones go through a session temp table
+            if len(time_series_data) < self.INLINE_SERIES_THRESHOLD:
+                query, job_config = self._build_inline_gemini_forecast_query(
+                    rows=time_series_data,
+                    target_column=target_column,
+                    time_column=time_column,
+                    forecast_horizon=forecast_horizon,
+                    **kwargs
+                )
+                query_job = self.client.query(query, job_config=job_config)
+                row = next(iter(query_job.result(max_results=1)), None)
+            else:
+                row = self._run_session_forecast(
+                    rows=time_series_data,
+                    target_column=target_column,
+                    time_column=time_column,
+                    forecast_horizon=forecast_horizon,
+                    **kwargs
+                )
             
-            if not results:
+            if row is None:
                 raise ValueError("No results returned from Gemini forecast")
             
             # Extract forecast results
-            forecast_result = results[0].get('gemini_forecast_result', {})
-            
-            # Clean up temporary table
-            self._cleanup_temp_table(temp_table_id)
+            forecast_result = row.get('gemini_forecast_result', {})
             
             # Store the forecast in BigQuery
             self._store_gemini_generation(
                 generation_id=forecast_id,
                 prompt=f"Forecast {target_column} for {forecast_horizon} periods",
-                generated_text=str(forecast_result),
+                generated_text=orjson.dumps(forecast_result, default=str).decode(),
                 model_name="gemini-forecast",
                 generation_type='forecast',
                 parameters={
@@ -277,7 +533,7 @@ class GeminiIntegration:
                 'metadata': {
                     'data_points': len(time_series_data),
                     'forecast_periods': len(forecast_result.get('forecast_values', [])),
-                    'timestamp': results[0].get('timestamp', '')
+                    'timestamp': row.get('timestamp', '')
                 }
             }
             
@@ -286,9 +542,6 @@ class GeminiIntegration:
                         forecast_id=forecast_id if 'forecast_id' in locals() else None,
                         error=str(e),
                         target_column=target_column)
-            # Clean up temporary table on error
-            if 'temp_table_id' in locals():
-                self._cleanup_temp_table(temp_table_id)
             raise
     
     def _build_gemini_text_query(
@@ -298,189 +551,269 @@ class GeminiIntegration:
         temperature: float,
         max_tokens: int,
         **kwargs
-    ) -> str:
-        """Build the BigFrames Gemini text generation query."""
-        # Escape single quotes in the prompt
-        escaped_prompt = prompt.replace("'", "\\'")
+    ) -> Tuple[str, bigquery.QueryJobConfig]:
+        """
+        Build the BigFrames Gemini text generation query.
         
-        query = f"""
-        SELECT 
-            bigframes.ml.llm.GeminiTextGenerator(
-                '{escaped_prompt}',
-                '{model_name}',
-                STRUCT(
-                    {temperature} as temperature,
-                    {max_tokens} as max_tokens
-                )
-            ) as gemini_text_result,
-            CURRENT_TIMESTAMP() as timestamp
+        The SQL text is constant and all inputs are bound as query
+        parameters, so prompts cannot break out of the query.
         """
-        return query
+        job_config = bigquery.QueryJobConfig(query_parameters=[
+            bigquery.ScalarQueryParameter("prompt", "STRING", prompt),
+            bigquery.ScalarQueryParameter("model_name", "STRING", model_name),
+            bigquery.ScalarQueryParameter("temperature", "FLOAT64", temperature),
+            bigquery.ScalarQueryParameter("max_tokens", "INT64", max_tokens)
+        ])
+        return self._TEXT_QUERY, job_config
     
     def _build_gemini_embedding_query(
         self,
         text: str,
         model_name: str,
         **kwargs
-    ) -> str:
+    ) -> Tuple[str, bigquery.QueryJobConfig]:
         """Build the BigFrames Gemini embedding generation query."""
-        # Escape single quotes in the text
-        escaped_text = text.replace("'", "\\'")
+        job_config = bigquery.QueryJobConfig(query_parameters=[
+            bigquery.ScalarQueryParameter("text", "STRING", text),
+            bigquery.ScalarQueryParameter("model_name", "STRING", model_name)
+        ])
+        return self._EMBEDDING_QUERY, job_config
+    
+    def _build_inline_gemini_forecast_query(
+        self,
+        rows: List[Dict[str, Any]],
+        target_column: str,
+        time_column: str,
+        forecast_horizon: int,
+        **kwargs
+    ) -> Tuple[str, bigquery.QueryJobConfig]:
+        """
+        Build the BigFrames Gemini forecast query with the series bound inline.
         
-        query = f"""
-        SELECT 
-            bigframes.ml.llm.TextEmbeddingGenerator(
-                '{escaped_text}',
-                '{model_name}'
-            ) as gemini_embedding_result,
-            CURRENT_TIMESTAMP() as timestamp
+        The rows are passed as an ARRAY<STRUCT> query parameter and read
+        through UNNEST, replacing the create, insert and delete round-trips
+        of a temporary table with a single query.
         """
-        return query
+        return self._render_gemini_forecast_query(
+            table_sql="(SELECT * FROM UNNEST(@series))",
+            target_column=target_column,
+            time_column=time_column,
+            forecast_horizon=forecast_horizon,
+            extra_params=[self._series_parameter(rows, target_column, time_column)]
+        )
     
-    def _build_gemini_forecast_query(
+    def _build_session_gemini_forecast_query(
         self,
-        temp_table_id: str,
+        rows: List[Dict[str, Any]],
         target_column: str,
         time_column: str,
         forecast_horizon: int,
         **kwargs
-    ) -> str:
-        """Build the BigFrames Gemini forecast query."""
+    ) -> Tuple[str, bigquery.QueryJobConfig]:
+        """
+        Build a script that stages the series in a session temp table and forecasts it.
+        
+        The temp table belongs to the BigQuery session, which drops it when
+        the session ends, so no separate create or delete calls are needed.
+        """
+        query, job_config = self._render_gemini_forecast_query(
+            table_sql=f"TABLE {self.FORECAST_SERIES_TABLE}",
+            target_column=target_column,
+            time_column=time_column,
+            forecast_horizon=forecast_horizon,
+            extra_params=[self._series_parameter(rows, target_column, time_column)]
+        )
+        script = f"""
+        CREATE OR REPLACE TEMP TABLE {self.FORECAST_SERIES_TABLE} AS
+        SELECT * FROM UNNEST(@series);
+        {query.strip()};
+        """
+        return script, job_config
+    
+    @staticmethod
+    def _series_parameter(
+        rows: List[Dict[str, Any]],
+        target_column: str,
+        time_column: str
+    ) -> bigquery.ArrayQueryParameter:
+        """Bind a time series as an ARRAY<STRUCT<time, target>> query parameter."""
+        for name, kind in ((target_column, "target column"), (time_column, "time column")):
+            if not _IDENTIFIER_PATTERN.fullmatch(name):
+                raise ValueError(f"Invalid {kind}: {name!r}")
+        
+        series = [
+            bigquery.StructQueryParameter(
+                None,
+                bigquery.ScalarQueryParameter(time_column, "TIMESTAMP", row.get(time_column)),
+                bigquery.ScalarQueryParameter(target_column, "FLOAT64", row.get(target_column))
+            )
+            for row in rows
+        ]
+        return bigquery.ArrayQueryParameter("series", "STRUCT", series)
+    
+    def _render_gemini_forecast_query(
+        self,
+        table_sql: str,
+        target_column: str,
+        time_column: str,
+        forecast_horizon: int,
+        extra_params: Optional[List[Any]] = None
+    ) -> Tuple[str, bigquery.QueryJobConfig]:
+        """Render the BigFrames Gemini forecast query over a table expression."""
         query = f"""
         SELECT 
             bigframes.DataFrame.ai.forecast(
-                TABLE `{temp_table_id}`,
-                '{target_column}',
-                '{time_column}',
-                {forecast_horizon}
+                {table_sql},
+                @target_column,
+                @time_column,
+                @forecast_horizon
             ) as gemini_forecast_result,
             CURRENT_TIMESTAMP() as timestamp
         """
-        return query
+        job_config = bigquery.QueryJobConfig(query_parameters=[
+            bigquery.ScalarQueryParameter("target_column", "STRING", target_column),
+            bigquery.ScalarQueryParameter("time_column", "STRING", time_column),
+            bigquery.ScalarQueryParameter("forecast_horizon", "INT64", forecast_horizon),
+            *(extra_params or [])
+        ])
+        return query, job_config
     
-    def _create_temp_table(
-        self,
-        time_series_data: List[Dict[str, Any]],
-        target_column: str,
-        time_column: str
-    ) -> str:
-        """Create a temporary table with time series data."""
-        try:
-            # Generate unique table name
-            temp_table_name = f"temp_gemini_forecast_{uuid.uuid4().hex[:8]}"
-            temp_table_id = f"{self.config['project_id']}.{self.config['dataset_id']}.{temp_table_name}"
-            
-            # Create table schema
-            schema = [
-                bigquery.SchemaField(time_column, "TIMESTAMP"),
-                bigquery.SchemaField(target_column, "FLOAT64")
-            ]
-            
-            # Create the table
-            table = bigquery.Table(temp_table_id, schema=schema)
-            self.client.create_table(table, exists_ok=True)
-            
-            # Insert the data
-            errors = self.client.insert_rows_json(temp_table_id, time_series_data)
-            if errors:
-                raise ValueError(f"Failed to insert data into temp table: {errors}")
-            
-            logger.info("Temporary table created successfully", temp_table_id=temp_table_id)
-            return temp_table_id
-            
-        except Exception as e:
-            logger.error("Failed to create temporary table", error=str(e))
-            raise
-    
-    def _cleanup_temp_table(self, temp_table_id: str) -> None:
-        """Clean up temporary table after use."""
-        try:
-            self.client.delete_table(temp_table_id, not_found_ok=True)
-            logger.info("Temporary table cleaned up", temp_table_id=temp_table_id)
-        except Exception as e:
-            logger.warning("Failed to clean up temporary table",
-                          temp_table_id=temp_table_id,
-                          error=str(e))
+    def _run_session_forecast(self, **query_kwargs: Any) -> Optional[Any]:
+        """
+        Run a large-series forecast script in this instance's BigQuery session.
+        
+        The session is opened by the first such forecast and reused after
+        that. Forecasts are serialized because they share the session temp
+        table, and a failed script discards the session so the next call
+        starts a fresh one.
+        """
+        query, job_config = self._build_session_gemini_forecast_query(**query_kwargs)
+        
+        with self._session_lock:
+            if self._session_id is None:
+                job_config.create_session = True
+            else:
+                job_config.connection_properties = [
+                    bigquery.ConnectionProperty("session_id", self._session_id)
+                ]
+            
+            try:
+                query_job = self.client.query(query, job_config=job_config)
+                row = next(iter(query_job.result(max_results=1)), None)
+            except Exception:
+                self._session_id = None
+                raise
+            
+            if self._session_id is None and query_job.session_info is not None:
+                self._session_id = query_job.session_info.session_id
+                logger.info("BigQuery session started", session_id=self._session_id)
+            return row
     
     def _store_gemini_generation(
         self,
         generation_id: str,
         prompt: str,
-        generated_text: str,
+        generated_text: Optional[str],
         model_name: str,
         generation_type: str,
-        parameters: Dict[str, Any]
+        parameters: Dict[str, Any],
+        embedding: Optional[List[float]] = None
     ) -> None:
-        """Store the Gemini generation result in BigQuery."""
+        """
+        Queue the Gemini generation result for storage in BigQuery.
+        
+        Embeddings are stored in the ARRAY<FLOAT64> ``embedding`` column
+        rather than as text, and parameters as JSON.
+        """
+        row = {
+            'generation_id': generation_id,
+            'prompt': prompt,
+            'generated_text': generated_text,
+            'model_name': model_name,
+            'generation_type': generation_type,
+            # JSON columns accept serialized JSON text
+            'parameters': orjson.dumps(
+                parameters,
+                default=str,
+                option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS
+            ).decode(),
+            # Stored so usage stats need not scan the text columns
+            'prompt_length': len(prompt),
+            'output_length': len(generated_text) if generated_text is not None else None,
+            'timestamp': datetime.now(timezone.utc).isoformat()
+        }
+        if embedding is not None:
+            row['embedding'] = embedding
+        self._write_queue.put(row)
+    
+    @staticmethod
+    def _insert_generation_rows(client: Client, table_id: str, rows: List[Dict[str, Any]]) -> None:
+        """Insert a batch of queued Gemini generation rows."""
+        generation_ids = [row['generation_id'] for row in rows]
         try:
-            table_id = f"{self.config['project_id']}.{self.config['dataset_id']}.gemini_generations"
-            
-            # Prepare the row data
-            row = {
-                'generation_id': generation_id,
-                'prompt': prompt,
-                'generated_text': generated_text,
-                'model_name': model_name,
-                'generation_type': generation_type,
-                'parameters': str(parameters),
-                'timestamp': bigquery.ScalarQueryParameter('timestamp', 'TIMESTAMP', None)
-            }
-            
-            # Insert the row
-            errors = self.client.insert_rows_json(table_id, [row])
+            errors = client.insert_rows_json(table_id, rows)
             if errors:
-                logger.warning("Failed to store Gemini generation in BigQuery",
-                              generation_id=generation_id,
+                logger.warning("Failed to store Gemini generations in BigQuery",
+                              generation_ids=generation_ids,
                               errors=errors)
             else:
-                logger.info("Gemini generation stored in BigQuery successfully",
-                           generation_id=generation_id)
+                logger.info("Gemini generations stored in BigQuery successfully",
+                           num_rows=len(rows))
                 
         except Exception as e:
-            logger.warning("Failed to store Gemini generation in BigQuery",
-                          generation_id=generation_id,
+            logger.warning("Failed to store Gemini generations in BigQuery",
+                          generation_ids=generation_ids,
                           error=str(e))
     
     def get_gemini_usage_stats(self) -> Dict[str, Any]:
-        """Get usage statistics for Gemini operations."""
+        """
+        Get usage statistics for Gemini operations.
+        
+        The overall figures and the per-type distribution are rolled up from
+        one grouped scan of the generations table in a single query.
+        """
         try:
             # Query usage statistics
             query = f"""
+            WITH per_type AS (
+                SELECT 
+                    generation_type,
+                    COUNT(*) as count,
+                    SUM(prompt_length) as prompt_chars,
+                    COUNT(prompt_length) as prompts,
+                    SUM(output_length) as output_chars,
+                    COUNT(output_length) as outputs,
+                    ARRAY_AGG(DISTINCT model_name IGNORE NULLS) as models,
+                    MIN(timestamp) as first_usage,
+                    MAX(timestamp) as last_usage
+                FROM `{self._generations_table}`
+                GROUP BY generation_type
+            )
             SELECT 
-                COUNT(*) as total_generations,
-                COUNT(DISTINCT model_name) as unique_models,
-                COUNT(DISTINCT generation_type) as unique_generation_types,
-                AVG(LENGTH(prompt)) as avg_prompt_length,
-                AVG(LENGTH(generated_text)) as avg_output_length,
-                MIN(timestamp) as first_usage,
-                MAX(timestamp) as last_usage
-            FROM `{self.config['project_id']}.{self.config['dataset_id']}.gemini_generations`
+                IFNULL(SUM(count), 0) as total_generations,
+                (SELECT COUNT(DISTINCT model) FROM per_type, UNNEST(models) as model) as unique_models,
+                COUNT(generation_type) as unique_generation_types,
+                SAFE_DIVIDE(SUM(prompt_chars), SUM(prompts)) as avg_prompt_length,
+                SAFE_DIVIDE(SUM(output_chars), SUM(outputs)) as avg_output_length,
+                MIN(first_usage) as first_usage,
+                MAX(last_usage) as last_usage,
+                ARRAY_AGG(STRUCT(generation_type, count) ORDER BY count DESC) as generation_types
+            FROM per_type
             """
             
             query_job = self.client.query(query)
-            results = list(query_job.result())
+            row = next(iter(query_job.result(max_results=1)), None)
             
-            if not results:
+            if row is None:
                 return {'error': 'No usage data found'}
             
-            stats = dict(results[0])
+            stats = dict(row)
             
             # Get generation type distribution
-            type_query = f"""
-            SELECT 
-                generation_type,
-                COUNT(*) as count
-            FROM `{self.config['project_id']}.{self.config['dataset_id']}.gemini_generations`
-            GROUP BY generation_type
-            ORDER BY count DESC
-            """
-            
-            type_job = self.client.query(type_query)
-            type_results = list(type_job.result())
-            
+            type_results = stats.pop('generation_types', None)
             if type_results:
                 stats['generation_type_distribution'] = {
-                    result.generation_type: result.count 
+                    result['generation_type']: result['count']
                     for result in type_results
                 }
             
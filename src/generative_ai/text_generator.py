@@ -5,24 +5,121 @@ This module provides a Python interface to BigQuery's ML.GENERATE_TEXT function,
 enabling large-scale text generation directly within BigQuery.
 """
 
-import uuid
-from typing import List, Dict, Any, Optional, Union
+import asyncio
+import re
+import threading
+import weakref
+from concurrent.futures import Future
+from datetime import datetime, timezone
+from functools import lru_cache, partial
+from typing import Iterator, List, Dict, Any, Optional, Sequence, Tuple, Union, Set, Coroutine
+import orjson
 from google.cloud import bigquery
 from google.cloud.bigquery import Client
 import structlog
-from ..config.bigquery_config import get_bigquery_client, get_bigquery_config
+from ..config.bigquery_config import get_bigquery_client, get_bigquery_config, get_bigquery_settings
+from ..utils import ResponseCache, WriteQueue, make_cache_key, uuid7
 
 logger = structlog.get_logger(__name__)
 
+# Model names and option names are interpolated into the SQL text, so they
+# are restricted to identifier characters
+_MODEL_NAME_PATTERN = re.compile(r"[A-Za-z0-9_.\-]+")
+_OPTION_NAME_PATTERN = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+
+
+def _option_parameter(name: str, value: Any) -> Optional[Any]:
+    """Build a query parameter for a model option, or None for unsupported values."""
+    if isinstance(value, bool):
+        return bigquery.ScalarQueryParameter(name, "BOOL", value)
+    if isinstance(value, int):
+        return bigquery.ScalarQueryParameter(name, "INT64", value)
+    if isinstance(value, float):
+        return bigquery.ScalarQueryParameter(name, "FLOAT64", value)
+    if isinstance(value, str):
+        return bigquery.ScalarQueryParameter(name, "STRING", value)
+    if isinstance(value, (list, tuple)) and all(isinstance(item, str) for item in value):
+        return bigquery.ArrayQueryParameter(name, "STRING", list(value))
+    return None
+
+
+def _to_json(value: Any) -> str:
+    """Serialize ``value`` to JSON text for JSON columns, with stable key order."""
+    return orjson.dumps(
+        value,
+        default=str,
+        option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS
+    ).decode()
+
 
 class TextGenerator:
     """BigQuery ML.GENERATE_TEXT implementation for text generation."""
     
-    def __init__(self, client: Optional[Client] = None):
-        """Initialize TextGenerator with BigQuery client."""
+    # Columns that get_generation_history can return
+    HISTORY_FIELDS = (
+        'id',
+        'content_type',
+        'input_data',
+        'generated_content',
+        'model_name',
+        'model_parameters',
+        'status',
+        'created_at'
+    )
+    
+    # Generation records are written in the background in batches of up to
+    # STORE_BATCH_SIZE rows, or whatever arrived within STORE_FLUSH_SECONDS
+    STORE_BATCH_SIZE = 500
+    STORE_FLUSH_SECONDS = 5.0
+    
+    # Concurrent agenerate_text_batched calls arriving within this window
+    # are merged into a single batch query of up to COALESCE_MAX_BATCH prompts
+    COALESCE_WINDOW_SECONDS = 0.05
+    COALESCE_MAX_BATCH = 64
+    
+    # Page size for streamed batch results
+    RESULT_PAGE_SIZE = 1000
+    
+    def __init__(self, client: Optional[Client] = None, cache: Optional[ResponseCache] = None):
+        """
+        Initialize TextGenerator with BigQuery client.
+        
+        Args:
+            client: BigQuery client; defaults to the shared client
+            cache: In-process cache of generation results for deterministic
+                or explicitly cached calls
+        """
         self.client = client or get_bigquery_client()
         self.config = get_bigquery_config()
+        self._cache = cache if cache is not None else ResponseCache()
         
+        # Cacheable calls already running, keyed by cache key, so identical
+        # concurrent calls share one query instead of each submitting their own
+        self._inflight: Dict[str, Future] = {}
+        self._inflight_lock = threading.Lock()
+        self._pending_batches: Dict[str, Tuple[List[str], "asyncio.Future"]] = {}
+        # Running batch tasks, referenced until done so they are not garbage collected
+        self._batch_tasks: Set["asyncio.Task"] = set()
+        
+        # Storage runs off the caller's critical path
+        self._write_queue = WriteQueue(
+            partial(self._store_generations, self.client, self.config.get_full_table_id("generated_content")),
+            max_batch=self.STORE_BATCH_SIZE,
+            max_wait_seconds=self.STORE_FLUSH_SECONDS,
+            name="text-generator-store"
+        )
+        # Closes the queue when the generator is garbage collected or at
+        # exit; it holds the queue, not the generator
+        self._finalizer = weakref.finalize(self, self._write_queue.close)
+    
+    def flush(self) -> None:
+        """Wait for queued generation writes to finish."""
+        self._write_queue.flush()
+    
+    def close(self) -> None:
+        """Flush queued writes and stop the writer thread."""
+        self._finalizer()
+    
     def generate_text(
         self,
         prompt: str,
@@ -31,6 +128,7 @@ class TextGenerator:
         max_tokens: int = 1024,
         top_p: float = 0.9,
         top_k: int = 40,
+        use_cache: bool = False,
         **kwargs
     ) -> Dict[str, Any]:
         """
@@ -43,17 +141,48 @@ class TextGenerator:
             max_tokens: Maximum number of tokens to generate
             top_p: Nucleus sampling parameter
             top_k: Top-k sampling parameter
+            use_cache: Serve repeated calls from cache even when sampling;
+                deterministic calls (temperature 0) are always cached
             **kwargs: Additional model-specific parameters
             
         Returns:
             Dictionary containing generated text and metadata
         """
         try:
+            # Only deterministic generations are safe to serve from cache by default
+            cache_key = None
+            if use_cache or temperature == 0.0:
+                cache_key = make_cache_key(
+                    prompt=prompt,
+                    model=model_name,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    top_p=top_p,
+                    top_k=top_k,
+                    **kwargs
+                )
+                cached = self._cache.get(cache_key)
+                if cached is not None:
+                    logger.info("Serving ML.GENERATE_TEXT result from cache",
+                               generation_id=cached['id'],
+                               model=model_name)
+                    return {**cached, 'metadata': {**cached['metadata'], 'cache_hit': True}}
+                
+                with self._inflight_lock:
+                    inflight = self._inflight.get(cache_key)
+                    if inflight is None:
+                        self._inflight[cache_key] = Future()
+                if inflight is not None:
+                    logger.info("Waiting for identical in-flight ML.GENERATE_TEXT call",
+                               model=model_name)
+                    return {**inflight.result()}
+            
             # Create unique ID for this generation
-            generation_id = str(uuid.uuid4())
+            generation_id = uuid7()
+            prompt_length = len(prompt)
             
             # Build the ML.GENERATE_TEXT query
-            query = self._build_generate_text_query(
+            query, job_config = self._build_generate_text_query(
                 prompt=prompt,
                 model_name=model_name,
                 temperature=temperature,
@@ -66,17 +195,18 @@ class TextGenerator:
             logger.info("Executing ML.GENERATE_TEXT query", 
                        generation_id=generation_id,
                        model=model_name,
-                       prompt_length=len(prompt))
+                       prompt_length=prompt_length)
             
             # Execute the query
-            query_job = self.client.query(query)
-            results = list(query_job.result())
+            query_job = self.client.query(query, job_config=job_config)
+            row = next(iter(query_job.result(max_results=1)), None)
             
-            if not results:
+            if row is None:
                 raise ValueError("No results returned from ML.GENERATE_TEXT")
             
             # Extract the generated text
-            generated_text = results[0].get('generated_text', '')
+            generated_text = row.get('generated_text', '')
+            output_length = len(generated_text)
             
             # Store the generation in BigQuery
             self._store_generation(
@@ -95,9 +225,9 @@ class TextGenerator:
             
             logger.info("Text generation completed successfully",
                        generation_id=generation_id,
-                       output_length=len(generated_text))
+                       output_length=output_length)
             
-            return {
+            result = {
                 'id': generation_id,
                 'generated_text': generated_text,
                 'model_name': model_name,
@@ -109,18 +239,176 @@ class TextGenerator:
                     **kwargs
                 },
                 'metadata': {
-                    'input_length': len(prompt),
-                    'output_length': len(generated_text),
+                    'input_length': prompt_length,
+                    'output_length': output_length,
                     'timestamp': query_job.ended.isoformat() if query_job.ended else None
                 }
             }
+            if cache_key is not None:
+                self._cache.set(cache_key, result)
+                self._finish_inflight(cache_key, result=result)
+            return result
             
         except Exception as e:
             logger.error("Text generation failed", 
                         error=str(e),
                         generation_id=generation_id if 'generation_id' in locals() else None)
+            if 'inflight' in locals() and inflight is None:
+                self._finish_inflight(cache_key, error=e)
             raise
     
+    def _finish_inflight(
+        self,
+        cache_key: str,
+        result: Optional[Dict[str, Any]] = None,
+        error: Optional[BaseException] = None
+    ) -> None:
+        """Hand the outcome of an in-flight call to any callers waiting on it."""
+        with self._inflight_lock:
+            future = self._inflight.pop(cache_key, None)
+        if future is None:
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+    
+    async def agenerate_text(self, prompt: str, **kwargs) -> Dict[str, Any]:
+        """
+        Run ``generate_text`` without blocking the event loop.
+        
+        Args:
+            prompt: The input prompt for text generation
+            **kwargs: Arguments passed to ``generate_text``
+            
+        Returns:
+            Dictionary containing generated text and metadata
+        """
+        return await asyncio.to_thread(self.generate_text, prompt, **kwargs)
+    
+    async def agenerate_text_batched(
+        self,
+        prompt: str,
+        model_name: str = "gemini-pro",
+        temperature: float = 0.7,
+        max_tokens: int = 1024,
+        top_p: float = 0.9,
+        top_k: int = 40,
+        **kwargs
+    ) -> Dict[str, Any]:
+        """
+        Generate text for one prompt, coalescing concurrent callers.
+        
+        Calls with identical generation parameters that arrive within
+        ``COALESCE_WINDOW_SECONDS`` of each other are merged into a single
+        ``batch_generate_text`` query, trading a few milliseconds of latency
+        for one query job per batch instead of one per prompt.
+        
+        Returns:
+            Dictionary containing generated text and metadata
+        """
+        params = {
+            'model_name': model_name,
+            'temperature': temperature,
+            'max_tokens': max_tokens,
+            'top_p': top_p,
+            'top_k': top_k,
+            **kwargs
+        }
+        key = make_cache_key(**params)
+        loop = asyncio.get_running_loop()
+        
+        pending = self._pending_batches.get(key)
+        if pending is None:
+            pending = ([], loop.create_future())
+            self._pending_batches[key] = pending
+            loop.call_later(
+                self.COALESCE_WINDOW_SECONDS,
+                self._flush_pending_batch, key, pending, params
+            )
+        
+        batch_prompts, future = pending
+        index = len(batch_prompts)
+        batch_prompts.append(prompt)
+        if len(batch_prompts) >= self.COALESCE_MAX_BATCH:
+            self._flush_pending_batch(key, pending, params)
+        
+        result = (await future)[index]
+        if result.get('status') == 'failed':
+            raise RuntimeError(result['error'])
+        return result
+    
+    def _start_batch_task(self, coro: Coroutine[Any, Any, None]) -> None:
+        """Run ``coro`` as a task, keeping a reference until it finishes."""
+        task = asyncio.get_running_loop().create_task(coro)
+        self._batch_tasks.add(task)
+        task.add_done_callback(self._batch_tasks.discard)
+    
+    def _flush_pending_batch(
+        self,
+        key: str,
+        pending: Tuple[List[str], "asyncio.Future"],
+        params: Dict[str, Any]
+    ) -> None:
+        """Close a coalesced batch to new callers and start its query."""
+        # A full batch is flushed early, so the timer may find it already gone
+        if self._pending_batches.get(key) is not pending:
+            return
+        del self._pending_batches[key]
+        self._start_batch_task(self._run_pending_batch(*pending, params))
+    
+    async def _run_pending_batch(
+        self,
+        prompts: List[str],
+        future: "asyncio.Future",
+        params: Dict[str, Any]
+    ) -> None:
+        """Run a coalesced batch and hand the results to every waiting caller."""
+        try:
+            results = await asyncio.to_thread(self.batch_generate_text, prompts, **params)
+        except Exception as e:
+            future.set_exception(e)
+        else:
+            future.set_result(results)
+    
+    async def generate_text_many(
+        self,
+        requests: List[Dict[str, Any]],
+        max_in_flight: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Run several text generations with their own parameters concurrently.
+        
+        Prompts that share parameters are cheaper through
+        ``batch_generate_text``, which sends them in a single query.
+        
+        Args:
+            requests: Keyword arguments for ``generate_text``, one dict per generation
+            max_in_flight: Maximum concurrent queries; defaults to the
+                environment's ``max_in_flight_queries`` setting
+            
+        Returns:
+            Generation results in the same order as ``requests``; failed
+            generations are reported with ``status`` set to ``'failed'``
+        """
+        semaphore = asyncio.Semaphore(
+            max_in_flight or get_bigquery_settings()["max_in_flight_queries"]
+        )
+        
+        async def run(request: Dict[str, Any]) -> Dict[str, Any]:
+            async with semaphore:
+                try:
+                    return await self.agenerate_text(**request)
+                except Exception as e:
+                    return {
+                        'error': str(e),
+                        'prompt': request.get('prompt'),
+                        'status': 'failed'
+                    }
+        
+        logger.info("Executing concurrent ML.GENERATE_TEXT queries", num_requests=len(requests))
+        return list(await asyncio.gather(*(run(request) for request in requests)))
+    
     def _build_generate_text_query(
         self,
         prompt: str,
@@ -130,35 +418,108 @@ class TextGenerator:
         top_p: float,
         top_k: int,
         **kwargs
-    ) -> str:
-        """Build the ML.GENERATE_TEXT SQL query."""
+    ) -> Tuple[str, bigquery.QueryJobConfig]:
+        """
+        Build the ML.GENERATE_TEXT SQL query.
         
-        # Base query structure
-        query = f"""
+        The prompt and every option value are bound as query parameters, so
+        prompts cannot break out of the query and the SQL text only varies
+        with the model and the set of options.
+        """
+        options, query_parameters = self._build_options(
+            temperature, max_tokens, top_p, top_k, **kwargs
+        )
+        
+        query_parameters.append(bigquery.ScalarQueryParameter("prompt", "STRING", prompt))
+        return self._generate_text_sql(model_name, options), bigquery.QueryJobConfig(
+            query_parameters=query_parameters
+        )
+    
+    @classmethod
+    @lru_cache(maxsize=256)
+    def _generate_text_sql(cls, model_name: str, options: str) -> str:
+        """Render the ML.GENERATE_TEXT SQL once per model and options STRUCT."""
+        return f"""
         SELECT 
             ml_generate_text_result as generated_text,
             ml_generate_text_metadata as metadata
         FROM ML.GENERATE_TEXT(
-            MODEL `{model_name}`,
-            (SELECT '{prompt}' as prompt),
-            STRUCT(
-                {temperature} as temperature,
-                {max_tokens} as max_output_tokens,
-                {top_p} as top_p,
-                {top_k} as top_k
+            MODEL `{cls._validate_model_name(model_name)}`,
+            (SELECT @prompt as prompt),
+            {options}
+        )"""
+    
+    def _build_batch_generate_text_query(
+        self,
+        prompts: List[str],
+        model_name: str,
+        temperature: float,
+        max_tokens: int,
+        top_p: float,
+        top_k: int,
+        **kwargs
+    ) -> Tuple[str, bigquery.QueryJobConfig]:
         """
+        Build one ML.GENERATE_TEXT SQL query over an array of prompts.
         
-        # Add additional parameters if provided
-        if kwargs:
-            for key, value in kwargs.items():
-                if isinstance(value, (int, float)):
-                    query += f",\n                {value} as {key}"
-                elif isinstance(value, str):
-                    query += f",\n                '{value}' as {key}"
+        The prompts are bound as the ``@prompts`` ARRAY<STRING> parameter;
+        each row carries its offset in the array so results can be matched
+        back to their prompts.
+        """
+        options, query_parameters = self._build_options(
+            temperature, max_tokens, top_p, top_k, **kwargs
+        )
+        
+        query = f"""
+        SELECT 
+            prompt_index,
+            GENERATE_UUID() as generation_id,
+            ml_generate_text_result as generated_text,
+            ml_generate_text_status as status
+        FROM ML.GENERATE_TEXT(
+            MODEL `{self._validate_model_name(model_name)}`,
+            (SELECT prompt, prompt_index FROM UNNEST(@prompts) AS prompt WITH OFFSET AS prompt_index),
+            {options}
+        )"""
+        
+        query_parameters.append(bigquery.ArrayQueryParameter("prompts", "STRING", prompts))
+        return query, bigquery.QueryJobConfig(query_parameters=query_parameters)
+    
+    @staticmethod
+    def _validate_model_name(model_name: str) -> str:
+        """Return ``model_name`` if it is safe to use as a model reference, else raise ValueError."""
+        if not _MODEL_NAME_PATTERN.fullmatch(model_name):
+            raise ValueError(f"Invalid model name: {model_name!r}")
+        return model_name
+    
+    @staticmethod
+    def _build_options(
+        temperature: float,
+        max_tokens: int,
+        top_p: float,
+        top_k: int,
+        **kwargs
+    ) -> Tuple[str, List[Any]]:
+        """Build the ML.GENERATE_TEXT options STRUCT and its query parameters."""
+        query_parameters = [
+            bigquery.ScalarQueryParameter("temperature", "FLOAT64", temperature),
+            bigquery.ScalarQueryParameter("max_output_tokens", "INT64", max_tokens),
+            bigquery.ScalarQueryParameter("top_p", "FLOAT64", top_p),
+            bigquery.ScalarQueryParameter("top_k", "INT64", top_k)
+        ]
         
-        query += "\n            ) as options\n        )"
+        # Add additional parameters if provided
+        for key, value in kwargs.items():
+            if not _OPTION_NAME_PATTERN.fullmatch(key):
+                raise ValueError(f"Invalid option name: {key!r}")
+            parameter = _option_parameter(key, value)
+            if parameter is not None:
+                query_parameters.append(parameter)
         
-        return query
+        fields = ",\n                ".join(
+            f"@{parameter.name} as {parameter.name}" for parameter in query_parameters
+        )
+        return f"STRUCT(\n                {fields}\n            ) as options", query_parameters
     
     def _store_generation(
         self,
@@ -168,85 +529,195 @@ class TextGenerator:
         model_name: str,
         parameters: Dict[str, Any]
     ):
-        """Store the text generation in BigQuery for tracking and analysis."""
-        try:
-            table_id = self.config.get_full_table_id("generated_content")
-            
-            # Prepare the row data
-            row = {
-                'id': generation_id,
-                'content_type': 'text_generation',
-                'input_data': {
-                    'prompt': prompt,
-                    'model_name': model_name,
-                    'parameters': parameters
-                },
-                'generated_content': generated_text,
+        """Queue the text generation for storage in BigQuery for tracking and analysis."""
+        self._write_queue.put(
+            self._generation_row(generation_id, prompt, generated_text, model_name, parameters)
+        )
+    
+    @staticmethod
+    def _generation_row(
+        generation_id: str,
+        prompt: str,
+        generated_text: str,
+        model_name: str,
+        parameters: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Build a generated_content row for a text generation."""
+        return {
+            'id': generation_id,
+            'content_type': 'text_generation',
+            'input_data': _to_json({
+                'prompt': prompt,
                 'model_name': model_name,
-                'model_parameters': parameters,
-                'status': 'success',
-                'created_at': bigquery.ScalarQueryParameter(
-                    'timestamp', 'TIMESTAMP', 
-                    bigquery.datetime.datetime.now(bigquery.datetime.timezone.utc)
-                )
-            }
-            
-            # Insert the row
-            errors = self.client.insert_rows_json(table_id, [row])
+                'parameters': parameters
+            }),
+            'generated_content': generated_text,
+            'model_name': model_name,
+            'model_parameters': _to_json(parameters),
+            'status': 'success',
+            'created_at': datetime.now(timezone.utc).isoformat()
+        }
+    
+    @staticmethod
+    def _store_generations(client: Client, table_id: str, rows: List[Dict[str, Any]]) -> None:
+        """Store text generation rows in BigQuery with a single insert."""
+        generation_ids = [row['id'] for row in rows]
+        try:
+            # Insert the rows
+            errors = client.insert_rows_json(table_id, rows)
             
             if errors:
                 logger.warning("Failed to store generation metadata", 
                              errors=errors,
-                             generation_id=generation_id)
+                             generation_ids=generation_ids)
             else:
                 logger.debug("Generation metadata stored successfully",
-                           generation_id=generation_id)
+                           generation_ids=generation_ids)
                 
         except Exception as e:
             logger.warning("Failed to store generation metadata",
                          error=str(e),
-                         generation_id=generation_id)
+                         generation_ids=generation_ids)
     
     def batch_generate_text(
         self,
         prompts: List[str],
         model_name: str = "gemini-pro",
+        temperature: float = 0.7,
+        max_tokens: int = 1024,
+        top_p: float = 0.9,
+        top_k: int = 40,
         **kwargs
     ) -> List[Dict[str, Any]]:
         """
         Generate text for multiple prompts in batch.
         
+        All prompts are sent through ML.GENERATE_TEXT in a single query job,
+        and the successful generations are queued for a batched insert.
+        
         Args:
             prompts: List of input prompts
             model_name: The model to use for generation
-            **kwargs: Additional parameters for text generation
+            temperature: Controls randomness (0.0 = deterministic, 1.0 = random)
+            max_tokens: Maximum number of tokens to generate
+            top_p: Nucleus sampling parameter
+            top_k: Top-k sampling parameter
+            **kwargs: Additional model-specific parameters
             
         Returns:
-            List of generation results
+            List of generation results, in the order of ``prompts``
         """
-        results = []
-        
-        for i, prompt in enumerate(prompts):
-            try:
-                logger.info(f"Processing prompt {i+1}/{len(prompts)}")
-                result = self.generate_text(prompt, model_name, **kwargs)
-                results.append(result)
-            except Exception as e:
-                logger.error(f"Failed to generate text for prompt {i+1}",
-                           error=str(e),
-                           prompt=prompt[:100] + "..." if len(prompt) > 100 else prompt)
-                results.append({
-                    'error': str(e),
-                    'prompt': prompt,
-                    'status': 'failed'
-                })
-        
+        results: List[Dict[str, Any]] = [None] * len(prompts)
+        for result in self.iter_batch_generate_text(
+            prompts,
+            model_name=model_name,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            top_p=top_p,
+            top_k=top_k,
+            **kwargs
+        ):
+            results[result.pop('prompt_index')] = result
         return results
     
+    def iter_batch_generate_text(
+        self,
+        prompts: List[str],
+        model_name: str = "gemini-pro",
+        temperature: float = 0.7,
+        max_tokens: int = 1024,
+        top_p: float = 0.9,
+        top_k: int = 40,
+        **kwargs
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Stream batch generation results as BigQuery returns them.
+        
+        Rows are read page by page instead of being materialized. Results
+        arrive in no particular order, so each carries the ``prompt_index``
+        of its prompt; prompts without a row are reported as failed last.
+        
+        Yields:
+            Generation results, each with its ``prompt_index``
+        """
+        if not prompts:
+            return
+        
+        parameters = {
+            'temperature': temperature,
+            'max_tokens': max_tokens,
+            'top_p': top_p,
+            'top_k': top_k,
+            **kwargs
+        }
+        
+        try:
+            query, job_config = self._build_batch_generate_text_query(
+                prompts=prompts,
+                model_name=model_name,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                top_p=top_p,
+                top_k=top_k,
+                **kwargs
+            )
+            
+            logger.info("Executing batch ML.GENERATE_TEXT query",
+                       model=model_name,
+                       num_prompts=len(prompts))
+            
+            query_job = self.client.query(query, job_config=job_config)
+            rows = query_job.result(page_size=self.RESULT_PAGE_SIZE)
+            timestamp = query_job.ended.isoformat() if query_job.ended else None
+            
+        except Exception as e:
+            logger.error("Batch text generation failed",
+                        error=str(e),
+                        num_prompts=len(prompts))
+            for i, prompt in enumerate(prompts):
+                yield {'prompt_index': i, 'error': str(e), 'prompt': prompt, 'status': 'failed'}
+            return
+        
+        def failed(i: int, error: str) -> Dict[str, Any]:
+            prompt = prompts[i]
+            logger.error(f"Failed to generate text for prompt {i+1}",
+                       error=error,
+                       prompt=prompt[:100] + "..." if len(prompt) > 100 else prompt)
+            return {'prompt_index': i, 'error': error, 'prompt': prompt, 'status': 'failed'}
+        
+        pending = set(range(len(prompts)))
+        for row in rows:
+            i = row.get('prompt_index')
+            pending.discard(i)
+            if row.get('status'):
+                yield failed(i, row.get('status'))
+                continue
+            
+            prompt = prompts[i]
+            generation_id = row.get('generation_id')
+            generated_text = row.get('generated_text') or ''
+            self._store_generation(generation_id, prompt, generated_text, model_name, parameters)
+            yield {
+                'prompt_index': i,
+                'id': generation_id,
+                'generated_text': generated_text,
+                'model_name': model_name,
+                'parameters': dict(parameters),
+                'metadata': {
+                    'input_length': len(prompt),
+                    'output_length': len(generated_text),
+                    'timestamp': timestamp
+                }
+            }
+        
+        for i in sorted(pending):
+            yield failed(i, "No result returned from ML.GENERATE_TEXT")
+    
     def get_generation_history(
         self,
         limit: int = 100,
-        model_name: Optional[str] = None
+        model_name: Optional[str] = None,
+        fields: Optional[Sequence[str]] = None
     ) -> List[Dict[str, Any]]:
         """
         Retrieve generation history from BigQuery.
@@ -254,54 +725,75 @@ class TextGenerator:
         Args:
             limit: Maximum number of records to return
             model_name: Filter by specific model
+            fields: Columns to return; defaults to all history columns.
+                Leaving out ``input_data`` and ``generated_content`` avoids
+                scanning and decoding the largest columns
             
         Returns:
             List of generation records
         """
+        fields = self._history_fields(fields)
+        
         try:
-            table_id = self.config.get_full_table_id("generated_content")
-            
-            query = f"""
-            SELECT 
-                id,
-                content_type,
-                input_data,
-                generated_content,
-                model_name,
-                model_parameters,
-                status,
-                created_at
-            FROM `{table_id}`
-            WHERE content_type = 'text_generation'
-            """
-            
-            if model_name:
-                query += f" AND model_name = '{model_name}'"
-            
-            query += f"""
-            ORDER BY created_at DESC
-            LIMIT {limit}
-            """
-            
-            query_job = self.client.query(query)
-            results = list(query_job.result())
-            
-            # Convert to dictionaries
-            history = []
-            for row in results:
-                history.append({
-                    'id': row.id,
-                    'content_type': row.content_type,
-                    'input_data': row.input_data,
-                    'generated_content': row.generated_content,
-                    'model_name': row.model_name,
-                    'model_parameters': row.model_parameters,
-                    'status': row.status,
-                    'created_at': row.created_at.isoformat() if row.created_at else None
-                })
-            
-            return history
+            return list(self.iter_generation_history(limit, model_name, fields))
             
         except Exception as e:
             logger.error("Failed to retrieve generation history", error=str(e))
             return []
+    
+    def iter_generation_history(
+        self,
+        limit: int = 100,
+        model_name: Optional[str] = None,
+        fields: Optional[Sequence[str]] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Stream generation history records as BigQuery returns them.
+        
+        Args:
+            limit: Maximum number of records to return
+            model_name: Filter by specific model
+            fields: Columns to return; defaults to all history columns
+            
+        Yields:
+            Generation records, newest first
+        """
+        fields = self._history_fields(fields)
+        table_id = self.config.get_full_table_id("generated_content")
+        
+        query = f"""
+        SELECT 
+            {', '.join(fields)}
+        FROM `{table_id}`
+        WHERE content_type = 'text_generation'
+        """
+        query_parameters = [bigquery.ScalarQueryParameter("limit", "INT64", limit)]
+        
+        if model_name:
+            query += " AND model_name = @model_name"
+            query_parameters.append(bigquery.ScalarQueryParameter("model_name", "STRING", model_name))
+        
+        query += """
+        ORDER BY created_at DESC
+        LIMIT @limit
+        """
+        
+        job_config = bigquery.QueryJobConfig(query_parameters=query_parameters)
+        query_job = self.client.query(query, job_config=job_config)
+        
+        # Convert to dictionaries one row at a time
+        for row in query_job.result(page_size=min(limit, self.RESULT_PAGE_SIZE)):
+            record = {field: getattr(row, field) for field in fields}
+            if 'created_at' in record:
+                record['created_at'] = (
+                    record['created_at'].isoformat() if record['created_at'] else None
+                )
+            yield record
+    
+    def _history_fields(self, fields: Optional[Sequence[str]]) -> List[str]:
+        """Resolve requested history columns, rejecting unknown names."""
+        fields = list(fields) if fields else list(self.HISTORY_FIELDS)
+        unknown = set(fields) - set(self.HISTORY_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown history fields: {sorted(unknown)}")
+        return fields
@@ -8,33 +8,70 @@ providing REST API endpoints for all three AI approaches:
 3. Multimodal Analysis (Object Tables, ObjectRef)
 """
 
+import asyncio
+import hashlib
+import logging
 import os
-import time
-from typing import Dict, Any, List, Optional
-from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks
+import queue
+import random
+import sys
+from collections import defaultdict
+from datetime import datetime, timezone
+from functools import partial
+from logging.handlers import QueueHandler, QueueListener
+from typing import Callable, Dict, Any, Iterable, Iterator, List, Literal, Optional, Sequence, Tuple, Union
+from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
-from pydantic import BaseModel, Field
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, ConfigDict, Field
+import anyio.to_thread
+import orjson
 import structlog
 import uvicorn
 
 from .config import get_config, validate_config
+from .config.bigquery_config import validate_bigquery_setup
 from .generative_ai import TextGenerator, ContentGenerator, Forecaster
 from .vector_search import EmbeddingGenerator, VectorSearch
 from .multimodal import ObjectTableProcessor, ObjectRefProcessor
+from .utils import ResponseCache, encode_embedding, encode_embeddings, make_cache_key
+
+# Deployment environment, read once rather than on every health probe
+APP_ENV = os.getenv("ENVIRONMENT", "dev")
+
+# Fraction of per-request info logs that are emitted; errors are never sampled
+REQUEST_LOG_SAMPLE_RATE = 0.01 if APP_ENV == "prod" else 1.0
+
+# Configure structured logging; production skips the processors that only
+# matter for positional args, stack_info and byte strings, none of which
+# the application logs
+_log_processors = [
+    structlog.stdlib.filter_by_level,
+    structlog.stdlib.add_logger_name,
+    structlog.stdlib.add_log_level,
+    structlog.stdlib.PositionalArgumentsFormatter(),
+    structlog.processors.TimeStamper(fmt="iso"),
+    structlog.processors.StackInfoRenderer(),
+    structlog.processors.format_exc_info,
+    structlog.processors.UnicodeDecoder(),
+]
+if APP_ENV == "prod":
+    _log_processors = [
+        processor for processor in _log_processors
+        if not isinstance(processor, (
+            structlog.stdlib.PositionalArgumentsFormatter,
+            structlog.processors.StackInfoRenderer,
+            structlog.processors.UnicodeDecoder,
+        ))
+    ]
 
-# Configure structured logging
 structlog.configure(
     processors=[
-        structlog.stdlib.filter_by_level,
-        structlog.stdlib.add_logger_name,
-        structlog.stdlib.add_log_level,
-        structlog.stdlib.PositionalArgumentsFormatter(),
-        structlog.processors.TimeStamper(fmt="iso"),
-        structlog.processors.StackInfoRenderer(),
-        structlog.processors.format_exc_info,
-        structlog.processors.UnicodeDecoder(),
-        structlog.processors.JSONRenderer()
+        *_log_processors,
+        structlog.processors.JSONRenderer(
+            serializer=lambda event, **kwargs: orjson.dumps(event, default=str).decode()
+        )
     ],
     context_class=dict,
     logger_factory=structlog.stdlib.LoggerFactory(),
@@ -42,33 +79,158 @@ structlog.configure(
     cache_logger_on_first_use=True,
 )
 
-logger = structlog.get_logger(__name__)
+logger = structlog.get_logger(__name__).bind(service="bqai")
+
+
+def _start_log_listener(level: str) -> QueueListener:
+    """
+    Send log records through a queue drained by a background thread.
+    
+    Request handlers only enqueue rendered records; the listener thread does
+    the blocking writes to stdout, so slow log output never stalls a request.
+    
+    Args:
+        level: Root log level name
+        
+    Returns:
+        The running listener; stop it on shutdown to flush pending records
+    """
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(logging.Formatter("%(message)s"))
+    
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.handlers = [QueueHandler(log_queue)]
+    root.setLevel(level)
+    
+    listener = QueueListener(log_queue, output, respect_handler_level=True)
+    listener.start()
+    return listener
+
+
+class ORJSONResponse(JSONResponse):
+    """JSON response rendered with orjson, which encodes large float arrays far faster."""
+    
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(
+            content,
+            default=str,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        )
+
+
+class StaticCORSMiddleware:
+    """
+    CORS for an API open to every origin, with its headers encoded once.
+    
+    Behaves like CORSMiddleware with ``allow_origins=["*"]`` and
+    ``allow_credentials=True``: the requesting origin is echoed back with
+    credentials allowed, and preflight requests are answered directly. The
+    per-request origin checks and header rebuilding of CORSMiddleware are
+    skipped.
+    """
+    
+    # Appended to every response, so caches key on the origin
+    VARY_HEADERS = ((b"vary", b"Origin"),)
+    
+    # Appended to responses to cross-origin requests, after the echoed origin
+    HEADERS = ((b"access-control-allow-credentials", b"true"),) + VARY_HEADERS
+    
+    # Returned to preflight requests, after the echoed origin and before
+    # the requested headers
+    PREFLIGHT_HEADERS = HEADERS + (
+        (b"access-control-allow-methods", b"DELETE, GET, HEAD, OPTIONS, PATCH, POST, PUT"),
+        (b"access-control-max-age", b"600"),
+        (b"content-length", b"2"),
+        (b"content-type", b"text/plain; charset=utf-8"),
+    )
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        request_headers = dict(scope["headers"])
+        origin = request_headers.get(b"origin")
+        if origin is None:
+            cors_headers = self.VARY_HEADERS
+        elif scope["method"] == "OPTIONS" and b"access-control-request-method" in request_headers:
+            headers = [(b"access-control-allow-origin", origin), *self.PREFLIGHT_HEADERS]
+            requested = request_headers.get(b"access-control-request-headers")
+            if requested:
+                headers.append((b"access-control-allow-headers", requested))
+            await send({"type": "http.response.start", "status": 200, "headers": headers})
+            await send({"type": "http.response.body", "body": b"OK"})
+            return
+        else:
+            cors_headers = ((b"access-control-allow-origin", origin), *self.HEADERS)
+        
+        async def send_with_cors(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", ()), *cors_headers]
+            await send(message)
+        
+        await self.app(scope, receive, send_with_cors)
+
+
+# Origins and hosts the API accepts; configure appropriately for production
+CORS_ORIGINS = ["*"]
+ALLOWED_HOSTS = ["*"]
 
 # Initialize FastAPI app
 app = FastAPI(
     title="BigQuery AI Hackathon",
     description="A comprehensive solution using BigQuery's AI capabilities",
     version="1.0.0",
+    default_response_class=ORJSONResponse,
     docs_url="/docs" if os.getenv("ENVIRONMENT") != "prod" else None,
     redoc_url="/redoc" if os.getenv("ENVIRONMENT") != "prod" else None
 )
 
-# Add middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # Configure appropriately for production
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+# Add middleware only where it does work; wildcard host checks are no-ops
+# and wildcard CORS needs only fixed headers plus the echoed origin
+if CORS_ORIGINS == ["*"]:
+    app.add_middleware(StaticCORSMiddleware)
+else:
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=CORS_ORIGINS,
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
 
-app.add_middleware(
-    TrustedHostMiddleware,
-    allowed_hosts=["*"]  # Configure appropriately for production
-)
+if ALLOWED_HOSTS != ["*"]:
+    app.add_middleware(TrustedHostMiddleware, allowed_hosts=ALLOWED_HOSTS)
+
+# Response cache lifetimes; embeddings are deterministic so they are kept
+# for a day, deterministic text generations for a few minutes
+EMBEDDING_CACHE_TTL_SECONDS = 86400
+TEXT_CACHE_TTL_SECONDS = 300
+
+# How often the background task re-probes BigQuery for /health; probes
+# read the last result instead of issuing an RPC each
+BIGQUERY_HEALTH_INTERVAL_SECONDS = 30
+
+# Longest unhandled exception message that is logged; BigQuery errors can
+# embed the full query text
+MAX_LOGGED_ERROR_LENGTH = 512
+
+# In-process response cache tier, in front of Redis when REDIS_URL is set
+_embedding_cache = ResponseCache(max_size=10_000, ttl_seconds=EMBEDDING_CACHE_TTL_SECONDS)
+_text_cache = ResponseCache(max_size=1024, ttl_seconds=TEXT_CACHE_TTL_SECONDS)
 
 # Request/Response Models
+# Request bodies are immutable once validated, reject unknown fields and cap
+# string sizes so oversized payloads fail in pydantic-core before any handler work
+_REQUEST_MODEL_CONFIG = ConfigDict(extra="forbid", frozen=True, str_max_length=100_000)
+
 class TextGenerationRequest(BaseModel):
+    model_config = _REQUEST_MODEL_CONFIG
+    
     prompt: str = Field(..., description="Input prompt for text generation")
     model_name: str = Field(default="gemini-pro", description="Model to use for generation")
     temperature: float = Field(default=0.7, ge=0.0, le=1.0, description="Randomness control")
@@ -84,6 +246,8 @@ class TextGenerationResponse(BaseModel):
     metadata: Dict[str, Any]
 
 class EmbeddingRequest(BaseModel):
+    model_config = _REQUEST_MODEL_CONFIG
+    
     content: str = Field(..., description="Content to generate embedding for")
     content_type: str = Field(default="text", description="Type of content")
     model_name: str = Field(default="text-embedding-001", description="Embedding model to use")
@@ -92,7 +256,11 @@ class EmbeddingResponse(BaseModel):
     id: str
     content_type: str
     content_hash: str
-    embedding_vector: List[float]
+    embedding_vector: Union[List[float], str] = Field(
+        ..., description="Embedding values, or base64 of the packed values for fp16 and int8"
+    )
+    encoding: str = Field(default="fp32", description="Encoding of embedding_vector")
+    scale: Optional[float] = Field(default=None, description="Dequantization scale for int8")
     model_name: str
     dimensions: int
     metadata: Dict[str, Any]
@@ -104,12 +272,167 @@ class HealthResponse(BaseModel):
     bigquery_status: str
     environment: str
 
+# BigQuery client calls block while queries run, so the generation endpoints
+# are coroutines that hand those calls to the worker thread pool through
+# anyio.to_thread; the history endpoints are plain functions that FastAPI
+# runs in the same pool
+
+async def _run_grouped_batches(
+    requests: Sequence[BaseModel],
+    group_key: Callable[[BaseModel], Tuple],
+    run_batch: Callable[[Tuple, List[BaseModel]], List[Dict[str, Any]]]
+) -> List[Dict[str, Any]]:
+    """
+    Run one batch call per group of requests that share parameters.
+    
+    Groups run concurrently in the worker thread pool, and the results are
+    returned in the order of ``requests``.
+    """
+    groups: Dict[Tuple, List[int]] = defaultdict(list)
+    for index, request in enumerate(requests):
+        groups[group_key(request)].append(index)
+    
+    batches = await asyncio.gather(*(
+        anyio.to_thread.run_sync(run_batch, key, [requests[i] for i in indices])
+        for key, indices in groups.items()
+    ))
+    
+    results: List[Dict[str, Any]] = [None] * len(requests)
+    for indices, batch in zip(groups.values(), batches):
+        for index, result in zip(indices, batch):
+            results[index] = result
+    return results
+
+async def _get_cached_response(key: str, cache: ResponseCache) -> Optional[Dict[str, Any]]:
+    """
+    Look up a cached response, first in process and then in Redis.
+    
+    A failed Redis lookup is treated as a miss so that caching never
+    blocks a request.
+    """
+    value = cache.get(key)
+    if value is not None:
+        return value
+    
+    redis = getattr(app.state, "redis", None)
+    if redis is None:
+        return None
+    
+    try:
+        payload = await redis.get(key)
+    except Exception as e:
+        logger.warning("Redis cache lookup failed", error=str(e))
+        return None
+    
+    if payload is None:
+        return None
+    
+    value = orjson.loads(payload)
+    cache.set(key, value)
+    return value
+
+async def _set_cached_response(
+    key: str,
+    value: Dict[str, Any],
+    cache: ResponseCache,
+    ttl_seconds: int
+) -> None:
+    """Store a response in both cache tiers."""
+    cache.set(key, value)
+    
+    redis = getattr(app.state, "redis", None)
+    if redis is None:
+        return
+    
+    try:
+        await redis.set(key, orjson.dumps(value, default=str), ex=ttl_seconds)
+    except Exception as e:
+        logger.warning("Redis cache write failed", error=str(e))
+
+def _stream_grouped_batches(
+    requests: Sequence[BaseModel],
+    group_key: Callable[[BaseModel], Tuple],
+    iter_batch: Callable[[Tuple, List[BaseModel]], Iterable[Tuple[int, Dict[str, Any]]]]
+) -> StreamingResponse:
+    """
+    Stream one batch per group of requests that share parameters as NDJSON.
+    
+    ``iter_batch`` yields ``(position in group, result)`` pairs as results
+    arrive. Each line is a result with the ``index`` of its request, and a
+    final line carries ``total_processed`` and ``successful``.
+    """
+    groups: Dict[Tuple, List[int]] = defaultdict(list)
+    for index, request in enumerate(requests):
+        groups[group_key(request)].append(index)
+    
+    def lines() -> Iterator[bytes]:
+        total = successful = 0
+        try:
+            for key, indices in groups.items():
+                for position, result in iter_batch(key, [requests[i] for i in indices]):
+                    total += 1
+                    successful += 'error' not in result
+                    yield orjson.dumps({'index': indices[position], **result}, default=str) + b"\n"
+        except Exception as e:
+            logger.error("Streaming batch failed", error=str(e))
+            yield orjson.dumps({'error': str(e)}) + b"\n"
+        
+        logger.info("Streaming batch completed", num_results=total, successful=successful)
+        yield orjson.dumps({'total_processed': total, 'successful': successful}) + b"\n"
+    
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+def _stream_history(rows: Iterable[Dict[str, Any]]) -> StreamingResponse:
+    """
+    Stream history records as NDJSON as they are read from BigQuery.
+    
+    Each line is a record, and a final line carries the ``total`` streamed.
+    """
+    def lines() -> Iterator[bytes]:
+        total = 0
+        try:
+            for row in rows:
+                total += 1
+                yield orjson.dumps(row, default=str) + b"\n"
+        except Exception as e:
+            logger.error("Streaming history failed", error=str(e))
+            yield orjson.dumps({'error': str(e)}) + b"\n"
+        
+        yield orjson.dumps({'total': total}) + b"\n"
+    
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+def _embedding_response(result: Dict[str, Any], encoding: str) -> EmbeddingResponse:
+    """Build an embedding response with the vector in the requested encoding."""
+    embedding_vector, scale = encode_embedding(result['embedding_vector'], encoding)
+    return EmbeddingResponse(
+        id=result['id'],
+        content_type=result['content_type'],
+        content_hash=result['content_hash'],
+        embedding_vector=embedding_vector,
+        encoding=encoding,
+        scale=scale,
+        model_name=result['model_name'],
+        dimensions=result['dimensions'],
+        metadata=result['metadata']
+    )
+
 # Dependency injection
-def get_text_generator():
-    return TextGenerator()
+# Generators are built once at startup and shared by all requests, so the
+# BigQuery client and its connection pool are reused and concurrent
+# single-prompt requests can be coalesced. They are coroutines so that the
+# fallback construction below runs on the event loop, without races.
+async def get_text_generator(request: Request) -> TextGenerator:
+    state = request.app.state
+    if getattr(state, "text_generator", None) is None:
+        state.text_generator = TextGenerator()
+    return state.text_generator
 
-def get_embedding_generator():
-    return EmbeddingGenerator()
+async def get_embedding_generator(request: Request) -> EmbeddingGenerator:
+    state = request.app.state
+    if getattr(state, "embedding_generator", None) is None:
+        state.embedding_generator = EmbeddingGenerator()
+    return state.embedding_generator
 
 def get_config_dependency():
     return get_config()
@@ -122,16 +445,20 @@ async def health_check():
         # Validate configuration
         config_valid = validate_config()
         
-        # Check BigQuery connection
-        from .config.bigquery_config import validate_bigquery_setup
-        bigquery_status = "healthy" if validate_bigquery_setup() else "unhealthy"
+        # BigQuery connectivity is probed by a background task; probe once
+        # here only if it has not reported yet
+        bigquery_healthy = getattr(app.state, "bigquery_healthy", None)
+        if bigquery_healthy is None:
+            bigquery_healthy = await anyio.to_thread.run_sync(validate_bigquery_setup)
+            app.state.bigquery_healthy = bigquery_healthy
+        bigquery_status = "healthy" if bigquery_healthy else "unhealthy"
         
         return HealthResponse(
-            status="healthy" if config_valid and bigquery_status == "healthy" else "unhealthy",
-            timestamp=time.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            status="healthy" if config_valid and bigquery_healthy else "unhealthy",
+            timestamp=datetime.now(timezone.utc).isoformat(timespec="seconds").replace("+00:00", "Z"),
             version="1.0.0",
             bigquery_status=bigquery_status,
-            environment=os.getenv("ENVIRONMENT", "dev")
+            environment=APP_ENV
         )
     except Exception as e:
         logger.error("Health check failed", error=str(e))
@@ -166,13 +493,25 @@ async def generate_text(
     
     This endpoint demonstrates Approach 1: The AI Architect,
     enabling large-scale text generation directly within BigQuery.
+    Concurrent requests with the same parameters are coalesced into a
+    single batch query.
     """
     try:
-        logger.info("Text generation request received", 
-                   prompt_length=len(request.prompt),
-                   model=request.model_name)
+        if random.random() < REQUEST_LOG_SAMPLE_RATE:
+            logger.info("Text generation request received", 
+                       prompt_length=len(request.prompt),
+                       model=request.model_name)
         
-        result = text_generator.generate_text(
+        # Only deterministic generations are safe to serve from cache
+        cache_key = None
+        if request.temperature == 0.0:
+            cache_key = "gen:" + make_cache_key(**request.model_dump())
+            cached = await _get_cached_response(cache_key, _text_cache)
+            if cached is not None:
+                logger.info("Serving text generation from cache", generation_id=cached['id'])
+                return TextGenerationResponse(**cached)
+        
+        result = await text_generator.agenerate_text_batched(
             prompt=request.prompt,
             model_name=request.model_name,
             temperature=request.temperature,
@@ -180,9 +519,11 @@ async def generate_text(
             top_p=request.top_p,
             top_k=request.top_k
         )
+        if cache_key is not None:
+            await _set_cached_response(cache_key, result, _text_cache, TEXT_CACHE_TTL_SECONDS)
         
-        logger.info("Text generation completed successfully",
-                   generation_id=result['id'])
+        background_tasks.add_task(logger.info, "Text generation completed successfully",
+                                  generation_id=result['id'])
         
         return TextGenerationResponse(
             id=result['id'],
@@ -200,39 +541,60 @@ async def generate_text(
 async def batch_generate_text(
     requests: List[TextGenerationRequest],
     background_tasks: BackgroundTasks,
+    stream: bool = Query(default=False, description="Stream results as NDJSON as they arrive"),
     text_generator: TextGenerator = Depends(get_text_generator)
 ):
     """
     Generate text for multiple prompts in batch.
     
     This endpoint enables efficient processing of multiple text generation
-    requests using BigQuery's batch processing capabilities.
+    requests using BigQuery's batch processing capabilities. Requests are
+    grouped by their generation parameters, with one batch query per group.
+    With ``stream`` set, results are sent as NDJSON lines as BigQuery
+    returns them, followed by a line with the totals.
     """
     try:
         logger.info("Batch text generation request received", 
                    num_prompts=len(requests))
         
-        # Extract prompts from requests
-        prompts = [req.prompt for req in requests]
-        
-        # Use the first request's parameters for all generations
-        first_req = requests[0]
-        result = text_generator.batch_generate_text(
-            prompts=prompts,
-            model_name=first_req.model_name,
-            temperature=first_req.temperature,
-            max_tokens=first_req.max_tokens,
-            top_p=first_req.top_p,
-            top_k=first_req.top_k
-        )
+        def group_key(req: TextGenerationRequest) -> Tuple:
+            return (req.model_name, req.temperature, req.max_tokens, req.top_p, req.top_k)
+        
+        if stream:
+            def iter_batch(params: Tuple, group: List[TextGenerationRequest]):
+                model_name, temperature, max_tokens, top_p, top_k = params
+                for result in text_generator.iter_batch_generate_text(
+                    prompts=[req.prompt for req in group],
+                    model_name=model_name,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    top_p=top_p,
+                    top_k=top_k
+                ):
+                    yield result.pop('prompt_index'), result
+            
+            return _stream_grouped_batches(requests, group_key, iter_batch)
         
-        logger.info("Batch text generation completed",
-                   num_results=len(result))
+        def run_batch(params: Tuple, group: List[TextGenerationRequest]) -> List[Dict[str, Any]]:
+            model_name, temperature, max_tokens, top_p, top_k = params
+            return text_generator.batch_generate_text(
+                prompts=[req.prompt for req in group],
+                model_name=model_name,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                top_p=top_p,
+                top_k=top_k
+            )
+        
+        result = await _run_grouped_batches(requests, group_key, run_batch)
+        
+        background_tasks.add_task(logger.info, "Batch text generation completed",
+                                  num_results=len(result))
         
         return {
             "results": result,
             "total_processed": len(result),
-            "successful": len([r for r in result if 'error' not in r])
+            "successful": sum('error' not in r for r in result)
         }
         
     except Exception as e:
@@ -244,6 +606,10 @@ async def batch_generate_text(
 async def generate_embedding(
     request: EmbeddingRequest,
     background_tasks: BackgroundTasks,
+    encoding: Literal["fp32", "fp16", "int8"] = Query(
+        default="fp32",
+        description="Vector encoding; fp16 and int8 return base64 packed values"
+    ),
     embedding_generator: EmbeddingGenerator = Depends(get_embedding_generator)
 ):
     """
@@ -251,32 +617,36 @@ async def generate_embedding(
     
     This endpoint demonstrates Approach 2: The Semantic Detective,
     enabling vector representation generation for semantic search.
+    Embeddings are deterministic, so repeated content is served from cache.
+    Clients can opt into fp16 or int8 encodings to shrink the response.
     """
     try:
-        logger.info("Embedding generation request received",
-                   content_type=request.content_type,
-                   model=request.model_name,
-                   content_length=len(request.content))
+        if random.random() < REQUEST_LOG_SAMPLE_RATE:
+            logger.info("Embedding generation request received",
+                       content_type=request.content_type,
+                       model=request.model_name,
+                       content_length=len(request.content))
         
-        result = embedding_generator.generate_embedding(
+        content_digest = hashlib.blake2b(request.content.encode(), digest_size=16).hexdigest()
+        cache_key = f"emb:{request.model_name}:{request.content_type}:{content_digest}"
+        result = await _get_cached_response(cache_key, _embedding_cache)
+        if result is not None:
+            logger.info("Serving embedding from cache", embedding_id=result['id'])
+            return _embedding_response(result, encoding)
+        
+        result = await anyio.to_thread.run_sync(partial(
+            embedding_generator.generate_embedding,
             content=request.content,
             content_type=request.content_type,
             model_name=request.model_name
-        )
+        ))
+        await _set_cached_response(cache_key, result, _embedding_cache, EMBEDDING_CACHE_TTL_SECONDS)
         
-        logger.info("Embedding generation completed successfully",
-                   embedding_id=result['id'],
-                   dimensions=result['dimensions'])
+        background_tasks.add_task(logger.info, "Embedding generation completed successfully",
+                                  embedding_id=result['id'],
+                                  dimensions=result['dimensions'])
         
-        return EmbeddingResponse(
-            id=result['id'],
-            content_type=result['content_type'],
-            content_hash=result['content_hash'],
-            embedding_vector=result['embedding_vector'],
-            model_name=result['model_name'],
-            dimensions=result['dimensions'],
-            metadata=result['metadata']
-        )
+        return _embedding_response(result, encoding)
         
     except Exception as e:
         logger.error("Embedding generation failed", error=str(e))
@@ -286,36 +656,72 @@ async def generate_embedding(
 async def batch_generate_embeddings(
     requests: List[EmbeddingRequest],
     background_tasks: BackgroundTasks,
+    encoding: Literal["fp32", "fp16", "int8"] = Query(
+        default="fp32",
+        description="Vector encoding; fp16 and int8 return base64 packed values"
+    ),
+    normalize: bool = Query(default=False, description="Scale vectors to unit length"),
+    stream: bool = Query(default=False, description="Stream results as NDJSON as they arrive"),
     embedding_generator: EmbeddingGenerator = Depends(get_embedding_generator)
 ):
     """
     Generate embeddings for multiple content items in batch.
     
     This endpoint enables efficient processing of multiple embedding
-    generation requests for large-scale vector operations.
+    generation requests for large-scale vector operations. Requests are
+    grouped by content type and model, with one batch call per group.
+    Vectors are normalized and encoded for the whole batch at once, or
+    per item when ``stream`` sends the results as NDJSON lines.
     """
     try:
         logger.info("Batch embedding generation request received",
                    num_contents=len(requests))
         
-        # Extract content from requests
-        contents = [req.content for req in requests]
+        def group_key(req: EmbeddingRequest) -> Tuple:
+            return (req.content_type, req.model_name)
         
-        # Use the first request's parameters for all generations
-        first_req = requests[0]
-        result = embedding_generator.batch_generate_embeddings(
-            contents=contents,
-            content_type=first_req.content_type,
-            model_name=first_req.model_name
-        )
+        if stream:
+            def iter_batch(params: Tuple, group: List[EmbeddingRequest]):
+                content_type, model_name = params
+                results = embedding_generator.iter_batch_generate_embeddings(
+                    contents=[req.content for req in group],
+                    content_type=content_type,
+                    model_name=model_name
+                )
+                for result in results:
+                    position = result.pop('content_index')
+                    if 'error' not in result and (encoding != "fp32" or normalize):
+                        [(embedding_vector, scale)] = encode_embeddings(
+                            [result['embedding_vector']], encoding, normalize
+                        )
+                        result.update(embedding_vector=embedding_vector, encoding=encoding, scale=scale)
+                    yield position, result
+            
+            return _stream_grouped_batches(requests, group_key, iter_batch)
+        
+        def run_batch(params: Tuple, group: List[EmbeddingRequest]) -> List[Dict[str, Any]]:
+            content_type, model_name = params
+            return embedding_generator.batch_generate_embeddings(
+                contents=[req.content for req in group],
+                content_type=content_type,
+                model_name=model_name
+            )
+        
+        result = await _run_grouped_batches(requests, group_key, run_batch)
         
-        logger.info("Batch embedding generation completed",
-                   num_results=len(result))
+        if encoding != "fp32" or normalize:
+            embedded = [r for r in result if 'error' not in r]
+            encoded = encode_embeddings([r['embedding_vector'] for r in embedded], encoding, normalize)
+            for item, (embedding_vector, scale) in zip(embedded, encoded):
+                item.update(embedding_vector=embedding_vector, encoding=encoding, scale=scale)
+        
+        background_tasks.add_task(logger.info, "Batch embedding generation completed",
+                                  num_results=len(result))
         
         return {
             "results": result,
             "total_processed": len(result),
-            "successful": len([r for r in result if 'error' not in r])
+            "successful": sum('error' not in r for r in result)
         }
         
     except Exception as e:
@@ -324,13 +730,20 @@ async def batch_generate_embeddings(
 
 # History and Analytics Endpoints
 @app.get("/api/v1/generations/history")
-async def get_generation_history(
+def get_generation_history(
     limit: int = 100,
     model_name: Optional[str] = None,
+    stream: bool = Query(default=False, description="Stream records as NDJSON as they are read"),
     text_generator: TextGenerator = Depends(get_text_generator)
 ):
     """Retrieve text generation history for analysis and monitoring."""
     try:
+        if stream:
+            return _stream_history(text_generator.iter_generation_history(
+                limit=limit,
+                model_name=model_name
+            ))
+        
         history = text_generator.get_generation_history(
             limit=limit,
             model_name=model_name
@@ -341,14 +754,22 @@ async def get_generation_history(
         raise HTTPException(status_code=500, detail="Failed to retrieve generation history")
 
 @app.get("/api/v1/embeddings/history")
-async def get_embedding_history(
+def get_embedding_history(
     limit: int = 100,
     model_name: Optional[str] = None,
     content_type: Optional[str] = None,
+    stream: bool = Query(default=False, description="Stream records as NDJSON as they are read"),
     embedding_generator: EmbeddingGenerator = Depends(get_embedding_generator)
 ):
     """Retrieve embedding generation history for analysis and monitoring."""
     try:
+        if stream:
+            return _stream_history(embedding_generator.iter_embedding_history(
+                limit=limit,
+                model_name=model_name,
+                content_type=content_type
+            ))
+        
         history = embedding_generator.get_embedding_history(
             limit=limit,
             model_name=model_name,
@@ -359,6 +780,16 @@ async def get_embedding_history(
         logger.error("Failed to retrieve embedding history", error=str(e))
         raise HTTPException(status_code=500, detail="Failed to retrieve embedding history")
 
+async def _refresh_bigquery_health():
+    """Re-probe BigQuery connectivity in the background for /health."""
+    while True:
+        try:
+            app.state.bigquery_healthy = await anyio.to_thread.run_sync(validate_bigquery_setup)
+        except Exception as e:
+            logger.error("BigQuery health probe failed", error=str(e))
+            app.state.bigquery_healthy = False
+        await asyncio.sleep(BIGQUERY_HEALTH_INTERVAL_SECONDS)
+
 # Startup and shutdown events
 @app.on_event("startup")
 async def startup_event():
@@ -370,32 +801,92 @@ async def startup_event():
         logger.error("Configuration validation failed")
         raise RuntimeError("Configuration validation failed")
     
+    config = get_config()
+    
+    if getattr(app.state, "log_listener", None) is None:
+        app.state.log_listener = _start_log_listener(config.log_level)
+    
+    # Build the shared generators up front so the first request does not pay
+    # for client setup
+    app.state.text_generator = TextGenerator()
+    app.state.embedding_generator = EmbeddingGenerator()
+    
+    # Size the thread pool that runs the blocking endpoints so that up to
+    # max_concurrent_requests BigQuery calls can be in flight at once
+    anyio.to_thread.current_default_thread_limiter().total_tokens = config.max_concurrent_requests
+    logger.info("Worker thread pool sized", max_threads=config.max_concurrent_requests)
+    
+    # Share cached responses across workers when Redis is configured
+    if config.redis_url:
+        try:
+            import redis.asyncio as redis_asyncio
+        except ImportError:
+            logger.warning("redis is not installed, using the in-process response cache only")
+        else:
+            app.state.redis = redis_asyncio.from_url(config.redis_url)
+            logger.info("Redis response cache enabled")
+    
+    app.state.bigquery_healthy = None
+    app.state.health_task = asyncio.create_task(_refresh_bigquery_health())
+    
     logger.info("BigQuery AI application started successfully")
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Application shutdown event."""
     logger.info("BigQuery AI application shutting down")
+    
+    health_task = getattr(app.state, "health_task", None)
+    if health_task is not None:
+        health_task.cancel()
+    
+    text_generator = getattr(app.state, "text_generator", None)
+    if text_generator is not None:
+        text_generator.close()
+    
+    redis = getattr(app.state, "redis", None)
+    if redis is not None:
+        await redis.aclose()
+    
+    log_listener = getattr(app.state, "log_listener", None)
+    if log_listener is not None:
+        log_listener.stop()
+        app.state.log_listener = None
 
 # Error handlers
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
-    """Global exception handler."""
+    """Global exception handler; details are logged, never returned to the client."""
     logger.error("Unhandled exception occurred",
-                error=str(exc),
+                error=str(exc)[:MAX_LOGGED_ERROR_LENGTH],
                 request_path=request.url.path)
-    return {"error": "Internal server error", "detail": str(exc)}
+    return ORJSONResponse({"error": "Internal server error"}, status_code=500)
 
 if __name__ == "__main__":
     # Get configuration
     config = get_config()
     
-    # Run the application
+    if config.debug:
+        # Hot reload runs a single worker on the default asyncio loop
+        server_options = {"reload": True}
+    else:
+        # uvloop and httptools (from uvicorn[standard]) replace the pure-Python
+        # loop and parser; limit_concurrency sheds load with 503s once a
+        # worker is saturated instead of queueing without bound
+        server_options = {
+            "loop": "uvloop",
+            "http": "httptools",
+            "workers": config.api_workers,
+            "backlog": 2048,
+            "limit_concurrency": 1000,
+        }
+    
+    # Run the application; production deployments can equally run
+    # gunicorn -k uvicorn.workers.UvicornWorker -w $(nproc) src.main:app
     uvicorn.run(
         "src.main:app",
         host=config.api_host,
         port=config.api_port,
-        workers=config.api_workers,
-        reload=config.debug,
-        log_level=config.log_level.lower()
+        log_level=config.log_level.lower(),
+        **server_options
     )
@@ -5,23 +5,98 @@ This module provides BigQuery's ObjectRef data type functionality,
 enabling references to unstructured data in AI models.
 """
 
+import functools
+import re
 import uuid
-from typing import List, Dict, Any, Optional, Union
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Optional, Tuple, Union
 from google.cloud import bigquery
 from google.cloud.bigquery import Client
 import structlog
-from ..config.bigquery_config import get_bigquery_client, get_bigquery_config
+from ..config.bigquery_config import get_bigquery_client, get_bigquery_config, get_bigquery_settings
+from ..utils import ResponseCache, WriteQueue, make_cache_key
 
 logger = structlog.get_logger(__name__)
 
+# ObjectRefs are Cloud Storage URIs: gs://<bucket>/<object path>
+_GS_URI_PATTERN = re.compile(r'gs://([^/]+)/(.+)')
+
 
 class ObjectRefProcessor:
     """BigQuery ObjectRef implementation for referencing unstructured data."""
     
-    def __init__(self, client: Optional[Client] = None):
-        """Initialize ObjectRefProcessor with BigQuery client."""
+    # Analysis and metadata records are written in the background in batches
+    # of up to STORE_BATCH_SIZE rows, or whatever arrived within STORE_FLUSH_SECONDS
+    STORE_BATCH_SIZE = 500
+    STORE_FLUSH_SECONDS = 5.0
+    
+    def __init__(
+        self,
+        client: Optional[Client] = None,
+        cache_size: int = 1024,
+        cache_ttl: float = 300
+    ):
+        """
+        Initialize ObjectRefProcessor with BigQuery client.
+        
+        Args:
+            client: BigQuery client; defaults to the shared client
+            cache_size: Maximum cached analyses and metadata lookups each
+            cache_ttl: Seconds a metadata lookup is reused; analyses of the
+                same object, prompt and model are reused until evicted
+        """
         self.client = client or get_bigquery_client()
         self.config = get_bigquery_config()
+        self._analysis_cache = ResponseCache(max_size=cache_size, ttl_seconds=float('inf'))
+        self._metadata_cache = ResponseCache(max_size=cache_size, ttl_seconds=cache_ttl)
+        
+        # Storage runs off the caller's critical path
+        self._analysis_queue = WriteQueue(
+            functools.partial(
+                self._store_analyses, self.client, self.config.get_full_table_id("object_ref_analyses")
+            ),
+            max_batch=self.STORE_BATCH_SIZE,
+            max_wait_seconds=self.STORE_FLUSH_SECONDS,
+            name="object-ref-analyses-store"
+        )
+        self._metadata_queue = WriteQueue(
+            functools.partial(
+                self._store_object_ref_metadata_rows,
+                self.client,
+                self.config.get_full_table_id("object_refs_metadata")
+            ),
+            max_batch=self.STORE_BATCH_SIZE,
+            max_wait_seconds=self.STORE_FLUSH_SECONDS,
+            name="object-refs-metadata-store"
+        )
+        # Closes the queues when the processor is garbage collected or at
+        # exit; it holds the queues, not the processor
+        self._finalizer = weakref.finalize(
+            self, self._close_queues, self._analysis_queue, self._metadata_queue
+        )
+    
+    def __enter__(self) -> "ObjectRefProcessor":
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.flush()
+    
+    def flush(self) -> None:
+        """Wait for queued analysis and metadata writes to finish."""
+        self._analysis_queue.flush()
+        self._metadata_queue.flush()
+    
+    def close(self) -> None:
+        """Flush queued writes and stop the writer threads."""
+        self._finalizer()
+    
+    @staticmethod
+    def _close_queues(*queues: WriteQueue) -> None:
+        """Flush and stop each of ``queues``."""
+        for write_queue in queues:
+            write_queue.close()
         
     def create_object_ref(
         self,
@@ -81,6 +156,9 @@ class ObjectRefProcessor:
         """
         Analyze unstructured data using ObjectRef with AI models.
         
+        Repeated analyses of the same object with the same prompt and model
+        are served from cache unless extra parameters are given.
+        
         Args:
             object_ref: ObjectRef string pointing to the file
             analysis_prompt: Prompt for AI analysis
@@ -91,11 +169,25 @@ class ObjectRefProcessor:
             Dictionary containing analysis results and metadata
         """
         try:
+            cache_key = None
+            if not kwargs:
+                cache_key = make_cache_key(
+                    object_ref=object_ref,
+                    model=model_name,
+                    prompt=analysis_prompt
+                )
+                cached = self._analysis_cache.get(cache_key)
+                if cached is not None:
+                    logger.info("Serving ObjectRef analysis from cache",
+                               analysis_id=cached['id'],
+                               object_ref=object_ref)
+                    return {**cached, 'metadata': {**cached['metadata'], 'cache_hit': True}}
+            
             # Create unique ID for this analysis
             analysis_id = str(uuid.uuid4())
             
             # Build the analysis query using ObjectRef
-            query = self._build_object_ref_analysis_query(
+            query, job_config = self._build_object_ref_analysis_query(
                 object_ref=object_ref,
                 analysis_prompt=analysis_prompt,
                 model_name=model_name,
@@ -108,14 +200,14 @@ class ObjectRefProcessor:
                        model=model_name)
             
             # Execute the query
-            query_job = self.client.query(query)
-            results = list(query_job.result())
+            query_job = self.client.query(query, job_config=job_config)
+            row = next(iter(query_job.result(max_results=1)), None)
             
-            if not results:
+            if row is None:
                 raise ValueError("No results returned from ObjectRef analysis")
             
             # Extract analysis results
-            analysis_result = results[0].get('analysis_result', '')
+            analysis_result = row.get('analysis_result', '')
             
             # Store the analysis in BigQuery
             self._store_analysis(
@@ -131,7 +223,7 @@ class ObjectRefProcessor:
                        analysis_id=analysis_id,
                        object_ref=object_ref)
             
-            return {
+            result = {
                 'id': analysis_id,
                 'object_ref': object_ref,
                 'analysis_result': analysis_result,
@@ -139,9 +231,13 @@ class ObjectRefProcessor:
                 'metadata': {
                     'prompt_length': len(analysis_prompt),
                     'result_length': len(analysis_result),
-                    'timestamp': results[0].get('timestamp', '')
+                    'timestamp': self._job_timestamp(query_job)
                 }
             }
+            if cache_key is not None:
+                self._analysis_cache.set(cache_key, result)
+            
+            return result
             
         except Exception as e:
             logger.error("ObjectRef analysis failed",
@@ -155,42 +251,60 @@ class ObjectRefProcessor:
         object_refs: List[str],
         analysis_prompt: str,
         model_name: str = "gemini-pro-vision",
+        max_in_flight: Optional[int] = None,
         **kwargs
     ) -> List[Dict[str, Any]]:
         """
         Analyze multiple files using ObjectRefs in batch.
         
+        All objects are analyzed by a single AI.GENERATE query. If that
+        query fails, each object is analyzed with its own query so that one
+        bad object does not fail the others; those queries run concurrently.
+        
         Args:
             object_refs: List of ObjectRef strings
             analysis_prompt: Prompt for AI analysis
             model_name: AI model to use for analysis
+            max_in_flight: Maximum concurrent per-object queries; defaults to
+                the environment's ``max_in_flight_queries`` setting
             **kwargs: Additional analysis parameters
             
         Returns:
-            List of analysis results for each object
+            List of analysis results for each object, in the order of ``object_refs``
         """
         try:
-            results = []
+            if not object_refs:
+                return []
             
-            for object_ref in object_refs:
+            # Leaving the block flushes the queued analysis rows
+            with self:
                 try:
-                    result = self.analyze_with_object_ref(
-                        object_ref=object_ref,
-                        analysis_prompt=analysis_prompt,
-                        model_name=model_name,
-                        **kwargs
-                    )
-                    results.append(result)
+                    results = self._analyze_in_one_query(object_refs, analysis_prompt, model_name, **kwargs)
                 except Exception as e:
-                    logger.warning("Failed to analyze object",
-                                  object_ref=object_ref,
+                    logger.warning("Batch ObjectRef query failed, analyzing objects individually",
+                                  num_objects=len(object_refs),
                                   error=str(e))
-                    # Add error result to maintain order
-                    results.append({
-                        'object_ref': object_ref,
-                        'error': str(e),
-                        'status': 'failed'
-                    })
+                    
+                    def analyze(object_ref: str) -> Dict[str, Any]:
+                        try:
+                            return self.analyze_with_object_ref(
+                                object_ref=object_ref,
+                                analysis_prompt=analysis_prompt,
+                                model_name=model_name,
+                                **kwargs
+                            )
+                        except Exception as e:
+                            return self._failed_analysis(object_ref, str(e))
+                    
+                    # The BigQuery client releases the GIL while waiting on HTTP,
+                    # so the per-object queries overlap in threads
+                    max_workers = min(
+                        max_in_flight or get_bigquery_settings()["max_in_flight_queries"],
+                        len(object_refs)
+                    )
+                    with ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix="object-ref-query") as executor:
+                        results = list(executor.map(analyze, object_refs))
             
             logger.info("Batch ObjectRef analysis completed",
                        total_objects=len(object_refs),
@@ -202,6 +316,72 @@ class ObjectRefProcessor:
             logger.error("Batch ObjectRef analysis failed", error=str(e))
             raise
     
+    def _analyze_in_one_query(
+        self,
+        object_refs: List[str],
+        analysis_prompt: str,
+        model_name: str,
+        **kwargs
+    ) -> List[Dict[str, Any]]:
+        """
+        Analyze all objects with a single AI.GENERATE query.
+        
+        Result rows are matched back to their objects by offset.
+        """
+        query, job_config = self._build_batch_object_ref_analysis_query(
+            object_refs=object_refs,
+            analysis_prompt=analysis_prompt,
+            model_name=model_name
+        )
+        
+        logger.info("Executing batch ObjectRef analysis",
+                   num_objects=len(object_refs),
+                   model=model_name)
+        
+        query_job = self.client.query(query, job_config=job_config)
+        rows = query_job.result()
+        timestamp = self._job_timestamp(query_job)
+        
+        results: List[Optional[Dict[str, Any]]] = [None] * len(object_refs)
+        for row in rows:
+            offset = row.get('ref_offset')
+            object_ref = object_refs[offset]
+            analysis_id = str(uuid.uuid4())
+            analysis_result = row.get('analysis_result') or ''
+            
+            self._store_analysis(
+                analysis_id, object_ref, analysis_prompt, analysis_result, model_name, **kwargs
+            )
+            results[offset] = {
+                'id': analysis_id,
+                'object_ref': object_ref,
+                'analysis_result': analysis_result,
+                'model_name': model_name,
+                'metadata': {
+                    'prompt_length': len(analysis_prompt),
+                    'result_length': len(analysis_result),
+                    'timestamp': timestamp
+                }
+            }
+        
+        return [
+            result if result is not None
+            else self._failed_analysis(object_ref, "No results returned from ObjectRef analysis")
+            for object_ref, result in zip(object_refs, results)
+        ]
+    
+    @staticmethod
+    def _failed_analysis(object_ref: str, error: str) -> Dict[str, Any]:
+        """Log and build the result for an object that could not be analyzed."""
+        logger.warning("Failed to analyze object",
+                      object_ref=object_ref,
+                      error=error)
+        return {
+            'object_ref': object_ref,
+            'error': error,
+            'status': 'failed'
+        }
+    
     def extract_metadata_from_object_ref(
         self,
         object_ref: str
@@ -209,52 +389,85 @@ class ObjectRefProcessor:
         """
         Extract metadata from an ObjectRef without full analysis.
         
+        Found metadata is reused for ``cache_ttl`` seconds.
+        
         Args:
             object_ref: ObjectRef string pointing to the file
             
         Returns:
             Dictionary containing file metadata
         """
+        return self.batch_extract_metadata([object_ref])[object_ref]
+    
+    def batch_extract_metadata(self, object_refs: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Extract metadata for several ObjectRefs with a single query.
+        
+        ObjectRefs with cached metadata are not queried again; found
+        metadata is reused for ``cache_ttl`` seconds.
+        
+        Args:
+            object_refs: ObjectRef strings pointing to the files
+            
+        Returns:
+            File metadata keyed by ObjectRef; ObjectRefs without metadata map
+            to a dictionary with an ``error`` entry
+        """
+        metadata_by_ref: Dict[str, Dict[str, Any]] = {}
+        missing = []
+        for object_ref in object_refs:
+            cached = self._metadata_cache.get(object_ref)
+            if cached is not None:
+                metadata_by_ref[object_ref] = dict(cached)
+            elif object_ref not in metadata_by_ref:
+                metadata_by_ref[object_ref] = {'error': 'No metadata found'}
+                missing.append(object_ref)
+        
+        if not missing:
+            return metadata_by_ref
+        
         try:
             # Build metadata extraction query
-            query = self._build_metadata_extraction_query(object_ref)
+            query, job_config = self._build_metadata_extraction_query(missing)
             
-            logger.info("Extracting metadata from ObjectRef", object_ref=object_ref)
+            logger.info("Extracting metadata from ObjectRefs", num_object_refs=len(missing))
             
             # Execute the query
-            query_job = self.client.query(query)
-            results = list(query_job.result())
-            
-            if not results:
-                return {'error': 'No metadata found'}
+            query_job = self.client.query(query, job_config=job_config)
             
-            # Extract metadata
-            metadata = dict(results[0])
+            for row in query_job.result():
+                metadata = dict(row)
+                object_ref = metadata.pop('gs_uri')
+                self._metadata_cache.set(object_ref, metadata)
+                metadata_by_ref[object_ref] = dict(metadata)
             
             logger.info("Metadata extraction completed successfully",
-                       object_ref=object_ref,
-                       metadata_keys=list(metadata.keys()))
-            
-            return metadata
+                       num_object_refs=len(missing),
+                       num_found=sum('error' not in metadata_by_ref[ref] for ref in missing))
             
         except Exception as e:
-            logger.error("Failed to extract metadata from ObjectRef",
-                        object_ref=object_ref,
+            logger.error("Failed to extract metadata from ObjectRefs",
+                        num_object_refs=len(missing),
                         error=str(e))
-            return {'error': str(e)}
-    
-    def _validate_object_ref(self, object_ref: str, object_type: str) -> None:
-        """Validate the ObjectRef format and accessibility."""
-        if not object_ref.startswith('gs://'):
-            raise ValueError("ObjectRef must start with 'gs://'")
+            for object_ref in missing:
+                metadata_by_ref[object_ref] = {'error': str(e)}
         
-        if not object_ref.count('/') >= 2:
-            raise ValueError("ObjectRef must have format: gs://bucket/path")
+        return metadata_by_ref
+    
+    def _validate_object_ref(self, object_ref: str, object_type: str) -> Tuple[str, str]:
+        """
+        Validate the ObjectRef format.
         
-        # Additional validation could include checking if the file exists
-        # and if it's accessible, but this would require Cloud Storage permissions
+        Checking that the file exists and is accessible would require Cloud
+        Storage permissions, so only the URI shape is validated.
         
-        logger.debug("ObjectRef validation passed", object_ref=object_ref)
+        Returns:
+            The bucket name and object path of the ObjectRef
+        """
+        match = _GS_URI_PATTERN.fullmatch(object_ref)
+        if match is None:
+            raise ValueError("ObjectRef must have format: gs://bucket/path")
+        return match.group(1), match.group(2)
     
     def _build_object_ref_analysis_query(
         self,
@@ -262,38 +475,99 @@ class ObjectRefProcessor:
         analysis_prompt: str,
         model_name: str,
         **kwargs
-    ) -> str:
-        """Build the ObjectRef analysis SQL query."""
-        # Escape single quotes in the prompt
-        escaped_prompt = analysis_prompt.replace("'", "\\'")
+    ) -> Tuple[str, bigquery.QueryJobConfig]:
+        """
+        Build the ObjectRef analysis SQL query.
         
-        query = f"""
+        The SQL text is constant and all inputs are bound as query
+        parameters, so prompts cannot break out of the query and identical
+        analyses can be served from the BigQuery results cache.
+        """
+        query = """
         SELECT 
             AI.GENERATE(
-                '{escaped_prompt}',
-                '{model_name}',
+                @analysis_prompt,
+                @model_name,
                 STRUCT(
-                    '{object_ref}' as object_ref
+                    @object_ref as object_ref
                 )
-            ) as analysis_result,
-            CURRENT_TIMESTAMP() as timestamp
+            ) as analysis_result
         """
-        return query
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[
+                bigquery.ScalarQueryParameter('analysis_prompt', 'STRING', analysis_prompt),
+                bigquery.ScalarQueryParameter('model_name', 'STRING', model_name),
+                bigquery.ScalarQueryParameter('object_ref', 'STRING', object_ref)
+            ],
+            use_query_cache=True
+        )
+        return query, job_config
     
-    def _build_metadata_extraction_query(self, object_ref: str) -> str:
-        """Build the metadata extraction SQL query."""
+    def _build_batch_object_ref_analysis_query(
+        self,
+        object_refs: List[str],
+        analysis_prompt: str,
+        model_name: str
+    ) -> Tuple[str, bigquery.QueryJobConfig]:
+        """
+        Build a single AI.GENERATE query over an array of ObjectRefs.
+        
+        The ObjectRefs are bound as the ``@object_refs`` ARRAY<STRING>
+        parameter; each row carries its offset in the array so results can
+        be matched back to their objects.
+        """
+        query = """
+        SELECT 
+            ref_offset,
+            AI.GENERATE(
+                @analysis_prompt,
+                @model_name,
+                STRUCT(
+                    object_ref as object_ref
+                )
+            ) as analysis_result
+        FROM UNNEST(@object_refs) AS object_ref WITH OFFSET AS ref_offset
+        """
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[
+                bigquery.ArrayQueryParameter('object_refs', 'STRING', object_refs),
+                bigquery.ScalarQueryParameter('analysis_prompt', 'STRING', analysis_prompt),
+                bigquery.ScalarQueryParameter('model_name', 'STRING', model_name)
+            ]
+        )
+        return query, job_config
+    
+    def _build_metadata_extraction_query(
+        self,
+        object_refs: List[str]
+    ) -> Tuple[str, bigquery.QueryJobConfig]:
+        """Build the parameterized metadata extraction SQL query for a set of ObjectRefs."""
         query = f"""
         SELECT 
+            gs_uri,
             file_name,
             file_size,
             file_type,
             file_last_modified,
             file_metadata
-        FROM `{self.config['project_id']}.{self.config['dataset_id']}.object_files`
-        WHERE gs_uri = '{object_ref}'
-        LIMIT 1
+        FROM `{self.config.get_full_table_id('object_files')}`
+        WHERE gs_uri IN UNNEST(@object_refs)
+        """
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[bigquery.ArrayQueryParameter('object_refs', 'STRING', object_refs)],
+            use_query_cache=True
+        )
+        return query, job_config
+    
+    @staticmethod
+    def _job_timestamp(query_job: bigquery.QueryJob) -> str:
+        """
+        Get the completion time of a query job as an ISO string.
+        
+        The analysis queries avoid CURRENT_TIMESTAMP() so that repeated
+        calls can be served from the BigQuery results cache.
         """
-        return query
+        return query_job.ended.isoformat() if query_job.ended else ''
     
     def _store_object_ref_metadata(
         self,
@@ -303,33 +577,37 @@ class ObjectRefProcessor:
         object_type: str,
         **kwargs
     ) -> None:
-        """Store ObjectRef metadata in BigQuery."""
+        """Queue ObjectRef metadata for storage in BigQuery."""
+        self._metadata_queue.put({
+            'object_ref': object_ref,
+            'bucket_name': bucket_name,
+            'file_path': file_path,
+            'object_type': object_type,
+            'creation_timestamp': datetime.now(timezone.utc).isoformat(),
+            'options': str(kwargs) if kwargs else None
+        })
+    
+    @staticmethod
+    def _store_object_ref_metadata_rows(
+        client: Client,
+        metadata_table_id: str,
+        rows: List[Dict[str, Any]]
+    ) -> None:
+        """Insert a batch of queued ObjectRef metadata rows."""
         try:
-            metadata_table_id = f"{self.config['project_id']}.{self.config['dataset_id']}.object_refs_metadata"
-            
-            # Prepare the row data
-            row = {
-                'object_ref': object_ref,
-                'bucket_name': bucket_name,
-                'file_path': file_path,
-                'object_type': object_type,
-                'creation_timestamp': bigquery.ScalarQueryParameter('timestamp', 'TIMESTAMP', None),
-                'options': str(kwargs) if kwargs else None
-            }
-            
-            # Insert the row
-            errors = self.client.insert_rows_json(metadata_table_id, [row])
+            # Insert all rows in one request
+            errors = client.insert_rows_json(metadata_table_id, rows)
             if errors:
                 logger.warning("Failed to store ObjectRef metadata in BigQuery",
-                              object_ref=object_ref,
+                              num_object_refs=len(rows),
                               errors=errors)
             else:
                 logger.info("ObjectRef metadata stored in BigQuery successfully",
-                           object_ref=object_ref)
+                           num_object_refs=len(rows))
                 
         except Exception as e:
             logger.warning("Failed to store ObjectRef metadata in BigQuery",
-                          object_ref=object_ref,
+                          num_object_refs=len(rows),
                           error=str(e))
     
     def _store_analysis(
@@ -341,34 +619,48 @@ class ObjectRefProcessor:
         model_name: str,
         **kwargs
     ) -> None:
-        """Store the analysis result in BigQuery."""
+        """Queue the analysis result for storage in BigQuery."""
+        self._analysis_queue.put(self._analysis_row(
+            analysis_id, object_ref, analysis_prompt, analysis_result, model_name, **kwargs
+        ))
+    
+    @staticmethod
+    def _analysis_row(
+        analysis_id: str,
+        object_ref: str,
+        analysis_prompt: str,
+        analysis_result: str,
+        model_name: str,
+        **kwargs
+    ) -> Dict[str, Any]:
+        """Build the ``object_ref_analyses`` row for an analysis."""
+        return {
+            'analysis_id': analysis_id,
+            'object_ref': object_ref,
+            'analysis_prompt': analysis_prompt,
+            'analysis_result': analysis_result,
+            'model_name': model_name,
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'parameters': str(kwargs) if kwargs else None
+        }
+    
+    @staticmethod
+    def _store_analyses(client: Client, analysis_table_id: str, rows: List[Dict[str, Any]]) -> None:
+        """Insert a batch of queued analysis rows."""
         try:
-            analysis_table_id = f"{self.config['project_id']}.{self.config['dataset_id']}.object_ref_analyses"
-            
-            # Prepare the row data
-            row = {
-                'analysis_id': analysis_id,
-                'object_ref': object_ref,
-                'analysis_prompt': analysis_prompt,
-                'analysis_result': analysis_result,
-                'model_name': model_name,
-                'timestamp': bigquery.ScalarQueryParameter('timestamp', 'TIMESTAMP', None),
-                'parameters': str(kwargs) if kwargs else None
-            }
-            
-            # Insert the row
-            errors = self.client.insert_rows_json(analysis_table_id, [row])
+            # Insert all rows in one request
+            errors = client.insert_rows_json(analysis_table_id, rows)
             if errors:
-                logger.warning("Failed to store analysis in BigQuery",
-                              analysis_id=analysis_id,
+                logger.warning("Failed to store analyses in BigQuery",
+                              num_analyses=len(rows),
                               errors=errors)
             else:
-                logger.info("Analysis stored in BigQuery successfully",
-                           analysis_id=analysis_id)
+                logger.info("Analyses stored in BigQuery successfully",
+                           num_analyses=len(rows))
                 
         except Exception as e:
-            logger.warning("Failed to store analysis in BigQuery",
-                          analysis_id=analysis_id,
+            logger.warning("Failed to store analyses in BigQuery",
+                          num_analyses=len(rows),
                           error=str(e))
     
     def get_object_ref_usage_stats(self) -> Dict[str, Any]:
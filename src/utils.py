@@ -0,0 +1,453 @@
+"""
+Shared utility functions for BigQuery AI operations.
+
+This module provides helpers used across the generative AI, vector search
+and multimodal modules, such as cache-key construction and in-process
+response caching and buffered background writes.
+"""
+
+import base64
+import hashlib
+import json
+import os
+import queue
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+
+def make_cache_key(**parts: Any) -> str:
+    """Build a stable SHA-256 cache key from keyword parts."""
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def uuid7() -> str:
+    """
+    Generate a time-ordered version 7 UUID string (RFC 9562).
+    
+    The leading 48 bits are the Unix time in milliseconds, so IDs minted
+    close together sort and cluster together instead of scattering like
+    random version 4 IDs.
+    """
+    value = (time.time_ns() // 1_000_000) << 80 | int.from_bytes(os.urandom(10), "big")
+    value = (value & ~(0xF << 76)) | (0x7 << 76)
+    value = (value & ~(0x3 << 62)) | (0x2 << 62)
+    return str(uuid.UUID(int=value))
+
+
+def encode_embedding(
+    vector: Sequence[float],
+    encoding: str = "fp32"
+) -> Tuple[Union[List[float], str], Optional[float]]:
+    """
+    Encode an embedding vector for transport.
+    
+    Args:
+        vector: The embedding values
+        encoding: ``fp32`` for a plain list of floats, ``fp16`` for base64
+            of packed little-endian half floats, or ``int8`` for base64 of
+            symmetrically quantized bytes
+            
+    Returns:
+        The encoded vector and, for ``int8``, the scale that maps the
+        quantized values back to floats (``value = q * scale``)
+    """
+    if encoding == "fp32":
+        return list(vector), None
+    return encode_embeddings([vector], encoding)[0]
+
+
+def encode_embeddings(
+    vectors: Sequence[Sequence[float]],
+    encoding: str = "fp32",
+    normalize: bool = False
+) -> List[Tuple[Union[List[float], str], Optional[float]]]:
+    """
+    Encode a batch of embedding vectors, optionally L2-normalizing them first.
+    
+    Vectors of the same length are stacked into one float32 matrix so that
+    normalization and quantization run as whole-array operations rather
+    than per vector.
+    
+    Args:
+        vectors: The embedding vectors
+        encoding: ``fp32``, ``fp16`` or ``int8``, as for ``encode_embedding``
+        normalize: Scale each vector to unit length before encoding
+        
+    Returns:
+        One ``(encoded vector, scale)`` pair per input vector, in order
+    """
+    if encoding not in ("fp32", "fp16", "int8"):
+        raise ValueError(f"Unsupported embedding encoding: {encoding!r}")
+    
+    by_length: Dict[int, List[int]] = {}
+    for index, vector in enumerate(vectors):
+        by_length.setdefault(len(vector), []).append(index)
+    
+    encoded: List[Tuple[Union[List[float], str], Optional[float]]] = [None] * len(vectors)
+    for indices in by_length.values():
+        matrix = np.asarray([vectors[i] for i in indices], dtype=np.float32)
+        if normalize:
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            np.divide(matrix, norms, out=matrix, where=norms > 0)
+        
+        if encoding == "fp32":
+            rows = [(row.tolist(), None) for row in matrix]
+        elif encoding == "fp16":
+            rows = [(base64.b64encode(row.tobytes()).decode(), None) for row in matrix.astype("<f2")]
+        else:
+            peaks = np.abs(matrix).max(axis=1) if matrix.shape[1] else np.zeros(len(indices), np.float32)
+            scales = np.where(peaks > 0, peaks / 127, 1.0)
+            quantized = np.round(matrix / scales[:, np.newaxis]).astype(np.int8)
+            rows = [
+                (base64.b64encode(row.tobytes()).decode(), float(scale))
+                for row, scale in zip(quantized, scales)
+            ]
+        
+        for index, row in zip(indices, rows):
+            encoded[index] = row
+    return encoded
+
+
+class ResponseCache:
+    """Thread-safe in-memory LRU cache with a per-entry time-to-live."""
+    
+    def __init__(self, max_size: int = 1024, ttl_seconds: float = 3600):
+        """Initialize the cache with a size bound and entry TTL."""
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for ``key`` or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+    
+    def set(self, key: str, value: Any) -> None:
+        """Store ``value`` under ``key``, evicting the least recently used entry."""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+    
+    def clear(self) -> None:
+        """Remove all entries."""
+        with self._lock:
+            self._entries.clear()
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SemanticResponseCache:
+    """
+    Near-match response cache keyed by prompt embeddings.
+    
+    Entries are grouped by a signature (model and generation parameters)
+    and a prompt length bucket; a lookup is a hit when the cosine similarity
+    between the prompt embedding and a stored embedding in the same group
+    is at least ``threshold``. Each group keeps its normalized float32
+    embeddings stacked in one ``(N, D)`` matrix, so a lookup is a single
+    matrix-vector product.
+    """
+    
+    def __init__(
+        self,
+        embed_fn: Callable[[str], Sequence[float]],
+        threshold: float = 0.95,
+        max_size: int = 1024,
+        length_bucket: int = 64
+    ):
+        """Initialize the cache with an embedding function and similarity threshold."""
+        self.embed_fn = embed_fn
+        self.threshold = threshold
+        self.max_size = max_size
+        self.length_bucket = length_bucket
+        self._groups: Dict[Tuple[str, int], Tuple[np.ndarray, List[Any]]] = {}
+        self._size = 0
+        self._lock = threading.Lock()
+    
+    def _group_key(self, signature: str, prompt: str) -> Tuple[str, int]:
+        return signature, len(prompt) // self.length_bucket
+    
+    def _embed(self, prompt: str) -> np.ndarray:
+        vector = np.asarray(self.embed_fn(prompt), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+    
+    def get(self, signature: str, prompt: str) -> Optional[Any]:
+        """Return the closest cached value above the similarity threshold."""
+        group = self._groups.get(self._group_key(signature, prompt))
+        if not group:
+            return None
+        
+        query = self._embed(prompt)
+        with self._lock:
+            matrix, values = group
+            similarities = matrix @ query
+            best = int(np.argmax(similarities))
+            if similarities[best] >= self.threshold:
+                return values[best]
+        return None
+    
+    def set(self, signature: str, prompt: str, value: Any) -> None:
+        """Store ``value`` for ``prompt`` under ``signature``."""
+        vector = self._embed(prompt)
+        key = self._group_key(signature, prompt)
+        with self._lock:
+            if self._size >= self.max_size:
+                # Drop the oldest entry of the largest group to stay bounded
+                largest = max(self._groups, key=lambda k: len(self._groups[k][1]))
+                matrix, values = self._groups[largest]
+                if len(values) > 1:
+                    self._groups[largest] = (matrix[1:], values[1:])
+                else:
+                    del self._groups[largest]
+                self._size -= 1
+            
+            group = self._groups.get(key)
+            if group is not None and group[0].shape[1] != vector.size:
+                # The embedding model changed dimensions; stale vectors cannot be compared
+                self._size -= len(group[1])
+                group = None
+            if group is None:
+                self._groups[key] = (vector[np.newaxis, :], [value])
+            else:
+                # Rebuild rather than mutate so concurrent readers keep a consistent view
+                self._groups[key] = (np.vstack([group[0], vector]), group[1] + [value])
+            self._size += 1
+    
+    def clear(self) -> None:
+        """Remove all entries."""
+        with self._lock:
+            self._groups.clear()
+            self._size = 0
+
+
+class TemplateCache:
+    """
+    Response cache for prompts that differ only in a few word slots.
+    
+    Prompts are split into whitespace tokens and compared with stored
+    prompts of the same length under the same key (e.g. a schema hash).
+    When at most ``max_slots`` tokens differ and every differing token
+    appears verbatim in the cached response's string values, a response is
+    synthesized by substituting the new tokens for the old ones.
+    """
+    
+    def __init__(self, max_slots: int = 3, max_entries_per_key: int = 64):
+        """Initialize the cache with slot and per-key entry limits."""
+        self.max_slots = max_slots
+        self.max_entries_per_key = max_entries_per_key
+        self._entries: Dict[str, List[Tuple[List[str], Any]]] = {}
+        self._lock = threading.Lock()
+    
+    def get(self, key: str, prompt: str) -> Optional[Any]:
+        """Return a cached or synthesized response for ``prompt`` under ``key``."""
+        tokens = prompt.split()
+        with self._lock:
+            candidates = list(self._entries.get(key, ()))
+        
+        for cached_tokens, response in reversed(candidates):
+            if len(cached_tokens) != len(tokens):
+                continue
+            
+            slots: Dict[str, str] = {}
+            for old, new in zip(cached_tokens, tokens):
+                if old == new:
+                    continue
+                if slots.get(old, new) != new:
+                    break
+                slots[old] = new
+            else:
+                if not slots:
+                    return response
+                if len(slots) <= self.max_slots:
+                    synthesized = self._substitute(response, slots)
+                    if synthesized is not None:
+                        return synthesized
+        return None
+    
+    def set(self, key: str, prompt: str, response: Any) -> None:
+        """Store ``response`` as a template for ``prompt`` under ``key``."""
+        with self._lock:
+            entries = self._entries.setdefault(key, [])
+            entries.append((prompt.split(), response))
+            if len(entries) > self.max_entries_per_key:
+                entries.pop(0)
+    
+    def clear(self) -> None:
+        """Remove all entries."""
+        with self._lock:
+            self._entries.clear()
+    
+    @staticmethod
+    def _substitute(response: Any, slots: Dict[str, str]) -> Optional[Any]:
+        """Replace slot tokens in string values; None if any slot is not present."""
+        pattern = re.compile(
+            r"(?<!\w)(" + "|".join(re.escape(old) for old in sorted(slots, key=len, reverse=True)) + r")(?!\w)"
+        )
+        found = set()
+        
+        def replace(match):
+            found.add(match.group(0))
+            return slots[match.group(0)]
+        
+        def walk(value):
+            if isinstance(value, str):
+                return pattern.sub(replace, value)
+            if isinstance(value, dict):
+                return {k: walk(v) for k, v in value.items()}
+            if isinstance(value, list):
+                return [walk(v) for v in value]
+            return value
+        
+        synthesized = walk(response)
+        return synthesized if found == set(slots) else None
+
+
+class WriteQueue:
+    """
+    Bounded queue that flushes rows in batches from a background thread.
+    
+    ``put`` never blocks the caller; a daemon worker drains up to
+    ``max_batch`` rows, or whatever arrived within ``max_wait_seconds`` of
+    the first row, and hands them to ``flush_fn`` in a single call.
+    ``flush`` waits for queued rows to be written and keeps the worker
+    running; ``close`` also stops it and is meant for shutdown.
+    """
+    
+    _CLOSE = object()
+    _FLUSH = object()
+    
+    def __init__(
+        self,
+        flush_fn: Callable[[List[Any]], None],
+        max_batch: int = 500,
+        max_wait_seconds: float = 0.1,
+        maxsize: int = 10_000,
+        name: str = "write-queue"
+    ):
+        """Initialize the queue with a flush callback and batching limits."""
+        self.flush_fn = flush_fn
+        self.max_batch = max_batch
+        self.max_wait_seconds = max_wait_seconds
+        self.name = name
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=maxsize)
+        self._worker: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._close_pending = False
+        self.dropped = 0
+    
+    def put(self, row: Any) -> bool:
+        """Enqueue ``row`` for writing; returns False if the queue is full."""
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            self.dropped += 1
+            logger.warning("Write queue is full, dropping row",
+                          queue=self.name,
+                          dropped=self.dropped)
+            return False
+        
+        self._ensure_worker()
+        return True
+    
+    def flush(self) -> None:
+        """Wait until every queued row has been handed to ``flush_fn``."""
+        if self._worker is None and self._queue.empty():
+            return
+        
+        # The marker ends the current batch early instead of waiting out
+        # max_wait_seconds
+        self._queue.put(self._FLUSH)
+        self._ensure_worker()
+        self._queue.join()
+    
+    def close(self, timeout: Optional[float] = 10.0) -> None:
+        """Flush pending rows and stop the worker thread."""
+        with self._lock:
+            worker = self._worker
+            if worker is None:
+                return
+            if not self._close_pending:
+                self._close_pending = True
+                self._queue.put(self._CLOSE)
+        
+        # A worker cannot wait for itself, e.g. when closed by a finalizer
+        # that runs on it
+        if worker is not threading.current_thread():
+            worker.join(timeout)
+    
+    def _ensure_worker(self) -> None:
+        """Start the worker thread unless one is running."""
+        # Called after enqueueing: a worker only exits once it finds the
+        # queue empty, so either it sees the new row or it has already
+        # cleared _worker and a new one is started here
+        if self._worker is not None:
+            return
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._worker.start()
+    
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait_seconds
+            
+            # Stop waiting for more rows as soon as a flush or close is requested
+            while (len(batch) < self.max_batch
+                   and batch[-1] is not self._CLOSE
+                   and batch[-1] is not self._FLUSH):
+                remaining = deadline - time.monotonic()
+                try:
+                    batch.append(self._queue.get(timeout=remaining) if remaining > 0
+                                 else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            
+            rows = [row for row in batch if row is not self._CLOSE and row is not self._FLUSH]
+            if rows:
+                self._flush(rows)
+            for _ in batch:
+                self._queue.task_done()
+            
+            if any(row is self._CLOSE for row in batch):
+                # Rows that arrived while closing are drained before exiting
+                with self._lock:
+                    self._close_pending = False
+                    if self._queue.empty():
+                        self._worker = None
+                        return
+    
+    def _flush(self, batch: List[Any]) -> None:
+        try:
+            self.flush_fn(batch)
+        except Exception as e:
+            logger.warning("Failed to flush write queue",
+                          queue=self.name,
+                          num_rows=len(batch),
+                          error=str(e))
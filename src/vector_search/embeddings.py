@@ -7,7 +7,8 @@ enabling the generation of vector representations for text, images, and other co
 
 import uuid
 import hashlib
-from typing import List, Dict, Any, Optional, Union
+from datetime import datetime, timezone
+from typing import Iterator, List, Dict, Any, Optional, Tuple, Union
 from google.cloud import bigquery
 from google.cloud.bigquery import Client
 import structlog
@@ -19,6 +20,9 @@ logger = structlog.get_logger(__name__)
 class EmbeddingGenerator:
     """BigQuery ML.GENERATE_EMBEDDING implementation for vector generation."""
     
+    # Page size for streamed history results
+    RESULT_PAGE_SIZE = 1000
+    
     def __init__(self, client: Optional[Client] = None):
         """Initialize EmbeddingGenerator with BigQuery client."""
         self.client = client or get_bigquery_client()
@@ -144,6 +148,79 @@ class EmbeddingGenerator:
         
         return query
     
+    def _build_batch_generate_embedding_query(
+        self,
+        contents: List[str],
+        model_name: str,
+        **kwargs
+    ) -> Tuple[str, bigquery.QueryJobConfig]:
+        """
+        Build one ML.GENERATE_EMBEDDING SQL query over an array of contents.
+        
+        The contents are bound as the ``@contents`` ARRAY<STRING> parameter;
+        each row carries its offset in the array so results can be matched
+        back to their contents.
+        """
+        query = f"""
+        SELECT 
+            content_index,
+            ml_generate_embedding_result as embedding_vector,
+            ml_generate_embedding_status as status
+        FROM ML.GENERATE_EMBEDDING(
+            MODEL `{model_name}`,
+            (SELECT content, content_index FROM UNNEST(@contents) AS content WITH OFFSET AS content_index)
+        """
+        
+        # Add additional parameters if provided
+        if kwargs:
+            query += ", STRUCT("
+            param_list = []
+            for key, value in kwargs.items():
+                if isinstance(value, (int, float)):
+                    param_list.append(f"{value} as {key}")
+                elif isinstance(value, str):
+                    param_list.append(f"'{value}' as {key}")
+            
+            query += ", ".join(param_list)
+            query += ")"
+        
+        query += ")"
+        
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[bigquery.ArrayQueryParameter("contents", "STRING", contents)]
+        )
+        return query, job_config
+    
+    def _store_embeddings(self, results: List[Dict[str, Any]]):
+        """Store a batch of embeddings in BigQuery with a single insert."""
+        if not results:
+            return
+        
+        try:
+            table_id = self.config.get_full_table_id("embeddings")
+            rows = [
+                {
+                    **{field: result[field] for field in (
+                        'id', 'content_type', 'content_hash', 'embedding_vector',
+                        'model_name', 'dimensions', 'metadata', 'created_at'
+                    )},
+                    'updated_at': result['created_at']
+                }
+                for result in results
+            ]
+            
+            errors = self.client.insert_rows_json(table_id, rows)
+            
+            if errors:
+                logger.warning("Failed to store embeddings",
+                             errors=errors,
+                             num_embeddings=len(rows))
+                
+        except Exception as e:
+            logger.warning("Failed to store embeddings",
+                         error=str(e),
+                         num_embeddings=len(results))
+    
     def _store_embedding(
         self,
         embedding_id: str,
@@ -210,26 +287,119 @@ class EmbeddingGenerator:
             **kwargs: Additional parameters for embedding generation
             
         Returns:
-            List of embedding results
+            List of embedding results, in the order of ``contents``
+        """
+        results: List[Dict[str, Any]] = [None] * len(contents)
+        for result in self.iter_batch_generate_embeddings(contents, content_type, model_name, **kwargs):
+            results[result.pop('content_index')] = result
+        return results
+    
+    def iter_batch_generate_embeddings(
+        self,
+        contents: List[str],
+        content_type: str = "text",
+        model_name: str = "text-embedding-001",
+        **kwargs
+    ) -> Iterator[Dict[str, Any]]:
         """
-        results = []
+        Stream embedding results as they are generated.
+        
+        Batches large enough for the Storage Read API run as one query whose
+        results are read over parallel streams, and so arrive in no
+        particular order; smaller batches are embedded one item at a time.
+        Each result carries the ``content_index`` of its content.
+        
+        Yields:
+            Embedding results, each with its ``content_index``
+        """
+        if self.config.should_use_storage_api(len(contents)):
+            yield from self._iter_storage_batch_embeddings(contents, content_type, model_name, **kwargs)
+            return
         
         for i, content in enumerate(contents):
             try:
                 logger.info(f"Processing content {i+1}/{len(contents)}")
                 result = self.generate_embedding(content, content_type, model_name, **kwargs)
-                results.append(result)
+                yield {'content_index': i, **result}
             except Exception as e:
-                logger.error(f"Failed to generate embedding for content {i+1}",
-                           error=str(e),
-                           content=content[:100] + "..." if len(content) > 100 else content)
+                yield self._failed_embedding(i, content, str(e))
+    
+    def _iter_storage_batch_embeddings(
+        self,
+        contents: List[str],
+        content_type: str,
+        model_name: str,
+        **kwargs
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Embed a large batch with one query and read it over the Storage Read API.
+        
+        The unordered result is split into read streams that are fetched as
+        Arrow record batches in parallel, and each record batch is stored
+        with a single insert. Contents without a result row are reported as
+        failed last.
+        """
+        try:
+            query, job_config = self._build_batch_generate_embedding_query(contents, model_name, **kwargs)
+            
+            logger.info("Executing batch ML.GENERATE_EMBEDDING query",
+                       model=model_name,
+                       num_contents=len(contents))
+            
+            query_job = self.client.query(query, job_config=job_config)
+            rows = query_job.result()
+            record_batches = rows.to_arrow_iterable(bqstorage_client=self.config.get_bqstorage_client())
+            
+        except Exception as e:
+            logger.error("Batch embedding generation failed",
+                        error=str(e),
+                        num_contents=len(contents))
+            for i, content in enumerate(contents):
+                yield self._failed_embedding(i, content, str(e))
+            return
+        
+        pending = set(range(len(contents)))
+        for record_batch in record_batches:
+            created_at = datetime.now(timezone.utc).isoformat()
+            results = []
+            for row in record_batch.to_pylist():
+                i = row['content_index']
+                pending.discard(i)
+                if row['status']:
+                    yield self._failed_embedding(i, contents[i], row['status'])
+                    continue
+                
+                embedding_vector = row['embedding_vector']
                 results.append({
-                    'error': str(e),
-                    'content': content,
-                    'status': 'failed'
+                    'content_index': i,
+                    'id': str(uuid.uuid4()),
+                    'content_type': content_type,
+                    'content_hash': hashlib.sha256(contents[i].encode()).hexdigest(),
+                    'embedding_vector': embedding_vector,
+                    'model_name': model_name,
+                    'dimensions': len(embedding_vector),
+                    'metadata': {},
+                    'created_at': created_at
                 })
+            
+            self._store_embeddings(results)
+            yield from results
         
-        return results
+        for i in sorted(pending):
+            yield self._failed_embedding(i, contents[i], "No result returned from ML.GENERATE_EMBEDDING")
+    
+    @staticmethod
+    def _failed_embedding(i: int, content: str, error: str) -> Dict[str, Any]:
+        """Log and build the result for a content item that failed to embed."""
+        logger.error(f"Failed to generate embedding for content {i+1}",
+                   error=error,
+                   content=content[:100] + "..." if len(content) > 100 else content)
+        return {
+            'content_index': i,
+            'error': error,
+            'content': content,
+            'status': 'failed'
+        }
     
     def get_embedding_by_hash(self, content_hash: str) -> Optional[Dict[str, Any]]:
         """
@@ -303,54 +473,73 @@ class EmbeddingGenerator:
             List of embedding records
         """
         try:
-            table_id = self.config.get_full_table_id("embeddings")
-            
-            query = f"""
-            SELECT 
-                id,
-                content_type,
-                content_hash,
-                embedding_vector,
-                model_name,
-                dimensions,
-                metadata,
-                created_at,
-                updated_at
-            FROM `{table_id}`
-            WHERE 1=1
-            """
-            
-            if model_name:
-                query += f" AND model_name = '{model_name}'"
-            
-            if content_type:
-                query += f" AND content_type = '{content_type}'"
-            
-            query += f"""
-            ORDER BY created_at DESC
-            LIMIT {limit}
-            """
-            
-            query_job = self.client.query(query)
-            results = list(query_job.result())
-            
-            # Convert to dictionaries
-            history = []
-            for row in results:
-                history.append({
-                    'id': row.id,
-                    'content_type': row.content_type,
-                    'content_hash': row.content_hash,
-                    'embedding_vector': row.embedding_vector,
-                    'model_name': row.model_name,
-                    'dimensions': row.dimensions,
-                    'metadata': row.metadata,
-                    'created_at': row.created_at.isoformat() if row.created_at else None,
-                    'updated_at': row.updated_at.isoformat() if row.updated_at else None
-                })
-            
-            return history
+            return list(self.iter_embedding_history(limit, model_name, content_type))
             
         except Exception as e:
             logger.error("Failed to retrieve embedding history", error=str(e))
             return []
+    
+    def iter_embedding_history(
+        self,
+        limit: int = 100,
+        model_name: Optional[str] = None,
+        content_type: Optional[str] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Stream embedding history records as BigQuery returns them.
+        
+        Args:
+            limit: Maximum number of records to return
+            model_name: Filter by specific model
+            content_type: Filter by content type
+            
+        Yields:
+            Embedding records, newest first
+        """
+        table_id = self.config.get_full_table_id("embeddings")
+        
+        query = f"""
+        SELECT 
+            id,
+            content_type,
+            content_hash,
+            embedding_vector,
+            model_name,
+            dimensions,
+            metadata,
+            created_at,
+            updated_at
+        FROM `{table_id}`
+        WHERE 1=1
+        """
+        query_parameters = [bigquery.ScalarQueryParameter("limit", "INT64", limit)]
+        
+        if model_name:
+            query += " AND model_name = @model_name"
+            query_parameters.append(bigquery.ScalarQueryParameter("model_name", "STRING", model_name))
+        
+        if content_type:
+            query += " AND content_type = @content_type"
+            query_parameters.append(bigquery.ScalarQueryParameter("content_type", "STRING", content_type))
+        
+        query += """
+        ORDER BY created_at DESC
+        LIMIT @limit
+        """
+        
+        job_config = bigquery.QueryJobConfig(query_parameters=query_parameters)
+        query_job = self.client.query(query, job_config=job_config)
+        
+        # Convert to dictionaries one row at a time
+        for row in query_job.result(page_size=min(limit, self.RESULT_PAGE_SIZE)):
+            yield {
+                'id': row.id,
+                'content_type': row.content_type,
+                'content_hash': row.content_hash,
+                'embedding_vector': row.embedding_vector,
+                'model_name': row.model_name,
+                'dimensions': row.dimensions,
+                'metadata': row.metadata,
+                'created_at': row.created_at.isoformat() if row.created_at else None,
+                'updated_at': row.updated_at.isoformat() if row.updated_at else None
+            }
@@ -65,6 +65,7 @@ def mock_bigquery_config():
     mock_config.location = "US"
     mock_config.dataset_id = "test_dataset"
     mock_config.get_full_table_id.return_value = "test-project-id.test_dataset.test_table"
+    mock_config.should_use_storage_api.return_value = False
     
     return mock_config
 
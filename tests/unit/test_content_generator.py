@@ -0,0 +1,169 @@
+"""
+Unit tests for ContentGenerator class.
+
+This module tests the BigQuery AI.GENERATE implementation including
+content generation, batch processing, concurrent retries, and storage.
+"""
+
+import pytest
+from unittest.mock import Mock, patch
+from google.api_core import exceptions as api_exceptions
+from src.generative_ai.content_generator import ContentGenerator
+
+
+SETTINGS = {"max_in_flight_queries": 4, "max_retries": 1}
+
+
+def _generate_job(rows):
+    """Build a mock AI.GENERATE query job returning ``rows``."""
+    mock_query_job = Mock()
+    mock_query_job.result.return_value = rows
+    mock_query_job.ended = None
+    return mock_query_job
+
+
+class TestContentGenerator:
+    """Test cases for ContentGenerator class."""
+    
+    def test_generate_content_success(self, mock_bigquery_client, mock_bigquery_config):
+        """Test successful content generation stored through the insert fallback."""
+        with patch('src.generative_ai.content_generator.get_bigquery_config', return_value=mock_bigquery_config), \
+             patch('src.generative_ai.content_generator.get_bigquery_settings', return_value=SETTINGS):
+            generator = ContentGenerator(client=mock_bigquery_client)
+            mock_bigquery_config.get_bqstorage_write_client.return_value = None
+            
+            mock_bigquery_client.query.return_value = _generate_job([{
+                "ai_generate_result": "Generated content",
+                "ai_generate_metadata": {"tokens": 3}
+            }])
+            mock_bigquery_client.insert_rows_json.return_value = []
+            
+            result = generator.generate_content("Write a tagline", model_name="gemini-pro")
+            
+            assert result['generated_content'] == "Generated content"
+            assert result['model_name'] == "gemini-pro"
+            assert result['metadata']['output_length'] == len("Generated content")
+            assert result['metadata']['model_metadata'] == {"tokens": 3}
+            
+            # Without the Storage Write API rows are written with insert_rows_json
+            generator.flush()
+            mock_bigquery_client.insert_rows_json.assert_called_once()
+            stored_row = mock_bigquery_client.insert_rows_json.call_args[0][1][0]
+            assert stored_row['id'] == result['id']
+            assert stored_row['generated_content'] == "Generated content"
+            assert stored_row['status'] == "success"
+            generator.close()
+    
+    def test_generate_content_no_results(self, mock_bigquery_client, mock_bigquery_config):
+        """Test content generation when no results are returned."""
+        with patch('src.generative_ai.content_generator.get_bigquery_config', return_value=mock_bigquery_config), \
+             patch('src.generative_ai.content_generator.get_bigquery_settings', return_value=SETTINGS):
+            generator = ContentGenerator(client=mock_bigquery_client)
+            mock_bigquery_config.get_bqstorage_write_client.return_value = None
+            
+            mock_bigquery_client.query.return_value = _generate_job([])
+            
+            with pytest.raises(ValueError, match="No results returned from AI.GENERATE"):
+                generator.generate_content("Write a tagline")
+            generator.close()
+    
+    def test_deterministic_generation_served_from_cache(self, mock_bigquery_client, mock_bigquery_config):
+        """Test that a repeated deterministic generation does not run a second query."""
+        with patch('src.generative_ai.content_generator.get_bigquery_config', return_value=mock_bigquery_config), \
+             patch('src.generative_ai.content_generator.get_bigquery_settings', return_value=SETTINGS):
+            generator = ContentGenerator(client=mock_bigquery_client)
+            mock_bigquery_config.get_bqstorage_write_client.return_value = None
+            
+            mock_bigquery_client.query.return_value = _generate_job([{"ai_generate_result": "Cached"}])
+            
+            first = generator.generate_content("Write a tagline", temperature=0.0)
+            second = generator.generate_content("Write a tagline", temperature=0.0)
+            
+            assert second['id'] == first['id']
+            assert second['metadata']['cache_hit'] is True
+            mock_bigquery_client.query.assert_called_once()
+            generator.close()
+    
+    def test_generate_content_batch_success(self, mock_bigquery_client, mock_bigquery_config):
+        """Test that all prompts go through a single query."""
+        with patch('src.generative_ai.content_generator.get_bigquery_config', return_value=mock_bigquery_config), \
+             patch('src.generative_ai.content_generator.get_bigquery_settings', return_value=SETTINGS):
+            generator = ContentGenerator(client=mock_bigquery_client)
+            mock_bigquery_config.get_bqstorage_write_client.return_value = None
+            
+            prompts = ["Prompt 1", "Prompt 2"]
+            mock_bigquery_client.query.return_value = _generate_job([
+                {"prompt_offset": 0, "ai_generate_result": "Content 1"},
+                {"prompt_offset": 1, "ai_generate_result": "Content 2"}
+            ])
+            mock_bigquery_client.insert_rows_json.return_value = []
+            
+            results = generator.generate_content_batch(prompts, temperature=0.5)
+            
+            assert [r['generated_content'] for r in results] == ["Content 1", "Content 2"]
+            assert results[0]['parameters']['temperature'] == 0.5
+            
+            mock_bigquery_client.query.assert_called_once()
+            job_config = mock_bigquery_client.query.call_args[1]['job_config']
+            params = {p.name: p for p in job_config.query_parameters}
+            assert params["prompts"].values == prompts
+            
+            generator.flush()
+            assert len(mock_bigquery_client.insert_rows_json.call_args[0][1]) == 2
+            generator.close()
+    
+    def test_generate_content_batch_missing_rows(self, mock_bigquery_client, mock_bigquery_config):
+        """Test that prompts without a result row are reported as failed, in order."""
+        with patch('src.generative_ai.content_generator.get_bigquery_config', return_value=mock_bigquery_config), \
+             patch('src.generative_ai.content_generator.get_bigquery_settings', return_value=SETTINGS):
+            generator = ContentGenerator(client=mock_bigquery_client)
+            mock_bigquery_config.get_bqstorage_write_client.return_value = None
+            
+            prompts = ["Prompt 1", "Prompt 2", "Prompt 3"]
+            mock_bigquery_client.query.return_value = _generate_job([
+                {"prompt_offset": 1, "ai_generate_result": "Content 2"}
+            ])
+            mock_bigquery_client.insert_rows_json.return_value = []
+            
+            results = generator.generate_content_batch(prompts)
+            
+            assert len(results) == 3
+            assert results[0] == {
+                'error': "No result returned from AI.GENERATE",
+                'prompt': "Prompt 1",
+                'status': 'failed'
+            }
+            assert results[1]['generated_content'] == "Content 2"
+            assert results[2]['prompt'] == "Prompt 3"
+            assert results[2]['status'] == 'failed'
+            generator.close()
+    
+    @patch('src.generative_ai.content_generator.time.sleep')
+    def test_concurrent_generation_retries_throttling(self, mock_sleep, mock_bigquery_client, mock_bigquery_config):
+        """Test that throttled queries are retried and other errors become failed results."""
+        with patch('src.generative_ai.content_generator.get_bigquery_config', return_value=mock_bigquery_config), \
+             patch('src.generative_ai.content_generator.get_bigquery_settings', return_value=SETTINGS):
+            generator = ContentGenerator(client=mock_bigquery_client)
+            mock_bigquery_config.get_bqstorage_write_client.return_value = None
+            
+            attempts = {}
+            
+            def run_query(query, job_config):
+                params = {p.name: p.value for p in job_config.query_parameters}
+                prompt = params["prompt"]
+                attempts[prompt] = attempts.get(prompt, 0) + 1
+                if prompt == "Throttled" and attempts[prompt] == 1:
+                    raise api_exceptions.TooManyRequests("Rate limited")
+                if prompt == "Broken":
+                    raise Exception("Query failed")
+                return _generate_job([{"ai_generate_result": f"Content for {prompt}"}])
+            
+            mock_bigquery_client.query.side_effect = run_query
+            
+            results = generator.generate_content_concurrent(["Throttled", "Broken"], max_in_flight=2)
+            
+            assert results[0]['generated_content'] == "Content for Throttled"
+            assert results[1] == {'error': "Query failed", 'prompt': "Broken", 'status': 'failed'}
+            assert attempts == {"Throttled": 2, "Broken": 1}
+            mock_sleep.assert_called_once()
+            generator.close()
@@ -249,6 +249,58 @@ class TestEmbeddingGenerator:
                 assert 'error' in results[1]      # Failure
                 assert results[2]['id'] == "id3"  # Success
     
+    def test_batch_generate_embeddings_storage_read(self, mock_bigquery_client, mock_bigquery_config):
+        """Test that large batches run as one query read over the Storage Read API."""
+        with patch('src.vector_search.embeddings.get_bigquery_config', return_value=mock_bigquery_config):
+            generator = EmbeddingGenerator(client=mock_bigquery_client)
+            mock_bigquery_config.should_use_storage_api.return_value = True
+            
+            # Record batches arrive out of order, with one failed row and one missing row
+            first_batch = Mock()
+            first_batch.to_pylist.return_value = [
+                {"content_index": 2, "embedding_vector": [0.7, 0.8], "status": ""},
+                {"content_index": 0, "embedding_vector": [0.1, 0.2], "status": ""}
+            ]
+            second_batch = Mock()
+            second_batch.to_pylist.return_value = [
+                {"content_index": 1, "embedding_vector": [], "status": "Quota exceeded"}
+            ]
+            mock_rows = Mock()
+            mock_rows.to_arrow_iterable.return_value = iter([first_batch, second_batch])
+            mock_query_job = Mock()
+            mock_query_job.result.return_value = mock_rows
+            mock_query_job.ended = None
+            mock_bigquery_client.query.return_value = mock_query_job
+            mock_bigquery_client.insert_rows_json.return_value = []
+            
+            results = generator.batch_generate_embeddings(
+                contents=["Content 1", "Content 2", "Content 3", "Content 4"],
+                content_type="text",
+                model_name="text-embedding-001"
+            )
+            
+            assert mock_bigquery_client.query.call_count == 1
+            mock_rows.to_arrow_iterable.assert_called_once_with(
+                bqstorage_client=mock_bigquery_config.get_bqstorage_client.return_value
+            )
+            assert results[0]['embedding_vector'] == [0.1, 0.2]
+            assert results[1]['error'] == "Quota exceeded"
+            assert results[2]['embedding_vector'] == [0.7, 0.8]
+            assert results[3]['status'] == 'failed'
+            assert all('content_index' not in result for result in results)
+            
+            # One insert per record batch with successful rows
+            assert mock_bigquery_client.insert_rows_json.call_count == 1
+            
+            # Every REQUIRED column of the embeddings table is populated
+            _, inserted_rows = mock_bigquery_client.insert_rows_json.call_args[0]
+            assert len(inserted_rows) == 2
+            for row in inserted_rows:
+                for column in ('id', 'content_type', 'content_hash', 'model_name',
+                               'dimensions', 'created_at', 'updated_at'):
+                    assert row[column] is not None
+                assert row['created_at'] == row['updated_at']
+    
     def test_get_embedding_by_hash_success(self, mock_bigquery_client, mock_bigquery_config):
         """Test successful retrieval of embedding by hash."""
         with patch('src.vector_search.embeddings.get_bigquery_config', return_value=mock_bigquery_config):
@@ -360,10 +412,14 @@ class TestEmbeddingGenerator:
                 content_type="text"
             )
             
-            # Verify the query includes the filters
-            call_args = mock_bigquery_client.query.call_args[0][0]
-            assert "AND model_name = 'text-embedding-001'" in call_args
-            assert "AND content_type = 'text'" in call_args
+            # Verify the filters are bound as query parameters
+            query = mock_bigquery_client.query.call_args[0][0]
+            job_config = mock_bigquery_client.query.call_args[1]['job_config']
+            assert "AND model_name = @model_name" in query
+            assert "AND content_type = @content_type" in query
+            parameters = {p.name: p.value for p in job_config.query_parameters}
+            assert parameters == {"limit": 50, "model_name": "text-embedding-001", "content_type": "text"}
+            mock_query_job.result.assert_called_once_with(page_size=50)
     
     def test_get_embedding_history_failure(self, mock_bigquery_client, mock_bigquery_config):
         """Test handling of history retrieval failure."""
@@ -0,0 +1,168 @@
+"""
+Unit tests for Forecaster class.
+
+This module tests the BigQuery AI.FORECAST implementation including
+inline and table-based forecasts, result caching, and forecast storage.
+"""
+
+import pytest
+from unittest.mock import Mock, patch
+from src.generative_ai.forecaster import Forecaster
+
+
+SETTINGS = {"max_in_flight_queries": 4}
+
+SERIES = [
+    {"date": "2024-01-01T00:00:00", "sales": 10.0},
+    {"date": "2024-01-02T00:00:00", "sales": 12.0},
+    {"date": "2024-01-03T00:00:00", "sales": 11.0}
+]
+
+
+def _forecast_job(rows):
+    """Build a mock AI.FORECAST query job returning ``rows``."""
+    mock_query_job = Mock()
+    mock_query_job.result.return_value = rows
+    mock_query_job.ended = None
+    mock_query_job.cache_hit = False
+    return mock_query_job
+
+
+class TestForecaster:
+    """Test cases for Forecaster class."""
+    
+    def test_forecast_success(self, mock_bigquery_client, mock_bigquery_config):
+        """Test successful forecast over an inline series."""
+        with patch('src.generative_ai.forecaster.get_bigquery_config', return_value=mock_bigquery_config), \
+             patch('src.generative_ai.forecaster.get_bigquery_settings', return_value=SETTINGS):
+            forecaster = Forecaster(client=mock_bigquery_client)
+            
+            mock_bigquery_client.query.return_value = _forecast_job([{
+                "ai_forecast_result": {"forecast_values": [13.0, 14.0]},
+                "ai_forecast_metadata": {"model": "arima"}
+            }])
+            mock_bigquery_client.insert_rows_json.return_value = []
+            
+            result = forecaster.forecast(SERIES, "sales", "date", forecast_horizon=2)
+            
+            assert result['forecast_result'] == {"forecast_values": [13.0, 14.0]}
+            assert result['metadata']['data_points'] == 3
+            assert result['metadata']['forecast_periods'] == 2
+            assert result['metadata']['model_metadata'] == {"model": "arima"}
+            
+            # Verify the series was bound inline rather than staged
+            job_config = mock_bigquery_client.query.call_args[1]['job_config']
+            params = {p.name: p for p in job_config.query_parameters}
+            assert len(params["series"].values) == 3
+            mock_bigquery_client.load_table_from_file.assert_not_called()
+            
+            # Verify storage was attempted once queued rows are flushed
+            forecaster.flush()
+            mock_bigquery_client.insert_rows_json.assert_called_once()
+            stored_row = mock_bigquery_client.insert_rows_json.call_args[0][1][0]
+            assert stored_row['forecast_id'] == result['id']
+            assert stored_row['data_points'] == 3
+            forecaster.close()
+    
+    def test_forecast_no_results(self, mock_bigquery_client, mock_bigquery_config):
+        """Test forecast when no results are returned."""
+        with patch('src.generative_ai.forecaster.get_bigquery_config', return_value=mock_bigquery_config), \
+             patch('src.generative_ai.forecaster.get_bigquery_settings', return_value=SETTINGS):
+            forecaster = Forecaster(client=mock_bigquery_client)
+            
+            mock_bigquery_client.query.return_value = _forecast_job([])
+            
+            with pytest.raises(ValueError, match="No results returned from AI.FORECAST"):
+                forecaster.forecast(SERIES, "sales", "date")
+            forecaster.close()
+    
+    def test_forecast_served_from_cache(self, mock_bigquery_client, mock_bigquery_config):
+        """Test that a repeated forecast is served from the in-process cache."""
+        with patch('src.generative_ai.forecaster.get_bigquery_config', return_value=mock_bigquery_config), \
+             patch('src.generative_ai.forecaster.get_bigquery_settings', return_value=SETTINGS):
+            forecaster = Forecaster(client=mock_bigquery_client)
+            
+            mock_bigquery_client.query.return_value = _forecast_job([{
+                "ai_forecast_result": {"forecast_values": [13.0]}
+            }])
+            
+            first = forecaster.forecast(SERIES, "sales", "date", forecast_horizon=1)
+            second = forecaster.forecast(SERIES, "sales", "date", forecast_horizon=1)
+            
+            assert second['id'] == first['id']
+            assert second['metadata']['cache_hit'] is True
+            assert 'cache_hit' not in first['metadata']
+            mock_bigquery_client.query.assert_called_once()
+            assert forecaster.get_stats()['hits'] == 1
+            forecaster.close()
+    
+    def test_long_forecast_falls_back_to_rest_without_storage_client(self, mock_bigquery_client, mock_bigquery_config):
+        """Test that long-horizon results are read over REST when the Storage Read API is unavailable."""
+        with patch('src.generative_ai.forecaster.get_bigquery_config', return_value=mock_bigquery_config), \
+             patch('src.generative_ai.forecaster.get_bigquery_settings', return_value=SETTINGS):
+            forecaster = Forecaster(client=mock_bigquery_client)
+            
+            mock_bigquery_config.get_bqstorage_client.return_value = None
+            mock_query_job = _forecast_job([{
+                "ai_forecast_result": {"forecast_values": [1.0] * Forecaster.STORAGE_READ_MIN_HORIZON}
+            }])
+            mock_bigquery_client.query.return_value = mock_query_job
+            
+            result = forecaster.forecast(
+                SERIES, "sales", "date", forecast_horizon=Forecaster.STORAGE_READ_MIN_HORIZON
+            )
+            
+            assert result['metadata']['forecast_periods'] == Forecaster.STORAGE_READ_MIN_HORIZON
+            mock_query_job.to_arrow.assert_not_called()
+            assert mock_query_job.result.call_args[1]['max_results'] == 1
+            forecaster.close()
+    
+    def test_forecast_from_table_binds_filters(self, mock_bigquery_client, mock_bigquery_config):
+        """Test that table filters are bound as query parameters."""
+        with patch('src.generative_ai.forecaster.get_bigquery_config', return_value=mock_bigquery_config), \
+             patch('src.generative_ai.forecaster.get_bigquery_settings', return_value=SETTINGS):
+            forecaster = Forecaster(client=mock_bigquery_client)
+            
+            mock_bigquery_client.query.return_value = _forecast_job([{
+                "ai_forecast_result": {"forecast_values": [13.0]}
+            }])
+            
+            result = forecaster.forecast_from_table(
+                table_id="test-project-id.test_dataset.sales",
+                target_column="sales",
+                time_column="date",
+                where_params={"region": "emea"}
+            )
+            
+            query = mock_bigquery_client.query.call_args[0][0]
+            job_config = mock_bigquery_client.query.call_args[1]['job_config']
+            params = {p.name: p.value for p in job_config.query_parameters}
+            assert "`region` = @filter_0" in query
+            assert params["filter_0"] == "emea"
+            assert result['parameters']['where_params'] == {"region": "emea"}
+            forecaster.close()
+    
+    def test_forecast_from_table_rejects_raw_where_clause(self, mock_bigquery_client, mock_bigquery_config):
+        """Test that raw WHERE clauses and invalid filter columns are rejected."""
+        with patch('src.generative_ai.forecaster.get_bigquery_config', return_value=mock_bigquery_config), \
+             patch('src.generative_ai.forecaster.get_bigquery_settings', return_value=SETTINGS):
+            forecaster = Forecaster(client=mock_bigquery_client)
+            
+            with pytest.raises(ValueError, match="Raw WHERE clauses are not supported"):
+                forecaster.forecast_from_table(
+                    table_id="test-project-id.test_dataset.sales",
+                    target_column="sales",
+                    time_column="date",
+                    where_clause="1=1; DROP TABLE sales"
+                )
+            
+            with pytest.raises(ValueError, match="Invalid filter column"):
+                forecaster.forecast_from_table(
+                    table_id="test-project-id.test_dataset.sales",
+                    target_column="sales",
+                    time_column="date",
+                    where_params={"region` = 'x' OR `1": "emea"}
+                )
+            
+            mock_bigquery_client.query.assert_not_called()
+            forecaster.close()
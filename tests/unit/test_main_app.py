@@ -6,19 +6,33 @@ and overall functionality including health checks and API responses.
 """
 
 import pytest
-from unittest.mock import Mock, patch, MagicMock
+from unittest.mock import AsyncMock, Mock, patch, MagicMock
 from fastapi.testclient import TestClient
 from fastapi import HTTPException
+import base64
 import os
 import time
+import numpy as np
 
 # Import the main app
-from src.main import app
+from src.main import app, _embedding_cache, _text_cache
 
 
 class TestMainApp:
     """Test cases for main FastAPI application."""
     
+    @pytest.fixture(autouse=True)
+    def reset_shared_state(self):
+        """Build shared generators from each test's patched classes and start with empty caches."""
+        app.state.text_generator = None
+        app.state.embedding_generator = None
+        app.state.bigquery_healthy = None
+        _embedding_cache.clear()
+        _text_cache.clear()
+        yield
+        app.state.text_generator = None
+        app.state.embedding_generator = None
+    
     @pytest.fixture
     def client(self):
         """Create test client for FastAPI app."""
@@ -135,7 +149,7 @@ class TestMainApp:
             mock_text_generator_class.return_value = mock_generator
             
             # Mock successful generation
-            mock_generator.generate_text.return_value = {
+            mock_generator.agenerate_text_batched = AsyncMock(return_value={
                 'id': 'test-id-123',
                 'generated_text': 'Generated story about a robot learning to paint.',
                 'model_name': 'gemini-pro',
@@ -150,7 +164,7 @@ class TestMainApp:
                     'output_length': 100,
                     'timestamp': '2024-01-01T00:00:00Z'
                 }
-            }
+            })
             
             request_data = {
                 "prompt": "Write a short story about a robot learning to paint.",
@@ -173,7 +187,7 @@ class TestMainApp:
             assert data["parameters"]["max_tokens"] == 256
             
             # Verify TextGenerator was called with correct parameters
-            mock_generator.generate_text.assert_called_once_with(
+            mock_generator.agenerate_text_batched.assert_awaited_once_with(
                 prompt="Write a short story about a robot learning to paint.",
                 model_name="gemini-pro",
                 temperature=0.7,
@@ -192,7 +206,7 @@ class TestMainApp:
             mock_text_generator_class.return_value = mock_generator
             
             # Mock generation failure
-            mock_generator.generate_text.side_effect = Exception("Generation failed")
+            mock_generator.agenerate_text_batched = AsyncMock(side_effect=Exception("Generation failed"))
             
             request_data = {
                 "prompt": "Write a story",
@@ -215,23 +229,14 @@ class TestMainApp:
             mock_generator = Mock()
             mock_text_generator_class.return_value = mock_generator
             
-            # Mock successful batch generation
-            mock_generator.batch_generate_text.return_value = [
+            # Mock successful batch generation, one result per prompt
+            mock_generator.batch_generate_text.side_effect = lambda prompts, **params: [
                 {
-                    'id': 'id1',
-                    'generated_text': 'Haiku about technology',
-                    'model_name': 'gemini-pro'
-                },
-                {
-                    'id': 'id2',
-                    'generated_text': 'Quantum computing explanation',
-                    'model_name': 'gemini-pro'
-                },
-                {
-                    'id': 'id3',
-                    'generated_text': 'Digital cookies recipe',
-                    'model_name': 'gemini-pro'
+                    'id': f"id-{prompt}",
+                    'generated_text': f"Generated for {prompt}",
+                    'model_name': params['model_name']
                 }
+                for prompt in prompts
             ]
             
             request_data = [
@@ -264,8 +269,11 @@ class TestMainApp:
             assert data["successful"] == 3
             assert len(data["results"]) == 3
             
-            # Verify batch generation was called
-            mock_generator.batch_generate_text.assert_called_once()
+            # Each request has different parameters, so each gets its own batch
+            assert mock_generator.batch_generate_text.call_count == 3
+            assert [r["id"] for r in data["results"]] == [f"id-{req['prompt']}" for req in request_data]
+            max_tokens = {call.kwargs['max_tokens'] for call in mock_generator.batch_generate_text.call_args_list}
+            assert max_tokens == {100, 200, 150}
     
     def test_embedding_generation_endpoint_success(self, client, mock_config):
         """Test successful embedding generation endpoint."""
@@ -313,6 +321,59 @@ class TestMainApp:
                 model_name="text-embedding-001"
             )
     
+    def test_embedding_generation_endpoint_cached(self, client, mock_config):
+        """Test that repeated embedding requests are served from cache."""
+        with patch('src.main.get_config', return_value=mock_config), \
+             patch('src.main.EmbeddingGenerator') as mock_embedding_generator_class:
+            
+            mock_generator = Mock()
+            mock_embedding_generator_class.return_value = mock_generator
+            mock_generator.generate_embedding.return_value = {
+                'id': 'embedding-id-123',
+                'content_type': 'text',
+                'content_hash': 'a1b2c3d4e5f6...',
+                'embedding_vector': [0.1, 0.2, 0.3],
+                'model_name': 'text-embedding-001',
+                'dimensions': 3,
+                'metadata': {}
+            }
+            
+            request_data = {"content": "Cache me", "content_type": "text"}
+            first = client.post("/api/v1/embeddings/generate", json=request_data)
+            second = client.post("/api/v1/embeddings/generate", json=request_data)
+            
+            assert first.status_code == second.status_code == 200
+            assert first.json() == second.json()
+            mock_generator.generate_embedding.assert_called_once()
+    
+    def test_embedding_generation_endpoint_int8_encoding(self, client, mock_config):
+        """Test that int8 encoding returns base64 packed values with a scale."""
+        with patch('src.main.get_config', return_value=mock_config), \
+             patch('src.main.EmbeddingGenerator') as mock_embedding_generator_class:
+            
+            mock_generator = Mock()
+            mock_embedding_generator_class.return_value = mock_generator
+            mock_generator.generate_embedding.return_value = {
+                'id': 'embedding-id-123',
+                'content_type': 'text',
+                'content_hash': 'a1b2c3d4e5f6...',
+                'embedding_vector': [0.5, -1.0, 0.25],
+                'model_name': 'text-embedding-001',
+                'dimensions': 3,
+                'metadata': {}
+            }
+            
+            response = client.post(
+                "/api/v1/embeddings/generate?encoding=int8",
+                json={"content": "Quantize me"}
+            )
+            
+            assert response.status_code == 200
+            data = response.json()
+            assert data["encoding"] == "int8"
+            quantized = np.frombuffer(base64.b64decode(data["embedding_vector"]), dtype=np.int8)
+            np.testing.assert_allclose(quantized * data["scale"], [0.5, -1.0, 0.25], atol=0.01)
+    
     def test_embedding_generation_endpoint_failure(self, client, mock_config):
         """Test embedding generation endpoint when generation fails."""
         with patch('src.main.get_config', return_value=mock_config), \
@@ -527,6 +588,24 @@ class TestMainApp:
         # Should not return 405 Method Not Allowed
         assert response.status_code != 405
     
+    def test_cors_allows_credentials(self, client):
+        """Test that cross-origin requests get their origin echoed with credentials allowed."""
+        origin = "http://localhost:3000"
+        
+        response = client.get("/", headers={"Origin": origin, "Cookie": "session=1"})
+        assert response.headers["access-control-allow-origin"] == origin
+        assert response.headers["access-control-allow-credentials"] == "true"
+        
+        response = client.options("/", headers={
+            "Origin": origin,
+            "Access-Control-Request-Method": "POST",
+            "Access-Control-Request-Headers": "Content-Type"
+        })
+        assert response.status_code == 200
+        assert response.headers["access-control-allow-origin"] == origin
+        assert response.headers["access-control-allow-credentials"] == "true"
+        assert response.headers["access-control-allow-headers"] == "Content-Type"
+    
     def test_trusted_host_middleware(self, client):
         """Test that TrustedHost middleware is properly configured."""
         # Test with valid host
@@ -584,7 +663,7 @@ class TestMainApp:
             mock_text_generator_class.return_value = mock_generator
             
             # Mock successful generation
-            mock_generator.generate_text.return_value = {
+            mock_generator.agenerate_text_batched = AsyncMock(return_value={
                 'id': 'test-id',
                 'generated_text': 'Generated text',
                 'model_name': 'gemini-pro',
@@ -595,7 +674,7 @@ class TestMainApp:
                     'top_k': 40
                 },
                 'metadata': {}
-            }
+            })
             
             # Test with minimal required parameters
             request_data = {
@@ -608,8 +687,8 @@ class TestMainApp:
             assert response.status_code == 200
             
             # Verify TextGenerator was called with default parameters
-            mock_generator.generate_text.assert_called_once()
-            call_args = mock_generator.generate_text.call_args
+            mock_generator.agenerate_text_batched.assert_awaited_once()
+            call_args = mock_generator.agenerate_text_batched.call_args
             assert call_args[1]['temperature'] == 0.7  # Default
             assert call_args[1]['max_tokens'] == 1024  # Default
             assert call_args[1]['top_p'] == 0.9  # Default
@@ -0,0 +1,183 @@
+"""
+Unit tests for ObjectRefProcessor class.
+
+This module tests ObjectRef analysis with BigQuery AI.GENERATE including
+single-query batch analysis, the per-object fallback, and metadata lookup.
+"""
+
+import pytest
+from unittest.mock import Mock, patch
+from src.multimodal.object_ref import ObjectRefProcessor
+
+
+SETTINGS = {"max_in_flight_queries": 4}
+
+
+class TestObjectRefProcessor:
+    """Test cases for ObjectRefProcessor class."""
+    
+    def test_batch_analysis_single_query_success(self, mock_bigquery_client, mock_bigquery_config):
+        """Test that all objects are analyzed by one query and matched by offset."""
+        with patch('src.multimodal.object_ref.get_bigquery_config', return_value=mock_bigquery_config):
+            processor = ObjectRefProcessor(client=mock_bigquery_client)
+            
+            object_refs = ["gs://bucket/a.png", "gs://bucket/b.png"]
+            
+            # Mock one query returning a row per object, out of order
+            mock_query_job = Mock()
+            mock_query_job.result.return_value = [
+                {"ref_offset": 1, "analysis_result": "Result B"},
+                {"ref_offset": 0, "analysis_result": "Result A"}
+            ]
+            mock_query_job.ended = None
+            mock_bigquery_client.query.return_value = mock_query_job
+            mock_bigquery_client.insert_rows_json.return_value = []
+            
+            results = processor.batch_analyze_with_object_refs(
+                object_refs=object_refs,
+                analysis_prompt="Describe the image"
+            )
+            
+            assert [r['object_ref'] for r in results] == object_refs
+            assert [r['analysis_result'] for r in results] == ["Result A", "Result B"]
+            
+            # Verify a single query bound the ObjectRefs and a single insert stored both rows
+            mock_bigquery_client.query.assert_called_once()
+            job_config = mock_bigquery_client.query.call_args[1]['job_config']
+            params = {p.name: p for p in job_config.query_parameters}
+            assert params["object_refs"].values == object_refs
+            mock_bigquery_client.insert_rows_json.assert_called_once()
+            assert len(mock_bigquery_client.insert_rows_json.call_args[0][1]) == 2
+            processor.close()
+    
+    def test_batch_analysis_missing_row(self, mock_bigquery_client, mock_bigquery_config):
+        """Test that objects without a result row are reported as failed."""
+        with patch('src.multimodal.object_ref.get_bigquery_config', return_value=mock_bigquery_config):
+            processor = ObjectRefProcessor(client=mock_bigquery_client)
+            
+            mock_query_job = Mock()
+            mock_query_job.result.return_value = [{"ref_offset": 0, "analysis_result": "Result A"}]
+            mock_query_job.ended = None
+            mock_bigquery_client.query.return_value = mock_query_job
+            mock_bigquery_client.insert_rows_json.return_value = []
+            
+            results = processor._analyze_in_one_query(
+                ["gs://bucket/a.png", "gs://bucket/b.png"],
+                "Describe the image",
+                "gemini-pro-vision"
+            )
+            processor.flush()
+            
+            assert results[0]['analysis_result'] == "Result A"
+            assert results[1] == {
+                'object_ref': "gs://bucket/b.png",
+                'error': "No results returned from ObjectRef analysis",
+                'status': 'failed'
+            }
+            assert len(mock_bigquery_client.insert_rows_json.call_args[0][1]) == 1
+            processor.close()
+    
+    def test_batch_analysis_falls_back_to_per_object_queries(self, mock_bigquery_client, mock_bigquery_config):
+        """Test that a failed batch query is retried as one query per object."""
+        with patch('src.multimodal.object_ref.get_bigquery_config', return_value=mock_bigquery_config), \
+             patch('src.multimodal.object_ref.get_bigquery_settings', return_value=SETTINGS):
+            processor = ObjectRefProcessor(client=mock_bigquery_client)
+            
+            def run_query(query, job_config):
+                params = {p.name: p for p in job_config.query_parameters}
+                if "object_refs" in params:
+                    raise Exception("Batch query failed")
+                
+                object_ref = params["object_ref"].value
+                if object_ref == "gs://bucket/bad.png":
+                    raise Exception("Object not found")
+                
+                mock_query_job = Mock()
+                mock_query_job.result.return_value = [{"analysis_result": f"Result for {object_ref}"}]
+                mock_query_job.ended = None
+                return mock_query_job
+            
+            mock_bigquery_client.query.side_effect = run_query
+            mock_bigquery_client.insert_rows_json.return_value = []
+            
+            results = processor.batch_analyze_with_object_refs(
+                object_refs=["gs://bucket/a.png", "gs://bucket/bad.png"],
+                analysis_prompt="Describe the image"
+            )
+            
+            assert len(results) == 2
+            assert results[0]['analysis_result'] == "Result for gs://bucket/a.png"
+            assert results[1]['status'] == 'failed'
+            assert results[1]['error'] == "Object not found"
+            
+            # One batch query plus one query per object
+            assert mock_bigquery_client.query.call_count == 3
+            processor.close()
+    
+    def test_batch_extract_metadata_success(self, mock_bigquery_client, mock_bigquery_config):
+        """Test that metadata for several ObjectRefs is fetched by one query and cached."""
+        with patch('src.multimodal.object_ref.get_bigquery_config', return_value=mock_bigquery_config):
+            processor = ObjectRefProcessor(client=mock_bigquery_client)
+            
+            mock_query_job = Mock()
+            mock_query_job.result.return_value = [
+                {"gs_uri": "gs://bucket/a.png", "file_name": "a.png", "file_size": 10},
+                {"gs_uri": "gs://bucket/b.png", "file_name": "b.png", "file_size": 20}
+            ]
+            mock_bigquery_client.query.return_value = mock_query_job
+            
+            metadata = processor.batch_extract_metadata(["gs://bucket/a.png", "gs://bucket/b.png"])
+            
+            assert metadata["gs://bucket/a.png"] == {"file_name": "a.png", "file_size": 10}
+            assert metadata["gs://bucket/b.png"] == {"file_name": "b.png", "file_size": 20}
+            
+            # Cached metadata is not queried again
+            assert processor.extract_metadata_from_object_ref("gs://bucket/a.png")['file_size'] == 10
+            mock_bigquery_client.query.assert_called_once()
+            processor.close()
+    
+    def test_batch_extract_metadata_missing_row(self, mock_bigquery_client, mock_bigquery_config):
+        """Test that ObjectRefs without a metadata row are reported and not cached."""
+        with patch('src.multimodal.object_ref.get_bigquery_config', return_value=mock_bigquery_config):
+            processor = ObjectRefProcessor(client=mock_bigquery_client)
+            
+            mock_query_job = Mock()
+            mock_query_job.result.return_value = [{"gs_uri": "gs://bucket/a.png", "file_name": "a.png"}]
+            mock_bigquery_client.query.return_value = mock_query_job
+            
+            metadata = processor.batch_extract_metadata(["gs://bucket/a.png", "gs://bucket/missing.png"])
+            
+            assert metadata["gs://bucket/a.png"] == {"file_name": "a.png"}
+            assert metadata["gs://bucket/missing.png"] == {'error': 'No metadata found'}
+            
+            processor.batch_extract_metadata(["gs://bucket/missing.png"])
+            assert mock_bigquery_client.query.call_count == 2
+            processor.close()
+    
+    def test_batch_extract_metadata_query_failure(self, mock_bigquery_client, mock_bigquery_config):
+        """Test that a failed metadata query is reported for every uncached ObjectRef."""
+        with patch('src.multimodal.object_ref.get_bigquery_config', return_value=mock_bigquery_config):
+            processor = ObjectRefProcessor(client=mock_bigquery_client)
+            
+            mock_bigquery_client.query.side_effect = Exception("Query failed")
+            
+            metadata = processor.batch_extract_metadata(["gs://bucket/a.png", "gs://bucket/b.png"])
+            
+            assert metadata == {
+                "gs://bucket/a.png": {'error': "Query failed"},
+                "gs://bucket/b.png": {'error': "Query failed"}
+            }
+            processor.close()
+    
+    def test_analyze_with_object_ref_no_results(self, mock_bigquery_client, mock_bigquery_config):
+        """Test single-object analysis when no results are returned."""
+        with patch('src.multimodal.object_ref.get_bigquery_config', return_value=mock_bigquery_config):
+            processor = ObjectRefProcessor(client=mock_bigquery_client)
+            
+            mock_query_job = Mock()
+            mock_query_job.result.return_value = []
+            mock_bigquery_client.query.return_value = mock_query_job
+            
+            with pytest.raises(ValueError, match="No results returned from ObjectRef analysis"):
+                processor.analyze_with_object_ref("gs://bucket/a.png", "Describe the image")
+            processor.close()
@@ -5,6 +5,10 @@ This module tests the BigQuery ML.GENERATE_TEXT implementation
 including text generation, batch processing, and history retrieval.
 """
 
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 import pytest
 from unittest.mock import Mock, patch, MagicMock
 from src.generative_ai.text_generator import TextGenerator
@@ -41,7 +45,7 @@ class TestTextGenerator:
         with patch('src.generative_ai.text_generator.get_bigquery_config', return_value=mock_bigquery_config):
             generator = TextGenerator(client=mock_bigquery_client)
             
-            query = generator._build_generate_text_query(
+            query, job_config = generator._build_generate_text_query(
                 prompt="Test prompt",
                 model_name="gemini-pro",
                 temperature=0.7,
@@ -49,21 +53,27 @@ class TestTextGenerator:
                 top_p=0.9,
                 top_k=40
             )
+            params = {p.name: p.value for p in job_config.query_parameters}
             
             assert "ML.GENERATE_TEXT" in query
             assert "gemini-pro" in query
-            assert "Test prompt" in query
-            assert "0.7 as temperature" in query
-            assert "1024 as max_output_tokens" in query
-            assert "0.9 as top_p" in query
-            assert "40 as top_k" in query
+            assert "Test prompt" not in query
+            assert "@temperature as temperature" in query
+            assert "@max_output_tokens as max_output_tokens" in query
+            assert params == {
+                "prompt": "Test prompt",
+                "temperature": 0.7,
+                "max_output_tokens": 1024,
+                "top_p": 0.9,
+                "top_k": 40
+            }
     
     def test_build_generate_text_query_with_additional_params(self, mock_bigquery_client, mock_bigquery_config):
         """Test query building with additional parameters."""
         with patch('src.generative_ai.text_generator.get_bigquery_config', return_value=mock_bigquery_config):
             generator = TextGenerator(client=mock_bigquery_client)
             
-            query = generator._build_generate_text_query(
+            query, job_config = generator._build_generate_text_query(
                 prompt="Test prompt",
                 model_name="gemini-pro",
                 temperature=0.7,
@@ -73,12 +83,29 @@ class TestTextGenerator:
                 stop_sequences=["END", "STOP"],
                 candidate_count=3
             )
+            params = {p.name: p for p in job_config.query_parameters}
             
-            assert "stop_sequences" in query
-            assert "candidate_count" in query
-            assert "3 as candidate_count" in query
+            assert "@stop_sequences as stop_sequences" in query
+            assert "@candidate_count as candidate_count" in query
+            assert params["stop_sequences"].values == ["END", "STOP"]
+            assert params["candidate_count"].value == 3
     
-    @patch('src.generative_ai.text_generator.uuid.uuid4')
+    def test_build_generate_text_query_rejects_invalid_model(self, mock_bigquery_client, mock_bigquery_config):
+        """Test that model names cannot inject SQL."""
+        with patch('src.generative_ai.text_generator.get_bigquery_config', return_value=mock_bigquery_config):
+            generator = TextGenerator(client=mock_bigquery_client)
+            
+            with pytest.raises(ValueError, match="Invalid model name"):
+                generator._build_generate_text_query(
+                    prompt="Test prompt",
+                    model_name="gemini-pro`, (SELECT 1)) --",
+                    temperature=0.7,
+                    max_tokens=1024,
+                    top_p=0.9,
+                    top_k=40
+                )
+    
+    @patch('src.generative_ai.text_generator.uuid7')
     def test_generate_text_success(self, mock_uuid, mock_bigquery_client, mock_bigquery_config):
         """Test successful text generation."""
         mock_uuid.return_value = "test-uuid-123"
@@ -113,9 +140,45 @@ class TestTextGenerator:
             # Verify query was executed
             mock_bigquery_client.query.assert_called_once()
             
-            # Verify storage was attempted
+            # Verify storage was attempted once queued rows are flushed
+            generator.flush()
             mock_bigquery_client.insert_rows_json.assert_called_once()
     
+    def test_generate_text_shares_identical_inflight_calls(self, mock_bigquery_client, mock_bigquery_config):
+        """Test that identical concurrent deterministic calls run a single query."""
+        with patch('src.generative_ai.text_generator.get_bigquery_config', return_value=mock_bigquery_config):
+            generator = TextGenerator(client=mock_bigquery_client)
+            
+            # Hold the first query open until the other callers have started
+            release = threading.Event()
+            mock_result = Mock()
+            mock_result.get.return_value = "Generated text content"
+            mock_query_job = Mock()
+            mock_query_job.result.return_value = [mock_result]
+            mock_query_job.ended = None
+            
+            def run_query(*args, **kwargs):
+                release.wait(5)
+                return mock_query_job
+            
+            mock_bigquery_client.query.side_effect = run_query
+            
+            with ThreadPoolExecutor(max_workers=3) as executor:
+                futures = [executor.submit(generator.generate_text, "Same prompt", temperature=0.0)]
+                while not generator._inflight:
+                    time.sleep(0.01)
+                futures += [
+                    executor.submit(generator.generate_text, "Same prompt", temperature=0.0)
+                    for _ in range(2)
+                ]
+                time.sleep(0.1)
+                release.set()
+                results = [future.result() for future in futures]
+            
+            mock_bigquery_client.query.assert_called_once()
+            assert {result['id'] for result in results} == {results[0]['id']}
+            assert not generator._inflight
+    
     def test_generate_text_no_results(self, mock_bigquery_client, mock_bigquery_config):
         """Test text generation when no results are returned."""
         with patch('src.generative_ai.text_generator.get_bigquery_config', return_value=mock_bigquery_config):
@@ -155,6 +218,7 @@ class TestTextGenerator:
                 model_name="gemini-pro",
                 parameters={"temperature": 0.7}
             )
+            generator.flush()
             
             # Verify storage was called
             mock_bigquery_client.insert_rows_json.assert_called_once()
@@ -165,7 +229,8 @@ class TestTextGenerator:
             
             assert stored_row['id'] == "test-id"
             assert stored_row['content_type'] == "text_generation"
-            assert stored_row['input_data']['prompt'] == "Test prompt"
+            assert json.loads(stored_row['input_data'])['prompt'] == "Test prompt"
+            assert json.loads(stored_row['model_parameters']) == {"temperature": 0.7}
             assert stored_row['generated_content'] == "Generated text"
             assert stored_row['model_name'] == "gemini-pro"
             assert stored_row['status'] == "success"
@@ -186,6 +251,7 @@ class TestTextGenerator:
                 model_name="gemini-pro",
                 parameters={"temperature": 0.7}
             )
+            generator.flush()
             
             # Verify storage was attempted
             mock_bigquery_client.insert_rows_json.assert_called_once()
@@ -197,27 +263,35 @@ class TestTextGenerator:
             
             prompts = ["Prompt 1", "Prompt 2", "Prompt 3"]
             
-            # Mock successful generation for each prompt
-            with patch.object(generator, 'generate_text') as mock_generate:
-                mock_generate.side_effect = [
-                    {"id": "id1", "generated_text": "Text 1"},
-                    {"id": "id2", "generated_text": "Text 2"},
-                    {"id": "id3", "generated_text": "Text 3"}
-                ]
-                
-                results = generator.batch_generate_text(
-                    prompts=prompts,
-                    model_name="gemini-pro",
-                    temperature=0.7
-                )
-                
-                assert len(results) == 3
-                assert results[0]['id'] == "id1"
-                assert results[1]['id'] == "id2"
-                assert results[2]['id'] == "id3"
-                
-                # Verify generate_text was called for each prompt
-                assert mock_generate.call_count == 3
+            # Mock one query returning a row per prompt, out of order
+            mock_query_job = Mock()
+            mock_query_job.result.return_value = [
+                {"prompt_index": 2, "generated_text": "Text 3", "status": ""},
+                {"prompt_index": 0, "generated_text": "Text 1", "status": ""},
+                {"prompt_index": 1, "generated_text": "Text 2", "status": ""}
+            ]
+            mock_query_job.ended = None
+            mock_bigquery_client.query.return_value = mock_query_job
+            mock_bigquery_client.insert_rows_json.return_value = []
+            
+            results = generator.batch_generate_text(
+                prompts=prompts,
+                model_name="gemini-pro",
+                temperature=0.7
+            )
+            
+            assert len(results) == 3
+            assert [r['generated_text'] for r in results] == ["Text 1", "Text 2", "Text 3"]
+            assert results[0]['parameters']['temperature'] == 0.7
+            
+            # Verify all prompts went through a single query and a single insert
+            generator.flush()
+            mock_bigquery_client.query.assert_called_once()
+            job_config = mock_bigquery_client.query.call_args[1]['job_config']
+            params = {p.name: p for p in job_config.query_parameters}
+            assert params["prompts"].values == prompts
+            mock_bigquery_client.insert_rows_json.assert_called_once()
+            assert len(mock_bigquery_client.insert_rows_json.call_args[0][1]) == 3
     
     def test_batch_generate_text_partial_failure(self, mock_bigquery_client, mock_bigquery_config):
         """Test batch text generation with some failures."""
@@ -227,22 +301,29 @@ class TestTextGenerator:
             prompts = ["Prompt 1", "Prompt 2", "Prompt 3"]
             
             # Mock mixed success/failure
-            with patch.object(generator, 'generate_text') as mock_generate:
-                mock_generate.side_effect = [
-                    {"id": "id1", "generated_text": "Text 1"},
-                    Exception("Generation failed"),
-                    {"id": "id3", "generated_text": "Text 3"}
-                ]
-                
-                results = generator.batch_generate_text(
-                    prompts=prompts,
-                    model_name="gemini-pro"
-                )
-                
-                assert len(results) == 3
-                assert results[0]['id'] == "id1"  # Success
-                assert 'error' in results[1]      # Failure
-                assert results[2]['id'] == "id3"  # Success
+            mock_query_job = Mock()
+            mock_query_job.result.return_value = [
+                {"prompt_index": 0, "generated_text": "Text 1", "status": ""},
+                {"prompt_index": 1, "generated_text": None, "status": "Generation failed"},
+                {"prompt_index": 2, "generated_text": "Text 3", "status": ""}
+            ]
+            mock_query_job.ended = None
+            mock_bigquery_client.query.return_value = mock_query_job
+            mock_bigquery_client.insert_rows_json.return_value = []
+            
+            results = generator.batch_generate_text(
+                prompts=prompts,
+                model_name="gemini-pro"
+            )
+            
+            assert len(results) == 3
+            assert results[0]['generated_text'] == "Text 1"  # Success
+            assert results[1]['error'] == "Generation failed"  # Failure
+            assert results[2]['generated_text'] == "Text 3"  # Success
+            
+            # Only successful generations are stored
+            generator.flush()
+            assert len(mock_bigquery_client.insert_rows_json.call_args[0][1]) == 2
     
     def test_get_generation_history_success(self, mock_bigquery_client, mock_bigquery_config):
         """Test successful retrieval of generation history."""
@@ -294,9 +375,12 @@ class TestTextGenerator:
             
             generator.get_generation_history(limit=50, model_name="gemini-pro")
             
-            # Verify the query includes the model filter
-            call_args = mock_bigquery_client.query.call_args[0][0]
-            assert "AND model_name = 'gemini-pro'" in call_args
+            # Verify the model filter is bound as a query parameter
+            query = mock_bigquery_client.query.call_args[0][0]
+            job_config = mock_bigquery_client.query.call_args[1]['job_config']
+            assert "AND model_name = @model_name" in query
+            parameters = {p.name: p.value for p in job_config.query_parameters}
+            assert parameters == {"limit": 50, "model_name": "gemini-pro"}
     
     def test_get_generation_history_failure(self, mock_bigquery_client, mock_bigquery_config):
         """Test handling of history retrieval failure."""
@@ -317,7 +401,7 @@ class TestTextGenerator:
             
             # Test with various parameter combinations
             with patch.object(generator, '_build_generate_text_query') as mock_build_query:
-                mock_build_query.return_value = "SELECT * FROM test"
+                mock_build_query.return_value = ("SELECT * FROM test", None)
                 
                 # Mock successful execution
                 mock_query_job = Mock()
@@ -0,0 +1,176 @@
+"""
+Unit tests for shared utilities.
+
+This module tests the in-process ResponseCache and the batching
+WriteQueue used for background writes.
+"""
+
+import threading
+import time
+import pytest
+from unittest.mock import patch
+from src.utils import ResponseCache, WriteQueue
+
+
+class TestResponseCache:
+    """Test cases for ResponseCache class."""
+    
+    def test_get_returns_stored_value(self):
+        """Test that a stored value is returned and counted as a hit."""
+        cache = ResponseCache()
+        cache.set("key", {"text": "value"})
+        
+        assert cache.get("key") == {"text": "value"}
+        assert cache.get("missing") is None
+        assert cache.hits == 1
+        assert cache.misses == 1
+    
+    def test_expired_entry_is_removed(self):
+        """Test that entries older than the TTL are treated as misses and dropped."""
+        cache = ResponseCache(ttl_seconds=10)
+        
+        with patch('src.utils.time.monotonic', return_value=100.0):
+            cache.set("key", "value")
+        
+        with patch('src.utils.time.monotonic', return_value=105.0):
+            assert cache.get("key") == "value"
+        
+        with patch('src.utils.time.monotonic', return_value=111.0):
+            assert cache.get("key") is None
+        
+        assert len(cache) == 0
+        assert cache.misses == 1
+    
+    def test_least_recently_used_entry_is_evicted(self):
+        """Test that the least recently used entry is evicted when full."""
+        cache = ResponseCache(max_size=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        
+        # Reading "a" makes "b" the least recently used entry
+        assert cache.get("a") == 1
+        cache.set("c", 3)
+        
+        assert len(cache) == 2
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.get("c") == 3
+    
+    def test_clear(self):
+        """Test that clear removes all entries."""
+        cache = ResponseCache()
+        cache.set("a", 1)
+        cache.set("b", 2)
+        
+        cache.clear()
+        
+        assert len(cache) == 0
+        assert cache.get("a") is None
+
+
+class TestWriteQueue:
+    """Test cases for WriteQueue class."""
+    
+    def test_flushes_in_batches_of_max_batch(self):
+        """Test that rows are handed over in batches of at most max_batch."""
+        batches = []
+        write_queue = WriteQueue(batches.append, max_batch=3, max_wait_seconds=5)
+        
+        for row in range(7):
+            assert write_queue.put(row)
+        write_queue.flush()
+        
+        assert batches == [[0, 1, 2], [3, 4, 5], [6]]
+        write_queue.close()
+    
+    def test_flushes_partial_batch_after_max_wait(self):
+        """Test that a partial batch is written once max_wait_seconds has passed."""
+        batches = []
+        written = threading.Event()
+        
+        def flush_fn(rows):
+            batches.append(rows)
+            written.set()
+        
+        write_queue = WriteQueue(flush_fn, max_batch=100, max_wait_seconds=0.05)
+        write_queue.put("a")
+        write_queue.put("b")
+        
+        assert written.wait(timeout=5)
+        assert batches == [["a", "b"]]
+        write_queue.close()
+    
+    def test_close_writes_pending_rows_and_restarts_on_put(self):
+        """Test that close drains the queue and a later put starts a new worker."""
+        batches = []
+        write_queue = WriteQueue(batches.append, max_wait_seconds=5)
+        
+        write_queue.put("a")
+        write_queue.close()
+        
+        assert batches == [["a"]]
+        assert write_queue._worker is None
+        
+        write_queue.put("b")
+        write_queue.flush()
+        
+        assert batches == [["a"], ["b"]]
+        assert write_queue._worker is not None
+        write_queue.close()
+        assert write_queue._worker is None
+    
+    def test_put_drops_rows_when_queue_is_full(self):
+        """Test that put returns False and counts drops instead of blocking."""
+        started = threading.Event()
+        release = threading.Event()
+        batches = []
+        
+        def flush_fn(rows):
+            started.set()
+            release.wait(timeout=5)
+            batches.append(rows)
+        
+        write_queue = WriteQueue(flush_fn, max_batch=1, maxsize=2)
+        
+        # Hold the worker inside flush_fn so the queue fills up
+        assert write_queue.put("a")
+        assert started.wait(timeout=5)
+        assert write_queue.put("b")
+        assert write_queue.put("c")
+        assert not write_queue.put("d")
+        assert write_queue.dropped == 1
+        
+        release.set()
+        write_queue.flush()
+        
+        assert batches == [["a"], ["b"], ["c"]]
+        write_queue.close()
+    
+    def test_flush_fn_errors_do_not_stop_the_worker(self):
+        """Test that a failing flush is logged and later rows are still written."""
+        batches = []
+        
+        def flush_fn(rows):
+            if rows == ["bad"]:
+                raise RuntimeError("insert failed")
+            batches.append(rows)
+        
+        write_queue = WriteQueue(flush_fn, max_wait_seconds=5)
+        
+        write_queue.put("bad")
+        write_queue.flush()
+        write_queue.put("good")
+        write_queue.flush()
+        
+        assert batches == [["good"]]
+        write_queue.close()
+    
+    def test_flush_without_rows_returns_immediately(self):
+        """Test that flush on an idle queue does not start a worker."""
+        write_queue = WriteQueue(lambda rows: None)
+        
+        start = time.monotonic()
+        write_queue.flush()
+        
+        assert time.monotonic() - start < 1
+        assert write_queue._worker is None